@@ -0,0 +1,25 @@
+// Nested function calls: argument passing, closures over enclosing locals and returns
+cloudfunction scale(x, factor) {
+    cloudreturn x * factor;
+}
+
+cloudfunction offset(x) {
+    cloudreturn scale(x, 3) + 1;
+}
+
+cloudfunction transform(x) {
+    cloudreturn offset(scale(x, 2)) - offset(x);
+}
+
+cloudfunction accumulator(start) {
+    cloudvar total = start;
+    cloudfunction step(value) {
+        cloudreturn total + transform(value);
+    }
+    cloudfor (i in 0..5000) {
+        cloudvar total = step(i) % 1000003;
+    }
+    cloudreturn total;
+}
+
+cloudprint(accumulator(7));
@@ -0,0 +1,9 @@
+// Recursive Fibonacci: call overhead, comparisons and branches
+cloudfunction fib(n) {
+    cloudif (n < 2) {
+        cloudreturn n;
+    }
+    cloudreturn fib(n - 1) + fib(n - 2);
+}
+
+cloudprint(fib(22));
@@ -0,0 +1,27 @@
+// Nested counting loops: loop bookkeeping, arithmetic and local variables
+cloudfunction sieve_count(limit) {
+    cloudvar count = 0;
+    cloudfor (n in 2..limit) {
+        cloudvar prime = true;
+        cloudvar d = 2;
+        cloudwhile (prime and d * d <= n) {
+            cloudif (n % d == 0) {
+                cloudvar prime = false;
+            }
+            cloudvar d = d + 1;
+        }
+        cloudif (prime) {
+            cloudvar count = count + 1;
+        }
+    }
+    cloudreturn count;
+}
+
+cloudvar total = 0;
+cloudfor (i in 0..300) {
+    cloudfor (j in 0..100) {
+        cloudvar total = total + (i * j) % 7;
+    }
+}
+cloudprint(total);
+cloudprint(sieve_count(5000));
@@ -0,0 +1,25 @@
+// String building: concatenation in a loop and string comparison
+cloudfunction repeat(text, times) {
+    cloudvar result = "";
+    cloudfor (i in 0..times) {
+        cloudvar result = result + text;
+    }
+    cloudreturn result;
+}
+
+cloudvar line = "";
+cloudvar matches = 0;
+cloudfor (i in 0..5000) {
+    cloudif (i % 3 == 0) {
+        cloudvar line = line + "fizz";
+    } cloudelse cloudif (i % 5 == 0) {
+        cloudvar line = line + "buzz";
+    } cloudelse {
+        cloudvar line = line + ".";
+    }
+    cloudif (repeat("ab", 3) == "ababab") {
+        cloudvar matches = matches + 1;
+    }
+}
+cloudprint(matches);
+cloudprint(repeat("-", 40));
@@ -1,7 +1,8 @@
 import os
 import subprocess
 import sys
-from bitenlang import run_biten_code
+from bitec_cache import cache_path, load_or_compile
+from biten_vm import run_program
 
 def build_bite(filename):
     ext = os.path.splitext(filename)[1]
@@ -13,7 +14,11 @@ def build_bite(filename):
         else:
             print(f"Compilation failed.")
     elif ext == ".b":
-        print("[BITEN] No build step needed for bitenlang.")
+        _, cache_hit = load_or_compile(filename)
+        if cache_hit:
+            print(f"[BITEN] {cache_path(filename)} is up to date.")
+        else:
+            print(f"[BITEN] Built {cache_path(filename)}")
     elif ext == ".py":
         print("Python does not require building.")
     else:
@@ -27,9 +32,8 @@ def run_bite(filename):
             build_bite(filename)
         subprocess.run([f"./{exe}"])
     elif ext == ".b":
-        with open(filename) as f:
-            code = f.read()
-        run_biten_code(code)
+        program, _ = load_or_compile(filename)
+        run_program(program)
     elif ext == ".py":
         subprocess.run([sys.executable, filename])
     else:
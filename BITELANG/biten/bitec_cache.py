@@ -0,0 +1,88 @@
+"""
+Compiled-module cache for BITEN source files, in the spirit of __pycache__.
+
+program.b is compiled to __bitecache__/program.bitec next to it. The header
+records the source's mtime, size and SHA-256 together with the bytecode and
+grammar version; a cached program is used when the mtime and size still
+match, or, after a touch or checkout, when the content hash does. Anything
+else, including a damaged file, is treated as a miss and recompiled.
+"""
+
+import os
+import struct
+import hashlib
+import tempfile
+from bitenlang import biten_grammar, compile_biten_code
+from biten_vm import BYTECODE_VERSION, dump_program, load_program
+
+CACHE_DIR = '__bitecache__'
+MAGIC = b'BITC'
+# magic, bytecode version, grammar digest, source mtime_ns, source size, source sha256
+HEADER = struct.Struct('<4sH16sQQ32s')
+GRAMMAR_DIGEST = hashlib.sha256(biten_grammar.encode('utf-8')).digest()[:16]
+
+def cache_path(source_path):
+    directory, filename = os.path.split(os.path.abspath(source_path))
+    return os.path.join(directory, CACHE_DIR, os.path.splitext(filename)[0] + '.bitec')
+
+def _read_cache(path):
+    """Returns (header fields, payload), or None if there is no usable cache file."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, grammar_digest, mtime_ns, size, source_hash = HEADER.unpack_from(data)
+    if magic != MAGIC or version != BYTECODE_VERSION or grammar_digest != GRAMMAR_DIGEST:
+        return None
+    return (mtime_ns, size, source_hash), data[HEADER.size:]
+
+def _write_cache(path, stat, source_hash, payload):
+    """Writes atomically; a read-only source directory just means no cache."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, BYTECODE_VERSION, GRAMMAR_DIGEST, stat.st_mtime_ns, stat.st_size, source_hash))
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        os.unlink(tmp_path)
+        return False
+
+def load_or_compile(source_path):
+    """
+    Returns (program, cache_hit) for a BITEN source file, compiling it and
+    refreshing its .bitec only when needed.
+    """
+    path = cache_path(source_path)
+    stat = os.stat(source_path)
+    cached = _read_cache(path)
+    if cached is not None:
+        (mtime_ns, size, cached_hash), payload = cached
+        if mtime_ns == stat.st_mtime_ns and size == stat.st_size:
+            try:
+                return load_program(payload), True
+            except ValueError:
+                pass
+
+    with open(source_path, 'rb') as f:
+        source = f.read()
+    source_hash = hashlib.sha256(source).digest()
+    if cached is not None and cached_hash == source_hash:
+        try:
+            program = load_program(payload)
+            _write_cache(path, stat, source_hash, payload) # Same content, new mtime: skip hashing next time
+            return program, True
+        except ValueError:
+            pass
+
+    program = compile_biten_code(source.decode('utf-8'))
+    _write_cache(path, stat, source_hash, dump_program(program))
+    return program, False
@@ -0,0 +1,93 @@
+"""
+Benchmark runner for the BITEN VM.
+
+    python biten_bench.py                          # every program in benchmarks/
+    python biten_bench.py --repeat 10 --save base.json
+    python biten_bench.py --baseline base.json     # compare against an earlier run
+
+Each program is compiled once and then run --repeat times with its output
+discarded. 'vs baseline' is the baseline's median run time divided by this
+one, so 2.00x means the program now runs twice as fast. ops/sec (VM
+instructions per second of the median run) is informational only: an
+optimization that executes fewer instructions can lower it while the
+program gets faster.
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import platform
+import statistics
+from bitenlang import compile_biten_code
+from biten_vm import run_program
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+
+def _discard(line):
+    pass
+
+def bench_file(path, repeat):
+    with open(path) as f:
+        code = f.read()
+    started = time.perf_counter()
+    program = compile_biten_code(code)
+    compile_seconds = time.perf_counter() - started
+    run_seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        instructions = run_program(program, output_func=_discard)
+        run_seconds.append(time.perf_counter() - started)
+    median = statistics.median(run_seconds)
+    return {
+        "name": os.path.splitext(os.path.basename(path))[0],
+        "compileSeconds": round(compile_seconds, 6),
+        "runSeconds": {"min": round(min(run_seconds), 6), "median": round(median, 6), "max": round(max(run_seconds), 6)},
+        "instructions": instructions,
+        "opsPerSecond": round(instructions / median) if median else None,
+    }
+
+def run_benchmarks(paths, repeat):
+    return {
+        "meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                 "platform": platform.platform(), "repeat": repeat},
+        "results": [bench_file(path, repeat) for path in paths],
+    }
+
+def print_report(report, baseline=None):
+    previous = {result["name"]: result for result in (baseline or {}).get("results", [])}
+    header = f"{'benchmark':<12} {'compile ms':>10} {'median ms':>10} {'instructions':>13} {'ops/sec':>12}"
+    print(header + (f" {'vs baseline':>12}" if baseline else ""))
+    for result in report["results"]:
+        line = (f"{result['name']:<12} {result['compileSeconds'] * 1000:>10.2f} {result['runSeconds']['median'] * 1000:>10.2f} "
+                f"{result['instructions']:>13,} {result['opsPerSecond']:>12,}")
+        if baseline:
+            before = previous.get(result["name"])
+            median = result['runSeconds']['median']
+            line += f" {before['runSeconds']['median'] / median:>11.2f}x" if before and median else f" {'-':>12}"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the BITEN VM")
+    parser.add_argument("files", nargs="*", help="BITEN programs to run (default: benchmarks/*.b)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per program")
+    parser.add_argument("--save", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    paths = args.files or sorted(glob.glob(os.path.join(BENCHMARK_DIR, '*.b')))
+    report = run_benchmarks(paths, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.save}")
+
+if __name__ == "__main__":
+    sys.exit(main())
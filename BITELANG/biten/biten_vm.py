@@ -0,0 +1,631 @@
+"""
+Bytecode compiler and stack VM for BITEN and BITE.
+
+The compiler walks a parse tree once and emits one CodeObject per function:
+a flat instruction list of (opcode, argument) pairs, a constant pool, and the
+names of its local slots. Scope resolution happens while compiling, so at run
+time a variable is an index, never a dict lookup:
+
+- parameters and names assigned inside a function are that function's locals
+  (depth 0) and live in the slots list of its Frame, except names that are
+  also assigned at module level and not local to an enclosing function: those
+  stay globals, so a function can update a module-level counter;
+- a name local to an enclosing function is addressed as (depth, index), where
+  depth is the number of Frame.parent links to follow;
+- every other name is a module-level global with its own index.
+
+Functions are scoped the same way. A function defined at module level goes in
+the global function table; one defined inside another function is a local
+of that function, held in a slot named 'name()' (no variable can be called
+that), and is only callable from the function that defines it and from the
+functions nested in it.
+
+The VM runs the instructions in a single dispatch loop with one shared value
+stack and an explicit frame stack, so recursion does not use Python frames.
+A LanguageSpec maps a grammar's rule names onto the compiler, which is how
+both bitenlang and bite_lang share it.
+"""
+
+import ast
+import marshal
+from lark import Tree
+
+(LOAD_CONST, LOAD_LOCAL, STORE_LOCAL, LOAD_DEREF, LOAD_GLOBAL, STORE_GLOBAL,
+ ADD, SUB, MUL, DIV, MOD, NEG, NOT, EQ, NE, LT, LE, GT, GE,
+ JUMP, POP_JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP,
+ CALL, CALL_CLOSURE, RETURN, PRINT, POP, DEFINE_FUNCTION, DEFINE_LOCAL_FUNCTION, HALT) = range(31)
+
+OPCODE_NAMES = ('LOAD_CONST', 'LOAD_LOCAL', 'STORE_LOCAL', 'LOAD_DEREF', 'LOAD_GLOBAL', 'STORE_GLOBAL',
+                'ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'NEG', 'NOT', 'EQ', 'NE', 'LT', 'LE', 'GT', 'GE',
+                'JUMP', 'POP_JUMP_IF_FALSE', 'JUMP_IF_FALSE_OR_POP', 'JUMP_IF_TRUE_OR_POP',
+                'CALL', 'CALL_CLOSURE', 'RETURN', 'PRINT', 'POP', 'DEFINE_FUNCTION', 'DEFINE_LOCAL_FUNCTION', 'HALT')
+JUMP_OPS = (JUMP, POP_JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP) # Argument is an absolute pc
+
+BINARY_OPS = {'add': ADD, 'sub': SUB, 'mul': MUL, 'div': DIV, 'mod': MOD,
+              'eq': EQ, 'ne': NE, 'lt': LT, 'le': LE, 'gt': GT, 'ge': GE}
+UNARY_OPS = {'neg': NEG, 'logical_not': NOT}
+SHORT_CIRCUIT_OPS = {'logical_and': JUMP_IF_FALSE_OR_POP, 'logical_or': JUMP_IF_TRUE_OR_POP}
+LITERALS = {'true': True, 'false': False}
+MAX_ARGS = 255 # CALL packs the argument count into the low byte of its argument
+MAX_LOCALS = 0xFFFF # LOAD_DEREF packs (depth, index) as depth << 16 | index
+MAX_CALL_DEPTH = 10000
+BYTECODE_VERSION = 3 # Bump whenever opcodes or the serialized layout change; invalidates .bitec files
+
+class LanguageSpec:
+    """
+    Describes a grammar to the compiler.
+    :param statements: {rule name: 'assign' | 'print' | 'function' | 'call' | 'return' | 'expr' | 'if' | 'while' | 'for'}
+    :param call: Rule name of a function call expression.
+    :param block: Rule name of a braced statement list.
+    :param print_prefix: Prepended to every printed line.
+    """
+    def __init__(self, name, statements, call, block, return_keyword, print_prefix='',
+                 variable_error="Variable '{}' not found", function_error="Function '{}' not defined"):
+        self.name = name
+        self.statements = statements
+        self.call = call
+        self.block = block
+        self.return_keyword = return_keyword
+        self.print_prefix = print_prefix
+        self.variable_error = variable_error
+        self.function_error = function_error
+
+class _Unset:
+    __slots__ = ()
+    def __repr__(self):
+        return '<unset>'
+
+UNSET = _Unset() # Value of a slot that has not been assigned yet
+
+class CodeObject:
+    """Compiled body of a function, or of the module itself."""
+    __slots__ = ('name', 'instructions', 'consts', 'nparams', 'local_names')
+
+    def __init__(self, name, instructions, consts, nparams, local_names):
+        self.name = name
+        self.instructions = instructions
+        self.consts = consts
+        self.nparams = nparams
+        self.local_names = local_names
+
+class Program:
+    """A compiled module: its top-level code, the global and function slot tables and runtime messages."""
+    __slots__ = ('code', 'global_names', 'function_names', 'print_prefix', 'variable_error', 'function_error')
+
+    def __init__(self, code, global_names, function_names, print_prefix, variable_error, function_error):
+        self.code = code
+        self.global_names = global_names
+        self.function_names = function_names
+        self.print_prefix = print_prefix
+        self.variable_error = variable_error
+        self.function_error = function_error
+
+class Frame:
+    """Locals of one function call, linked to the frame its function was defined in."""
+    __slots__ = ('code', 'slots', 'parent')
+
+    def __init__(self, code, slots, parent):
+        self.code = code
+        self.slots = slots
+        self.parent = parent
+
+class Closure:
+    """A defined function: its code plus the frame that encloses it (None at module level)."""
+    __slots__ = ('code', 'parent')
+
+    def __init__(self, code, parent):
+        self.code = code
+        self.parent = parent
+
+class Scope:
+    """Compile-time local slots of one function, linked to the enclosing function's scope."""
+    def __init__(self, names, parent=None):
+        self.slots = {}
+        self.parent = parent
+        for name in names:
+            self.slots.setdefault(name, len(self.slots))
+        self._check_size()
+
+    def _check_size(self):
+        if len(self.slots) > MAX_LOCALS:
+            raise SyntaxError(f"More than {MAX_LOCALS} local variables in one function")
+
+    def declare(self, name):
+        """Adds a local slot while the function is being compiled, e.g. for a loop's hidden counter."""
+        index = self.slots.setdefault(name, len(self.slots))
+        self._check_size()
+        return index
+
+    def resolve(self, name):
+        """Returns (depth, index) for a local of this or an enclosing function, or None for a global."""
+        scope, depth = self, 0
+        while scope is not None:
+            if name in scope.slots:
+                return depth, scope.slots[name]
+            scope, depth = scope.parent, depth + 1
+        return None
+
+def _string_literal(token):
+    """Decodes an ESCAPED_STRING token: strips the quotes and applies its backslash escapes."""
+    try:
+        return ast.literal_eval(str(token))
+    except (SyntaxError, ValueError) as e:
+        raise SyntaxError(f"Invalid string literal {token}: {e}") from None
+
+def _function_slot_name(name):
+    return f"{name}()"
+
+def _children(node):
+    # Grammars built with maybe_placeholders=True leave None for an absent [optional] part
+    return [child for child in node.children if child is not None]
+
+def _statements(tree):
+    # ?start inlines a single statement, so the root is either 'start' or that statement
+    return tree.children if tree.data == 'start' else [tree]
+
+class _Unit:
+    """The code object being emitted."""
+    def __init__(self, name, scope=None, nparams=0):
+        self.name = name
+        self.scope = scope # None for the module
+        self.nparams = nparams
+        self.instructions = []
+        self.consts = []
+        self.const_slots = {}
+
+    def emit(self, op, arg=0):
+        self.instructions.extend((op, arg))
+        return len(self.instructions) - 2 # Position of this instruction, for patch()
+
+    @property
+    def pc(self):
+        return len(self.instructions)
+
+    def patch(self, position, target):
+        """Points the jump emitted at position to target."""
+        self.instructions[position + 1] = target
+
+    def const(self, value):
+        key = (type(value), value)
+        if key not in self.const_slots:
+            self.const_slots[key] = len(self.consts)
+            self.consts.append(value)
+        return self.const_slots[key]
+
+    def finish(self):
+        local_names = list(self.scope.slots) if self.scope is not None else []
+        return CodeObject(self.name, self.instructions, self.consts, self.nparams, local_names)
+
+class Compiler:
+    """Compiles a parse tree into a Program. Names arrive already case-folded by the lexer, if the language folds them."""
+    def __init__(self, spec):
+        self.spec = spec
+        self.global_slots = {}
+        self.function_slots = {}
+        self.module_names = set() # Names assigned at module level; assigning them in a function updates the global
+        self.hidden_names = 0
+
+    def compile(self, tree):
+        unit = _Unit('<module>')
+        self.module_names = set(self._assigned_names(_statements(tree)))
+        self._block(unit, _statements(tree))
+        unit.emit(HALT)
+        spec = self.spec
+        return Program(unit.finish(), list(self.global_slots), list(self.function_slots),
+                       spec.print_prefix, spec.variable_error, spec.function_error)
+
+    def _slot(self, table, name):
+        return table.setdefault(name, len(table))
+
+    def _block(self, unit, stmts):
+        for stmt in stmts:
+            kind = self.spec.statements.get(stmt.data)
+            if kind is None: # A bare expression statement inlined by ?stmt
+                self._expr(unit, stmt)
+                unit.emit(POP)
+            else:
+                getattr(self, f'_stmt_{kind}')(unit, stmt)
+
+    def _body(self, node):
+        """Statements of a block, or the single statement of an 'else if'."""
+        return node.children if node.data == self.spec.block else [node]
+
+    def _assigned_names(self, stmts):
+        """
+        Names assigned in a function body, including inside its loops and
+        conditionals, plus the 'name()' slots of the functions it defines;
+        nested functions have their own scopes.
+        """
+        names = []
+        for stmt in stmts:
+            kind = self.spec.statements.get(stmt.data)
+            if kind in ('assign', 'for'):
+                names.append(str(stmt.children[0]))
+            elif kind == 'function':
+                names.append(_function_slot_name(stmt.children[0]))
+            if kind in ('if', 'while', 'for'):
+                for child in _children(stmt):
+                    if isinstance(child, Tree) and (child.data == self.spec.block or self.spec.statements.get(child.data) == 'if'):
+                        names.extend(self._assigned_names(self._body(child)))
+        return names
+
+    def _hidden_name(self):
+        # Not a valid identifier, so user code can never refer to it
+        self.hidden_names += 1
+        return f".hidden{self.hidden_names}"
+
+    def _load(self, unit, name):
+        resolved = self._resolve_local(unit, name)
+        if resolved is None:
+            unit.emit(LOAD_GLOBAL, self._slot(self.global_slots, name))
+        elif resolved[0] == 0:
+            unit.emit(LOAD_LOCAL, resolved[1])
+        else:
+            unit.emit(LOAD_DEREF, resolved[0] << 16 | resolved[1])
+
+    def _resolve_local(self, unit, name):
+        return unit.scope.resolve(name) if unit.scope is not None else None
+
+    def _store(self, unit, name):
+        if unit.scope is None or (name in self.module_names and unit.scope.resolve(name) is None):
+            unit.emit(STORE_GLOBAL, self._slot(self.global_slots, name))
+        else:
+            unit.emit(STORE_LOCAL, unit.scope.declare(name))
+
+    def _stmt_assign(self, unit, node):
+        name, value = node.children
+        self._expr(unit, value)
+        self._store(unit, str(name))
+
+    def _stmt_print(self, unit, node):
+        self._expr(unit, node.children[0])
+        unit.emit(PRINT)
+
+    def _stmt_function(self, unit, node):
+        name, *rest = _children(node)
+        params = [str(param) for param in rest[0].children] if len(rest) == 2 else []
+        block = rest[-1]
+        # A module-level name stays global only if no enclosing function has a local of that name;
+        # every other assigned name gets its slot now, so _store never declares one partway through
+        assigned = [local for local in self._assigned_names(block.children)
+                    if local not in self.module_names or self._resolve_local(unit, local) is not None]
+        scope = Scope(params + assigned, unit.scope)
+        function_unit = _Unit(str(name), scope, len(params))
+        self._block(function_unit, block.children)
+        function_unit.emit(LOAD_CONST, function_unit.const(None)) # Falling off the end returns None
+        function_unit.emit(RETURN)
+        if unit.scope is None:
+            function = (self._slot(self.function_slots, str(name)), function_unit.finish())
+            unit.emit(DEFINE_FUNCTION, unit.const(function))
+        else:
+            function = (unit.scope.declare(_function_slot_name(name)), function_unit.finish())
+            unit.emit(DEFINE_LOCAL_FUNCTION, unit.const(function))
+
+    def _stmt_call(self, unit, node):
+        self._expr(unit, node)
+        unit.emit(POP)
+
+    def _stmt_return(self, unit, node):
+        if unit.scope is None:
+            raise SyntaxError(f"{self.spec.return_keyword} outside of a function")
+        self._expr(unit, node.children[0])
+        unit.emit(RETURN)
+
+    def _stmt_expr(self, unit, node):
+        self._expr(unit, node.children[0])
+        unit.emit(POP)
+
+    def _stmt_if(self, unit, node):
+        condition, then_block, *rest = _children(node)
+        self._expr(unit, condition)
+        to_else = unit.emit(POP_JUMP_IF_FALSE)
+        self._block(unit, then_block.children)
+        if rest:
+            to_end = unit.emit(JUMP)
+            unit.patch(to_else, unit.pc)
+            self._block(unit, self._body(rest[0]))
+            unit.patch(to_end, unit.pc)
+        else:
+            unit.patch(to_else, unit.pc)
+
+    def _stmt_while(self, unit, node):
+        condition, block = node.children
+        loop_start = unit.pc
+        self._expr(unit, condition)
+        to_exit = unit.emit(POP_JUMP_IF_FALSE)
+        self._block(unit, block.children)
+        unit.emit(JUMP, loop_start)
+        unit.patch(to_exit, unit.pc)
+
+    def _stmt_for(self, unit, node):
+        # for name in start..end: a hidden counter runs from start up to (not including) end,
+        # evaluated once; the loop variable gets a fresh copy each iteration
+        name, start, end, block = node.children
+        counter, limit = self._hidden_name(), self._hidden_name()
+        self._expr(unit, start)
+        self._store(unit, counter)
+        self._expr(unit, end)
+        self._store(unit, limit)
+        loop_start = unit.pc
+        self._load(unit, counter)
+        self._load(unit, limit)
+        unit.emit(LT)
+        to_exit = unit.emit(POP_JUMP_IF_FALSE)
+        self._load(unit, counter)
+        self._store(unit, str(name))
+        self._block(unit, block.children)
+        self._load(unit, counter)
+        unit.emit(LOAD_CONST, unit.const(1))
+        unit.emit(ADD)
+        self._store(unit, counter)
+        unit.emit(JUMP, loop_start)
+        unit.patch(to_exit, unit.pc)
+
+    def _expr(self, unit, node):
+        kind = node.data
+        if kind in BINARY_OPS:
+            left, right = node.children
+            self._expr(unit, left)
+            self._expr(unit, right)
+            unit.emit(BINARY_OPS[kind])
+        elif kind in UNARY_OPS:
+            self._expr(unit, node.children[0])
+            unit.emit(UNARY_OPS[kind])
+        elif kind in SHORT_CIRCUIT_OPS:
+            # Leaves the left value when it decides the result, like Python's and/or
+            left, right = node.children
+            self._expr(unit, left)
+            to_end = unit.emit(SHORT_CIRCUIT_OPS[kind])
+            self._expr(unit, right)
+            unit.patch(to_end, unit.pc)
+        elif kind in LITERALS:
+            unit.emit(LOAD_CONST, unit.const(LITERALS[kind]))
+        elif kind == 'int':
+            unit.emit(LOAD_CONST, unit.const(int(node.children[0])))
+        elif kind == 'string':
+            unit.emit(LOAD_CONST, unit.const(_string_literal(node.children[0])))
+        elif kind == 'var':
+            self._load(unit, str(node.children[0]))
+        elif kind == self.spec.call:
+            name, *rest = _children(node)
+            args = rest[0].children if rest else []
+            if len(args) > MAX_ARGS:
+                raise SyntaxError(f"Function call with more than {MAX_ARGS} arguments")
+            for arg in args:
+                self._expr(unit, arg)
+            slot_name = _function_slot_name(name)
+            if unit.scope is not None and unit.scope.resolve(slot_name) is not None:
+                self._load(unit, slot_name) # A function nested in this one or an enclosing one
+                unit.emit(CALL_CLOSURE, len(args))
+            else:
+                unit.emit(CALL, self._slot(self.function_slots, str(name)) << 8 | len(args))
+        else:
+            raise SyntaxError(f"Unsupported {self.spec.name} expression '{kind}'")
+
+def compile_tree(tree, spec):
+    return Compiler(spec).compile(tree)
+
+def _display(value):
+    # Booleans print the way they are written in source
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    return value
+
+def _unset_error(program, name):
+    # A nested function lives in a local slot, so calling it before its definition ran finds the slot unset
+    if name.endswith('()'):
+        return Exception(program.function_error.format(name[:-2]))
+    return NameError(program.variable_error.format(name))
+
+def run_program(program, output_func=None):
+    """
+    Executes a compiled Program; printed lines go to output_func (print by default).
+    Returns the number of instructions executed.
+    """
+    output_func = output_func or print
+    global_names = program.global_names
+    function_names = program.function_names
+    print_prefix = program.print_prefix
+    globals_ = [UNSET] * len(global_names)
+    functions = [None] * len(function_names)
+
+    code = program.code
+    instructions = code.instructions
+    consts = code.consts
+    frame = None # The module has no frame; its names are all globals
+    locals_ = None
+    frames = []
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    pc = 0
+    # Instructions are tallied per straight-line run, when control transfers, so the
+    # count costs nothing on ordinary instructions: executed += pc - run_start
+    executed = 0
+    run_start = 0
+    while True:
+        op = instructions[pc]
+        arg = instructions[pc + 1]
+        pc += 2
+        if op == LOAD_LOCAL:
+            value = locals_[arg]
+            if value is UNSET:
+                raise _unset_error(program, code.local_names[arg])
+            push(value)
+        elif op == LOAD_CONST:
+            push(consts[arg])
+        elif op == LOAD_GLOBAL:
+            value = globals_[arg]
+            if value is UNSET:
+                raise NameError(program.variable_error.format(global_names[arg]))
+            push(value)
+        elif op == ADD:
+            right = pop()
+            stack[-1] = stack[-1] + right
+        elif op == SUB:
+            right = pop()
+            stack[-1] = stack[-1] - right
+        elif op == MUL:
+            right = pop()
+            stack[-1] = stack[-1] * right
+        elif op == STORE_LOCAL:
+            locals_[arg] = pop()
+        elif op == LT:
+            right = pop()
+            stack[-1] = stack[-1] < right
+        elif op == POP_JUMP_IF_FALSE:
+            if not pop():
+                executed += pc - run_start
+                pc = run_start = arg
+        elif op == JUMP:
+            executed += pc - run_start
+            pc = run_start = arg
+        elif op == CALL or op == CALL_CLOSURE:
+            if op == CALL:
+                closure = functions[arg >> 8]
+                if closure is None:
+                    raise Exception(program.function_error.format(function_names[arg >> 8]))
+            else:
+                closure = pop() # Loaded after the arguments
+            function = closure.code
+            argc = arg & 0xFF
+            nparams = function.nparams
+            # Missing arguments stay unset and extra ones are dropped
+            if argc:
+                new_locals = stack[-argc:]
+                del stack[-argc:]
+                if argc > nparams:
+                    del new_locals[nparams:]
+            else:
+                new_locals = []
+            new_locals.extend([UNSET] * (len(function.local_names) - len(new_locals)))
+            if len(frames) >= MAX_CALL_DEPTH:
+                raise RecursionError(f"Function calls nested deeper than {MAX_CALL_DEPTH}")
+            frames.append((code, pc, frame))
+            code = function
+            instructions = code.instructions
+            consts = code.consts
+            frame = Frame(code, new_locals, closure.parent)
+            locals_ = new_locals
+            executed += pc - run_start
+            pc = run_start = 0
+        elif op == RETURN:
+            executed += pc - run_start
+            code, pc, frame = frames.pop()
+            run_start = pc
+            instructions = code.instructions
+            consts = code.consts
+            locals_ = frame.slots if frame is not None else None
+        elif op == LOAD_DEREF:
+            target = frame
+            for _ in range(arg >> 16):
+                target = target.parent
+            value = target.slots[arg & 0xFFFF]
+            if value is UNSET:
+                raise _unset_error(program, target.code.local_names[arg & 0xFFFF])
+            push(value)
+        elif op == STORE_GLOBAL:
+            globals_[arg] = pop()
+        elif op == EQ:
+            right = pop()
+            stack[-1] = stack[-1] == right
+        elif op == GT:
+            right = pop()
+            stack[-1] = stack[-1] > right
+        elif op == LE:
+            right = pop()
+            stack[-1] = stack[-1] <= right
+        elif op == GE:
+            right = pop()
+            stack[-1] = stack[-1] >= right
+        elif op == NE:
+            right = pop()
+            stack[-1] = stack[-1] != right
+        elif op == MOD:
+            right = pop()
+            stack[-1] = stack[-1] % right
+        elif op == DIV:
+            right = pop()
+            stack[-1] = stack[-1] // right
+        elif op == JUMP_IF_FALSE_OR_POP:
+            if stack[-1]:
+                pop()
+            else:
+                executed += pc - run_start
+                pc = run_start = arg
+        elif op == JUMP_IF_TRUE_OR_POP:
+            if stack[-1]:
+                executed += pc - run_start
+                pc = run_start = arg
+            else:
+                pop()
+        elif op == NOT:
+            stack[-1] = not stack[-1]
+        elif op == NEG:
+            stack[-1] = -stack[-1]
+        elif op == POP:
+            pop()
+        elif op == PRINT:
+            output_func(f"{print_prefix}{_display(pop())}")
+        elif op == DEFINE_FUNCTION:
+            index, function = consts[arg]
+            functions[index] = Closure(function, frame)
+        elif op == DEFINE_LOCAL_FUNCTION:
+            index, function = consts[arg]
+            locals_[index] = Closure(function, frame)
+        elif op == HALT:
+            return (executed + pc - run_start) // 2
+        else:
+            raise RuntimeError(f"Bad opcode {op} at {code.name}:{pc - 2}")
+
+def _code_to_data(code):
+    # Function constants are the only tuples in a constant pool
+    consts = [(const[0], _code_to_data(const[1])) if isinstance(const, tuple) else const for const in code.consts]
+    return (code.name, code.instructions, consts, code.nparams, code.local_names)
+
+def _code_from_data(data):
+    name, instructions, consts, nparams, local_names = data
+    consts = [(const[0], _code_from_data(const[1])) if isinstance(const, tuple) else const for const in consts]
+    return CodeObject(name, instructions, consts, nparams, local_names)
+
+def dump_program(program):
+    """Serializes a Program to bytes (see load_program)."""
+    return marshal.dumps((_code_to_data(program.code), program.global_names, program.function_names,
+                          program.print_prefix, program.variable_error, program.function_error))
+
+def load_program(data):
+    """Rebuilds a Program from dump_program() output; raises ValueError if the data is damaged."""
+    try:
+        code, global_names, function_names, print_prefix, variable_error, function_error = marshal.loads(data)
+        return Program(_code_from_data(code), global_names, function_names, print_prefix, variable_error, function_error)
+    except (EOFError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid compiled BITEN program: {e}") from None
+
+def disassemble(code, output_func=None):
+    """Prints a CodeObject's instructions, followed by those of the functions it defines."""
+    output_func = output_func or print
+    output_func(f"{code.name} (params={code.nparams}, locals={code.local_names}):")
+    functions = []
+    for pc in range(0, len(code.instructions), 2):
+        op, arg = code.instructions[pc], code.instructions[pc + 1]
+        detail = ''
+        if op == LOAD_CONST:
+            detail = f" ({code.consts[arg]!r})"
+        elif op in (LOAD_LOCAL, STORE_LOCAL):
+            detail = f" ({code.local_names[arg]})"
+        elif op == LOAD_DEREF:
+            detail = f" (depth {arg >> 16}, slot {arg & 0xFFFF})"
+        elif op in JUMP_OPS:
+            detail = f" (to {arg})"
+        elif op == CALL:
+            detail = f" (function {arg >> 8}, {arg & 0xFF} args)"
+        elif op == CALL_CLOSURE:
+            detail = f" ({arg} args)"
+        elif op in (DEFINE_FUNCTION, DEFINE_LOCAL_FUNCTION):
+            detail = f" ({code.consts[arg][1].name})"
+            functions.append(code.consts[arg][1])
+        output_func(f"  {pc:4d} {OPCODE_NAMES[op]:<22} {arg}{detail}")
+    for function in functions:
+        disassemble(function, output_func)
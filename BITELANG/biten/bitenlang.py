@@ -1,4 +1,6 @@
-from lark import Lark, Transformer, v_args
+import threading
+from lark import Lark
+from biten_vm import LanguageSpec, compile_tree, run_program
 
 biten_grammar = r"""
     ?start: stmt*
@@ -7,6 +9,9 @@ biten_grammar = r"""
          | cloudfunctiondef
          | cloudfunctioncall ";"
          | cloudreturnstmt
+         | cloudifstmt
+         | cloudwhilestmt
+         | cloudforstmt
          | exprstmt
     cloudvarassign: "cloudvar" NAME "=" expr ";"
     cloudprintstmt: "cloudprint" "(" expr ")" ";"
@@ -15,106 +20,87 @@ biten_grammar = r"""
     cloudfunctioncall: NAME "(" [arglist] ")"
     arglist: expr ("," expr)*
     cloudreturnstmt: "cloudreturn" expr ";"
+    cloudifstmt: "cloudif" "(" expr ")" cloudblock ["cloudelse" (cloudblock | cloudifstmt)]
+    cloudwhilestmt: "cloudwhile" "(" expr ")" cloudblock
+    cloudforstmt: "cloudfor" "(" NAME "in" expr ".." expr ")" cloudblock
     cloudblock:  "{" stmt* "}"
     exprstmt: expr ";"
-    ?expr: INT      -> int
+    ?expr: or_expr
+    ?or_expr: and_expr
+         | or_expr "or" and_expr     -> logical_or
+    ?and_expr: not_expr
+         | and_expr "and" not_expr   -> logical_and
+    ?not_expr: comparison
+         | "not" not_expr            -> logical_not
+    ?comparison: sum
+         | sum "==" sum  -> eq
+         | sum "!=" sum  -> ne
+         | sum "<" sum   -> lt
+         | sum "<=" sum  -> le
+         | sum ">" sum   -> gt
+         | sum ">=" sum  -> ge
+    ?sum: product
+         | sum "+" product   -> add
+         | sum "-" product   -> sub
+    ?product: unary
+         | product "*" unary -> mul
+         | product "/" unary -> div
+         | product "%" unary -> mod
+    ?unary: atom
+         | "-" unary         -> neg
+    ?atom: INT      -> int
+         | STRING   -> string
+         | "true"   -> true
+         | "false"  -> false
          | NAME     -> var
          | cloudfunctioncall
          | "(" expr ")"
-         | expr "+" expr   -> add
-         | expr "-" expr   -> sub
-         | expr "*" expr   -> mul
-         | expr "/" expr   -> div
     %import common.CNAME -> NAME
     %import common.INT
     %import common.WS
+    %import common.CPP_COMMENT
+    %import common.ESCAPED_STRING -> STRING
     %ignore WS
+    %ignore CPP_COMMENT
 """
 
-def _normalize_name(tok):
-    return str(tok).lower()
-
-class CloudReturn(Exception):
-    def __init__(self, value):
-        self.value = value
-
-class CloudEnv(dict):
-    def __init__(self, parent=None):
-        self.parent = parent
-    def __getitem__(self, k):
-        k = k.lower()
-        if k in self:
-            return super().__getitem__(k)
-        elif self.parent:
-            return self.parent[k]
-        else:
-            raise NameError(f"CloudVar '{k}' not found")
-    def __setitem__(self, k, v):
-        super().__setitem__(k.lower(), v)
-    def copy(self):
-        return CloudEnv(self)
-
-@v_args(inline=True)
-class CloudTransformer(Transformer):
-    def __init__(self, output_func=None):
-        self.globalenv = CloudEnv()
-        self.functions = {}
-        self.output_func = output_func or print
-
-    def cloudvarassign(self, name, value):
-        self.globalenv[_normalize_name(name)] = value
-
-    def cloudprintstmt(self, value):
-        self.output_func(f"[CLOUDPRINT] {value}")
-
-    def int(self, val):
-        return int(val)
-
-    def var(self, name):
-        return self.globalenv[_normalize_name(name)]
-
-    def add(self, a, b): return a + b
-    def sub(self, a, b): return a - b
-    def mul(self, a, b): return a * b
-    def div(self, a, b): return a // b
-
-    def cloudfunctiondef(self, name, params, block):
-        pname = _normalize_name(name)
-        self.functions[pname] = (params or [], block)
-
-    def paramlist(self, *args): return list(map(_normalize_name, args))
-    def arglist(self, *args): return list(args)
-
-    def cloudfunctioncall(self, name, args=None):
-        fname = _normalize_name(name)
-        if fname not in self.functions:
-            raise Exception(f"CloudFunction '{fname}' not defined")
-        param_names, block = self.functions[fname]
-        call_env = CloudEnv(self.globalenv)
-        for p, a in zip(param_names, args or []):
-            call_env[p] = a
-        try:
-            self.exec_block(block, call_env)
-        except CloudReturn as cr:
-            return cr.value
-
-    def cloudblock(self, *stmts):
-        return list(stmts)
-
-    def cloudreturnstmt(self, value):
-        raise CloudReturn(value)
-
-    def exprstmt(self, val): return val
-    def stmt(self, val): return val
-    def start(self, *stmts): pass
-
-    def exec_block(self, block, env):
-        old_env = self.globalenv
-        self.globalenv = env
-        for stmt in block:
-            pass
-        self.globalenv = old_env
+BITEN = LanguageSpec(
+    'BITEN',
+    statements={'cloudvarassign': 'assign', 'cloudprintstmt': 'print', 'cloudfunctiondef': 'function',
+                'cloudfunctioncall': 'call', 'cloudreturnstmt': 'return', 'exprstmt': 'expr',
+                'cloudifstmt': 'if', 'cloudwhilestmt': 'while', 'cloudforstmt': 'for'},
+    call='cloudfunctioncall',
+    block='cloudblock',
+    return_keyword='cloudreturn',
+    print_prefix='[CLOUDPRINT] ',
+    variable_error="CloudVar '{}' not found",
+    function_error="CloudFunction '{}' not defined",
+)
+
+def _fold_name(token):
+    # BITEN names are case-insensitive; fold them once, as they are lexed
+    return token.update(value=token.value.lower())
+
+_parser = None
+_parser_lock = threading.Lock()
+
+def get_biten_parser():
+    """
+    Returns the process-wide BITEN parser. The LALR tables are built once per
+    process; cache=True also keeps them in Lark's on-disk cache, so new
+    processes (CLI runs) load them instead of regenerating them.
+    """
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                _parser = Lark(biten_grammar, parser='lalr', maybe_placeholders=False, cache=True,
+                               lexer_callbacks={'NAME': _fold_name})
+    return _parser
+
+def compile_biten_code(code):
+    """Parses and compiles BITEN source into a biten_vm.Program."""
+    return compile_tree(get_biten_parser().parse(code), BITEN)
 
 def run_biten_code(code, output_func=None):
-    parser = Lark(biten_grammar, parser='lalr', transformer=CloudTransformer(output_func=output_func), maybe_placeholders=False)
-    parser.parse(code)
\ No newline at end of file
+    run_program(compile_biten_code(code), output_func=output_func)
@@ -0,0 +1,113 @@
+import unittest
+from bitenlang import run_biten_code
+
+def run(code):
+    lines = []
+    run_biten_code(code, output_func=lines.append)
+    return [line.replace('[CLOUDPRINT] ', '') for line in lines]
+
+class ScopeTest(unittest.TestCase):
+    def test_function_updates_module_global(self):
+        code = """
+        cloudvar g = 1;
+        cloudfunction bump() { cloudvar g = g + 1; }
+        bump();
+        bump();
+        cloudprint(g);
+        """
+        self.assertEqual(run(code), ['3'])
+
+    def test_loop_variable_named_like_a_global_is_the_global(self):
+        code = """
+        cloudvar i = 10;
+        cloudfunction count() { cloudfor (i in 0..3) { cloudprint(i); } }
+        count();
+        cloudprint(i);
+        """
+        self.assertEqual(run(code), ['0', '1', '2', '2'])
+
+    def test_parameter_shadows_global(self):
+        code = """
+        cloudvar g = 10;
+        cloudfunction f(g) { cloudvar g = g + 1; cloudreturn g; }
+        cloudprint(f(1));
+        cloudprint(g);
+        """
+        self.assertEqual(run(code), ['2', '10'])
+
+    def test_nested_function_assigning_enclosing_parameter_named_like_a_global(self):
+        # Assigning x makes it local to inner throughout its body, as it would be without
+        # the global, so the loop guard fails on the unset local instead of reading outer's x
+        code = """
+        cloudvar x = 100;
+        cloudfunction outer(x) {
+            cloudfunction inner() {
+                cloudwhile (x < 3) {
+                    cloudprint(x);
+                    cloudvar x = x + 1;
+                }
+                cloudreturn x;
+            }
+            cloudreturn inner();
+        }
+        cloudprint(outer(0));
+        """
+        with self.assertRaisesRegex(NameError, "CloudVar 'x' not found"):
+            run(code)
+
+    def test_function_locals_do_not_leak(self):
+        code = """
+        cloudfunction f() { cloudvar local = 1; cloudreturn local; }
+        cloudprint(f());
+        cloudprint(local);
+        """
+        with self.assertRaisesRegex(NameError, "CloudVar 'local' not found"):
+            run(code)
+
+    def test_nested_function_is_local_to_its_enclosing_function(self):
+        code = """
+        cloudfunction outer(n) {
+            cloudfunction fact(k) {
+                cloudif (k <= 1) { cloudreturn 1; }
+                cloudreturn k * fact(k - 1);
+            }
+            cloudreturn fact(n);
+        }
+        cloudprint(outer(5));
+        cloudprint(fact(5));
+        """
+        with self.assertRaisesRegex(Exception, "CloudFunction 'fact' not defined"):
+            run(code)
+
+    def test_nested_function_shadows_module_function(self):
+        code = """
+        cloudfunction name() { cloudreturn "module"; }
+        cloudfunction outer() {
+            cloudfunction name() { cloudreturn "nested"; }
+            cloudreturn name();
+        }
+        cloudprint(outer());
+        cloudprint(name());
+        """
+        self.assertEqual(run(code), ['nested', 'module'])
+
+    def test_nested_function_called_before_its_definition(self):
+        code = """
+        cloudfunction outer() {
+            cloudreturn inner();
+            cloudfunction inner() { cloudreturn 1; }
+        }
+        outer();
+        """
+        with self.assertRaisesRegex(Exception, "CloudFunction 'inner' not defined"):
+            run(code)
+
+
+class StringLiteralTest(unittest.TestCase):
+    def test_escape_sequences_are_decoded(self):
+        self.assertEqual(run(r'cloudprint("a\nb");'), ['a\nb'])
+        self.assertEqual(run(r'cloudprint("say \"hi\"");'), ['say "hi"'])
+        self.assertEqual(run(r'cloudprint("tab\tback\\slash");'), ['tab\tback\\slash'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,25 +1,50 @@
 # backend/backend_api.py
 import json
+import time
 import logging
+import threading
 from datetime import datetime
 from backend.vfs_manager import VFSManager
 from backend.ai_core import AICore
 from backend.compiler_runner import CompilerRunner
+from backend.compile_jobs import CompileJobQueue
 from backend.peripheral_scanner import PeripheralScanner
+from backend.resource_sampler import ResourceSampler
 from backend.pepx_data_store import PEPxDataStore
+from backend.python_sandbox import PythonSandbox
 from backend.db_manager import DBManager # Import DBManager to pass to other modules
 
 logger = logging.getLogger('Backend_API')
 
+# Pushed compile output is batched: at most one evaluate_js round-trip per job per interval
+COMPILE_OUTPUT_PUSH_INTERVAL = 0.1 # seconds
+
 class BackendAPI:
-  def __init__(self, window, db_file_path="obpi_data.db"):
+  def __init__(self, window, db_file_path="obpi_data.db", db_manager: DBManager = None, vfs_manager: VFSManager = None,
+               resource_sampler: ResourceSampler = None):
+    """
+    :param window: The pywebview window (may be set later).
+    :param db_file_path: Database to open when no storage services are passed in.
+    :param db_manager: Shared DBManager; avoids opening and initializing the database twice.
+    :param vfs_manager: Shared VFSManager; its DBManager is used when db_manager is not given.
+    :param resource_sampler: Shared ResourceSampler; a new one is started when not given.
+    """
     self.window = window
-    self.db = DBManager(db_path=db_file_path)
-    self.vfs_manager = VFSManager(self.db)
+    if db_manager is None:
+      db_manager = vfs_manager.db if vfs_manager is not None else DBManager(db_path=db_file_path)
+    self.db = db_manager
+    self.vfs_manager = vfs_manager if vfs_manager is not None else VFSManager(self.db)
     self.ai_core = AICore()
     self.compiler_runner = CompilerRunner()
-    self.peripheral_scanner = PeripheralScanner()
+    self.compile_job_queue = CompileJobQueue(self.compiler_runner)
+    if resource_sampler is None:
+      resource_sampler = ResourceSampler()
+      resource_sampler.start()
+    self.resource_sampler = resource_sampler
+    self.peripheral_scanner = PeripheralScanner(resource_sampler=self.resource_sampler)
     self.pepx_data_store = PEPxDataStore(self.vfs_manager)
+    self.python_sandbox = PythonSandbox()
+    self.python_sandbox.start() # Workers warm up in the background
     logger.info("Backend API initialized.")
 
   def log_to_python(self, message, level="info"):
@@ -64,6 +89,10 @@ class BackendAPI:
     logger.info(f"API: copy_path_backend called for source: {source}, dest: {destination}")
     return self.vfs_manager.copy_path(source, destination)
 
+  def import_vfs_tree_backend(self, manifest, overwrite=True):
+    logger.info("API: import_vfs_tree_backend called.")
+    return self.vfs_manager.import_tree(manifest, overwrite)
+
   def reset_vfs_backend(self):
     logger.warning("API: reset_vfs_backend called. Resetting VFS and PEPx raw data.")
     vfs_reset_response = self.vfs_manager.reset_vfs()
@@ -157,9 +186,88 @@ class BackendAPI:
     logger.info(f"API: compile_and_run_code for lang: {lang}")
     return self.compiler_runner.compile_and_run_code(lang, code_content, emcc_lang)
 
+  def build_project_backend(self, project_path, lang='c', cflags=None, ldflags=None, run=True):
+    """Builds the C/C++ project in a VFS directory, recompiling only the units affected by changes."""
+    logger.info(f"API: build_project_backend for {lang} project: {project_path}")
+    tree = self.vfs_manager.read_tree(project_path)
+    if "error" in tree:
+      return {"status": "error", "output": tree["error"]}
+    return self.compiler_runner.compile_and_run_project(lang, tree["files"], cflags, ldflags, run)
+
+  def submit_compile_job_backend(self, lang, code_content, emcc_lang=None, push_output=False):
+    """
+    Queues a compile-and-run job. Output can be polled with
+    get_compile_job_output_backend, or, with push_output, is pushed to
+    window.onCompileJobOutput(jobId, chunk) as it is produced, in batches
+    sent at most every COMPILE_OUTPUT_PUSH_INTERVAL seconds.
+    """
+    logger.info(f"API: submit_compile_job_backend for lang: {lang}")
+    try:
+      job_id = self.compile_job_queue.submit(lang, code_content, emcc_lang)
+    except RuntimeError as e:
+      return {"jobId": None, "error": str(e)}
+    if push_output:
+      threading.Thread(target=self._push_compile_output, args=(job_id,), name=f"CompileOutputPush-{job_id[:8]}",
+                       daemon=True).start()
+    return {"jobId": job_id, "error": None}
+
+  def get_compile_job_status_backend(self, job_id):
+    logger.info(f"API: get_compile_job_status_backend for job: {job_id}")
+    status = self.compile_job_queue.status(job_id)
+    return status if status else {"error": f"No such compile job: {job_id}"}
+
+  def get_compile_job_result_backend(self, job_id):
+    logger.info(f"API: get_compile_job_result_backend for job: {job_id}")
+    status = self.compile_job_queue.status(job_id)
+    if not status:
+      return {"error": f"No such compile job: {job_id}"}
+    return {"jobId": job_id, "status": status['status'], "result": self.compile_job_queue.result(job_id)}
+
+  def get_compile_job_output_backend(self, job_id, cursor=0):
+    output = self.compile_job_queue.read_output(job_id, cursor)
+    return output if output is not None else {"error": f"No such compile job: {job_id}"}
+
+  def _push_compile_output(self, job_id):
+    """
+    Forwards a job's output to the UI until the job finishes. Runs on its own
+    thread and reads the job's OutputStream like a poller would, so a slow UI
+    round-trip never holds up the threads draining the program's pipes.
+    """
+    cursor = 0
+    while True:
+      output = self.compile_job_queue.read_output(job_id, cursor, timeout=COMPILE_OUTPUT_PUSH_INTERVAL)
+      if output is None:
+        return
+      cursor = output['cursor']
+      if output['chunks'] and self.window:
+        try:
+          self.window.evaluate_js(
+            f"if (window.onCompileJobOutput) {{ for (const chunk of {json.dumps(output['chunks'])}) "
+            f"window.onCompileJobOutput({json.dumps(job_id)}, chunk); }}"
+          )
+        except Exception as e:
+          logger.warning(f"Could not push compile output for job {job_id}: {e}")
+      if output['finished']:
+        return
+      time.sleep(COMPILE_OUTPUT_PUSH_INTERVAL) # Let output accumulate into the next batch
+
+  def cancel_compile_job_backend(self, job_id):
+    logger.info(f"API: cancel_compile_job_backend for job: {job_id}")
+    if self.compile_job_queue.cancel(job_id):
+      return {"status": "success"}
+    return {"error": f"Compile job not found or already finished: {job_id}"}
+
+  def list_toolchains_backend(self, refresh=False):
+    logger.info(f"API: list_toolchains_backend called (refresh={refresh})")
+    try:
+      return {"toolchains": self.compiler_runner.list_toolchains(refresh), "error": None}
+    except Exception as e:
+      logger.error(f"Error listing toolchains: {e}")
+      return {"toolchains": [], "error": str(e)}
+
   def compile_hex_to_webgl_backend(self, hex_code):
     logger.info("API: compile_hex_to_webgl_backend called.")
-    # This calls the dedicated conceptual script via compiler_runner
+    # Runs the conceptual compiler in-process via compiler_runner; repeated inputs are memoized
     return self.compiler_runner.compile_and_run_code('hex_to_webgl', hex_code)
 
 
@@ -168,6 +276,11 @@ class BackendAPI:
     logger.info("API: get_system_info_backend called.")
     return self.peripheral_scanner.get_system_info()
 
+  def get_resource_history_backend(self, limit=None):
+    logger.info(f"API: get_resource_history_backend called (limit={limit}).")
+    return {"samples": self.resource_sampler.history(limit), "interval": self.resource_sampler.interval,
+            "error": None if self.resource_sampler.available else "psutil not installed. Resource history unavailable."}
+
   def get_usb_devices_backend(self):
     logger.info("API: get_usb_devices_backend called.")
     return self.peripheral_scanner.get_usb_devices()
@@ -195,17 +308,21 @@ class BackendAPI:
   def pepx_sync_metadata_backend(self, files_dict):
     logger.info("API: pepx_sync_metadata_backend called. Syncing metadata from JS.")
     try:
-      self.db.execute_query("DELETE FROM pepx_metadata") # Clear existing
-      for file_id, meta in files_dict.items():
-        self.db.execute_query(
+      rows = [
+        (meta['id'], meta['name'], meta['path'], meta['type'], meta['size'],
+         meta.get('storedByteLength', 0), meta['created'], meta['modified'])
+        for meta in files_dict.values()
+      ]
+      # Clear and re-insert in one transaction: a single commit for the whole sync
+      with self.db.transaction():
+        self.db.execute_query("DELETE FROM pepx_metadata")
+        self.db.execute_many(
           """
           INSERT INTO pepx_metadata (id, name, path, type, size, stored_byte_length, created, modified)
           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
           """,
-          (meta['id'], meta['name'], meta['path'], meta['type'], meta['size'],
-           meta.get('storedByteLength', 0), meta['created'], meta['modified'])
+          rows
         )
-      self.db.conn.commit()
       return {"status": "success"}
     except Exception as e:
       logger.error(f"Error syncing PEPx metadata: {e}")
@@ -215,7 +332,6 @@ class BackendAPI:
     logger.warning("API: _reset_pepx_metadata_backend called. Deleting all PEPx metadata.")
     try:
       self.db.execute_query("DELETE FROM pepx_metadata")
-      self.db.conn.commit()
       return {"status": "success", "message": "PEPx metadata reset."}
     except Exception as e:
       logger.error(f"Error resetting PEPx metadata: {e}")
@@ -225,45 +341,56 @@ class BackendAPI:
     logger.info(f"API: pepx_store_raw_data_backend for ID: {file_id}")
     return self.pepx_data_store.store_raw_data(file_id, base64_data)
 
-  def pepx_get_raw_data_backend(self, file_id):
-    logger.info(f"API: pepx_get_raw_data_backend for ID: {file_id}")
-    return self.pepx_data_store.get_raw_data(file_id)
+  def pepx_get_raw_data_backend(self, file_id, offset=0, length=None):
+    logger.info(f"API: pepx_get_raw_data_backend for ID: {file_id} (offset={offset}, length={length})")
+    return self.pepx_data_store.get_raw_data(file_id, offset, length)
+
+  def pepx_begin_upload_backend(self, file_id, total_size=None):
+    logger.info(f"API: pepx_begin_upload_backend for ID: {file_id}")
+    return self.pepx_data_store.begin_upload(file_id, total_size)
+
+  def pepx_append_chunk_backend(self, upload_id, offset, base64_chunk, checksum):
+    logger.info(f"API: pepx_append_chunk_backend for upload: {upload_id} (offset={offset})")
+    return self.pepx_data_store.append_chunk(upload_id, offset, base64_chunk, checksum)
+
+  def pepx_upload_status_backend(self, upload_id):
+    logger.info(f"API: pepx_upload_status_backend for upload: {upload_id}")
+    return self.pepx_data_store.get_upload_status(upload_id)
+
+  def pepx_commit_upload_backend(self, upload_id):
+    logger.info(f"API: pepx_commit_upload_backend for upload: {upload_id}")
+    return self.pepx_data_store.commit_upload(upload_id)
+
+  def pepx_abort_upload_backend(self, upload_id):
+    logger.info(f"API: pepx_abort_upload_backend for upload: {upload_id}")
+    return self.pepx_data_store.abort_upload(upload_id)
 
   # --- Python Code Execution API Call ---
-  def execute_python_code(self, code):
+  def execute_python_code(self, code, session_id=None, timeout=None):
     """
     Executes Python code provided by the frontend and returns the result.
 
     Args:
         code (str): The Python code to execute
+        session_id (str): Cells with the same session id share variables, like a notebook
+        timeout (float): Seconds before the code is killed; defaults to the sandbox's timeout
 
     Returns:
-        dict: A dictionary with status ('success' or 'error') and output (str)
+        dict: A dictionary with status ('success' or 'error'), output (str) and
+              result (repr of a trailing expression, or None)
     """
-    logger.info("API: execute_python_code called.")
-    import sys
-    from io import StringIO
-
-    # Capture stdout and stderr
-    old_stdout = sys.stdout
-    old_stderr = sys.stderr
-    redirected_output = StringIO()
-    redirected_error = StringIO()
-    sys.stdout = redirected_output
-    sys.stderr = redirected_error
-
+    logger.info(f"API: execute_python_code called (session: {session_id}).")
     try:
-        # Execute the code
-        exec(code)
-        output = redirected_output.getvalue()
-        return {"status": "success", "output": output}
+      return self.python_sandbox.execute(code, session_id, timeout)
     except Exception as e:
-        # Get the error message
-        error_output = redirected_error.getvalue()
-        if not error_output:
-            error_output = str(e)
-        return {"status": "error", "output": error_output}
-    finally:
-        # Restore stdout and stderr
-        sys.stdout = old_stdout
-        sys.stderr = old_stderr
+      logger.error(f"Error executing Python code: {e}", exc_info=True)
+      return {"status": "error", "output": str(e), "result": None}
+
+  def kill_python_session_backend(self, session_id):
+    logger.info(f"API: kill_python_session_backend for session: {session_id}")
+    if self.python_sandbox.kill_session(session_id):
+      return {"status": "success", "message": f"Python session {session_id} killed."}
+    return {"error": f"No such Python session: {session_id}"}
+
+  def list_python_sessions_backend(self):
+    return {"sessions": self.python_sandbox.list_sessions(), "error": None}
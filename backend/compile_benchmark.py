@@ -0,0 +1,177 @@
+# backend/compile_benchmark.py
+# Benchmarks CompilerRunner.compile_and_run_code across languages and workload shapes.
+#
+#   python -m backend.compile_benchmark --output bench.json
+#   python -m backend.compile_benchmark --langs c rust --repeat 5 --concurrency 8
+#
+# Every combination of language, source size (small/large), cache state
+# (cold: empty compile cache, warm: executable already cached) and submission
+# mode (serial, or 'concurrency' runs at once) is measured. Results are JSON,
+# with min/median/max per phase (setup, write, compile, exec, teardown), so
+# runs from different releases can be diffed. Missing toolchains are skipped.
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from backend.compile_cache import CompileCache
+from backend.compiler_runner import CompilerRunner
+
+logger = logging.getLogger('Compile_Benchmark')
+
+PHASES = ('setup', 'write', 'compile', 'exec', 'teardown')
+COMMENT_PREFIX = {'c': '//', 'cpp': '//', 'rust': '//', 'go': '//', 'lua': '--'}
+
+SMALL_PROGRAMS = {
+  'c': '#include <stdio.h>\nint main(void) {\n  long sum = 0;\n  for (int i = 0; i < 1000000; i++) sum += i % 7;\n  printf("%ld\\n", sum);\n  return 0;\n}\n',
+  'cpp': '#include <algorithm>\n#include <iostream>\n#include <vector>\nint main() {\n  std::vector<int> v;\n  for (int i = 0; i < 100000; i++) v.push_back((i * 7919) % 100003);\n  std::sort(v.begin(), v.end());\n  std::cout << v[v.size() / 2] << std::endl;\n}\n',
+  'rust': 'fn main() {\n    let sum: u64 = (0..1_000_000u64).map(|i| i % 7).sum();\n    println!("{}", sum);\n}\n',
+  'go': 'package main\n\nimport "fmt"\n\nfunc main() {\n\tsum := 0\n\tfor i := 0; i < 1000000; i++ {\n\t\tsum += i % 7\n\t}\n\tfmt.Println(sum)\n}\n',
+  'lua': 'local sum = 0\nfor i = 0, 999999 do sum = sum + i % 7 end\nprint(sum)\n',
+}
+
+def large_program(lang, function_count):
+  """A source with many small functions, so compile time dominates."""
+  n = range(function_count)
+  if lang in ('c', 'cpp'):
+    header = '#include <stdio.h>\n'
+    functions = ''.join(f'static long f{i}(long x) {{ return x * {i} + {i % 13}; }}\n' for i in n)
+    calls = ''.join(f'  sum += f{i}(sum % 1000);\n' for i in n)
+    return f'{header}{functions}int main(void) {{\n  long sum = 1;\n{calls}  printf("%ld\\n", sum);\n  return 0;\n}}\n'
+  if lang == 'rust':
+    functions = ''.join(f'fn f{i}(x: i64) -> i64 {{ x.wrapping_mul({i}).wrapping_add({i % 13}) }}\n' for i in n)
+    calls = ''.join(f'    sum = sum.wrapping_add(f{i}(sum % 1000));\n' for i in n)
+    return f'{functions}fn main() {{\n    let mut sum: i64 = 1;\n{calls}    println!("{{}}", sum);\n}}\n'
+  if lang == 'go':
+    functions = ''.join(f'func f{i}(x int64) int64 {{ return x*{i} + {i % 13} }}\n' for i in n)
+    calls = ''.join(f'\tsum += f{i}(sum % 1000)\n' for i in n)
+    return f'package main\n\nimport "fmt"\n\n{functions}func main() {{\n\tvar sum int64 = 1\n{calls}\tfmt.Println(sum)\n}}\n'
+  if lang == 'lua':
+    functions = ''.join(f'local function f{i}(x) return x * {i} + {i % 13} end\n' for i in range(min(function_count, 150))) # Lua allows 200 locals
+    calls = ''.join(f'sum = f{i}(sum % 1000)\n' for i in range(min(function_count, 150)))
+    return f'{functions}local sum = 1\n{calls}print(sum)\n'
+  raise ValueError(f"No large program for {lang}")
+
+def _variant(lang, source, tag):
+  # A trailing comment changes the compile cache key without changing the program
+  return f"{source}{COMMENT_PREFIX[lang]} variant {tag}\n"
+
+def _summarize(values):
+  values = [v for v in values if v is not None]
+  if not values:
+    return None
+  return {"min": round(min(values), 6), "median": round(statistics.median(values), 6), "max": round(max(values), 6)}
+
+class CompileBenchmark:
+  def __init__(self, langs=None, repeat=3, concurrency=4, large_functions=2000, sizes=('small', 'large')):
+    self.cache_dir = tempfile.mkdtemp(prefix='obpi-compile-bench-')
+    self.runner = CompilerRunner(compile_cache=CompileCache(self.cache_dir, max_bytes=1024 * 1024 * 1024))
+    self.langs = langs or list(SMALL_PROGRAMS)
+    self.repeat = repeat
+    self.concurrency = concurrency
+    self.large_functions = large_functions
+    self.sizes = sizes
+
+  def _measure(self, lang, sources):
+    """Runs sources (all at once when there are several) and returns per-run records."""
+    def run_one(source):
+      started = time.perf_counter()
+      result = self.runner.compile_and_run_code(lang, source)
+      return result, time.perf_counter() - started
+    with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+      return list(executor.map(run_one, sources))
+
+  def _scenario(self, lang, size, source, cache_state, mode):
+    batch_size = self.concurrency if mode == 'concurrent' else 1
+    records = []
+    batch_walls = []
+    for iteration in range(self.repeat):
+      batch = [_variant(lang, source, f"{iteration}-{i}") for i in range(batch_size)]
+      if cache_state == 'cold':
+        self.runner.compile_cache.clear()
+      else:
+        self._measure(lang, batch[:1]) # Warm the cache; every run in the batch shares the source
+        batch = batch[:1] * batch_size
+      batch_started = time.perf_counter()
+      records.extend(self._measure(lang, batch))
+      batch_walls.append(time.perf_counter() - batch_started)
+    statuses = {}
+    for result, _ in records:
+      statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    scenario = {
+      "lang": lang, "size": size, "cache": cache_state, "mode": mode, "concurrency": batch_size,
+      "runs": len(records), "statuses": statuses,
+      "wall": _summarize([wall for _, wall in records]),
+      "batchWall": _summarize(batch_walls), # Time until the whole batch finished
+      "phases": {phase: _summarize([result.get('timings', {}).get(phase) for result, _ in records]) for phase in PHASES},
+      "cacheHits": sum(1 for result, _ in records if result.get('cache_hit')),
+    }
+    failed = next((result for result, _ in records if result['status'] != 'success'), None)
+    if failed:
+      scenario["firstError"] = str(failed.get('output'))[:500]
+    return scenario
+
+  def run(self):
+    toolchains = {toolchain['lang']: toolchain for toolchain in self.runner.list_toolchains()}
+    report = {
+      "meta": {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "repeat": self.repeat,
+        "concurrency": self.concurrency,
+        "largeFunctions": self.large_functions,
+        "toolchains": {lang: toolchains[lang]['version'] for lang in self.langs if lang in toolchains},
+      },
+      "skipped": {},
+      "results": [],
+    }
+    try:
+      for lang in self.langs:
+        toolchain = toolchains.get(lang)
+        if lang not in SMALL_PROGRAMS or not toolchain or not toolchain['available']:
+          report["skipped"][lang] = "no benchmark program" if lang not in SMALL_PROGRAMS else "toolchain not installed"
+          logger.warning(f"Skipping {lang}: {report['skipped'][lang]}.")
+          continue
+        for size in self.sizes:
+          source = SMALL_PROGRAMS[lang] if size == 'small' else large_program(lang, self.large_functions)
+          for cache_state in ('cold', 'warm'):
+            for mode in ('serial', 'concurrent'):
+              logger.info(f"Benchmarking {lang} {size} {cache_state} {mode}...")
+              report["results"].append(self._scenario(lang, size, source, cache_state, mode))
+    finally:
+      shutil.rmtree(self.cache_dir, ignore_errors=True)
+    return report
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Benchmark CompilerRunner across languages and workload shapes.")
+  parser.add_argument('--langs', nargs='+', default=list(SMALL_PROGRAMS), help="Languages to benchmark.")
+  parser.add_argument('--sizes', nargs='+', default=['small', 'large'], choices=['small', 'large'])
+  parser.add_argument('--repeat', type=int, default=3, help="Iterations per scenario.")
+  parser.add_argument('--concurrency', type=int, default=4, help="Simultaneous runs in concurrent scenarios.")
+  parser.add_argument('--large-functions', type=int, default=2000, help="Functions in the large programs.")
+  parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+  args = parser.parse_args(argv)
+
+  logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+  logger.setLevel(logging.INFO)
+  report = CompileBenchmark(args.langs, args.repeat, args.concurrency, args.large_functions, args.sizes).run()
+  text = json.dumps(report, indent=2)
+  if args.output:
+    with open(args.output, 'w', encoding='utf-8') as f:
+      f.write(text + "\n")
+    logger.info(f"Benchmark report written to {args.output}")
+  else:
+    print(text)
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,129 @@
+# backend/compile_cache.py
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+import uuid
+
+logger = logging.getLogger('Compile_Cache')
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.obpi_data', 'compile_cache')
+
+class CompileCache:
+  """
+  On-disk cache of compiled executables keyed by a hash of everything that
+  affects the build output: language, compiler version, flags and source.
+  Entries are evicted least-recently-used once the cache exceeds max_bytes.
+
+  Each entry is a directory '<key>/' holding the artifact and a 'meta.json'
+  with the compiler's own stdout/stderr, so cache hits report the same
+  compile output as the original build.
+  """
+  META_FILE = 'meta.json'
+
+  def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=256 * 1024 * 1024):
+    self.cache_dir = cache_dir
+    self.max_bytes = max_bytes
+    self._lock = threading.Lock()
+    os.makedirs(self.cache_dir, exist_ok=True)
+    logger.info(f"Compile cache at '{self.cache_dir}' (max {max_bytes // (1024 * 1024)} MB).")
+
+  @staticmethod
+  def make_key(lang, compiler_version, flags, source):
+    hasher = hashlib.sha256()
+    for part in (lang, compiler_version or '', json.dumps(list(flags)), source):
+      data = part.encode('utf-8') if isinstance(part, str) else part
+      # Length-prefix every part so ('ab', 'c') and ('a', 'bc') hash differently
+      hasher.update(len(data).to_bytes(8, 'little'))
+      hasher.update(data)
+    return hasher.hexdigest()
+
+  def _entry_dir(self, key):
+    return os.path.join(self.cache_dir, key)
+
+  def lookup(self, key, artifact_name, dest_dir=None):
+    """
+    Returns {'artifact': path, 'compile_stdout': str, 'compile_stderr': str}
+    for a cached build, or None. A hit marks the entry as recently used.
+    :param dest_dir: Hardlink (or copy) the artifact into this directory and return
+                     that path, so a concurrent eviction cannot delete it while in use.
+    """
+    entry_dir = self._entry_dir(key)
+    artifact_path = os.path.join(entry_dir, artifact_name)
+    meta_path = os.path.join(entry_dir, self.META_FILE)
+    try:
+      with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+      if dest_dir is not None:
+        artifact_path = self._checkout(artifact_path, dest_dir)
+      elif not os.path.isfile(artifact_path):
+        return None
+      os.utime(entry_dir) # LRU clock: the directory mtime is the last use
+    except (OSError, ValueError):
+      return None
+    return {"artifact": artifact_path, "compile_stdout": meta.get("compile_stdout", ""),
+            "compile_stderr": meta.get("compile_stderr", "")}
+
+  def _checkout(self, artifact_path, dest_dir):
+    # Under the eviction lock, so the entry cannot disappear between the check and the link
+    os.makedirs(dest_dir, exist_ok=True)
+    dest_path = os.path.join(dest_dir, os.path.basename(artifact_path))
+    with self._lock:
+      try:
+        os.link(artifact_path, dest_path)
+      except OSError:
+        shutil.copy2(artifact_path, dest_path) # Cache and dest_dir on different filesystems
+    return dest_path
+
+  def store(self, key, artifact_path, compile_stdout="", compile_stderr=""):
+    """
+    Copies a freshly built artifact into the cache and returns its lookup() entry
+    (or None). Keep using the original artifact_path; the entry may be evicted at any time.
+    The entry is staged in a temporary directory and renamed into place, so
+    concurrent builds of the same key never expose a half-written entry.
+    """
+    artifact_name = os.path.basename(artifact_path)
+    staging_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+    try:
+      os.makedirs(staging_dir)
+      shutil.copy2(artifact_path, os.path.join(staging_dir, artifact_name))
+      with open(os.path.join(staging_dir, self.META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"compile_stdout": compile_stdout, "compile_stderr": compile_stderr}, f)
+      try:
+        os.rename(staging_dir, self._entry_dir(key))
+      except OSError:
+        # Another build stored the same key first; keep theirs
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    except OSError as e:
+      logger.warning(f"Could not store compile cache entry {key[:12]}: {e}")
+      shutil.rmtree(staging_dir, ignore_errors=True)
+      return None
+    self._evict()
+    return self.lookup(key, artifact_name)
+
+  def _evict(self):
+    """Removes least-recently-used entries until the cache fits in max_bytes."""
+    with self._lock:
+      entries = []
+      total_bytes = 0
+      for name in os.listdir(self.cache_dir):
+        entry_dir = os.path.join(self.cache_dir, name)
+        if name.startswith('.tmp-') or not os.path.isdir(entry_dir):
+          continue
+        size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+        entries.append((os.stat(entry_dir).st_mtime, size, entry_dir))
+        total_bytes += size
+      for _, size, entry_dir in sorted(entries):
+        if total_bytes <= self.max_bytes:
+          break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_bytes -= size
+        logger.info(f"Evicted compile cache entry '{os.path.basename(entry_dir)[:12]}' ({size} bytes).")
+
+  def clear(self):
+    with self._lock:
+      shutil.rmtree(self.cache_dir, ignore_errors=True)
+      os.makedirs(self.cache_dir, exist_ok=True)
+    logger.info("Compile cache cleared.")
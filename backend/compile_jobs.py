@@ -0,0 +1,160 @@
+# backend/compile_jobs.py
+import os
+import uuid
+import logging
+import threading
+from collections import deque, Counter, OrderedDict
+from datetime import datetime
+from backend.output_stream import OutputStream
+
+logger = logging.getLogger('Compile_Jobs')
+
+# Heavy toolchains get fewer concurrent slots than the worker pool allows
+DEFAULT_LANGUAGE_LIMITS = {'rust': 2, 'haskell': 2, 'csharp': 2}
+
+class CompileJob:
+  def __init__(self, lang, code_content, emcc_lang=None, max_output_chars=None):
+    self.job_id = uuid.uuid4().hex
+    self.lang = lang
+    self.code_content = code_content
+    self.emcc_lang = emcc_lang
+    self.status = 'queued' # queued -> running -> done | cancelled
+    self.result = None
+    self.cancel_event = threading.Event()
+    self.output = OutputStream(max_chars=max_output_chars) # Live compiler/program output
+    self.submitted_at = datetime.now().isoformat()
+    self.started_at = None
+    self.finished_at = None
+
+  def to_dict(self):
+    return {
+      "jobId": self.job_id,
+      "lang": self.lang,
+      "status": self.status,
+      "submittedAt": self.submitted_at,
+      "startedAt": self.started_at,
+      "finishedAt": self.finished_at,
+    }
+
+class CompileJobQueue:
+  """
+  Runs CompilerRunner.compile_and_run_code on a bounded pool of worker threads.
+
+  Jobs start in submission order, except that a job whose language is at its
+  concurrency limit is skipped until a slot frees up, so a queue of slow Rust
+  builds does not hold back a quick C run.
+  """
+  def __init__(self, compiler_runner, max_workers=None, language_limits=None, max_finished_jobs=200):
+    self.compiler_runner = compiler_runner
+    self.max_workers = max_workers or os.cpu_count() or 2
+    self.language_limits = dict(DEFAULT_LANGUAGE_LIMITS if language_limits is None else language_limits)
+    self.max_finished_jobs = max_finished_jobs
+    self._cond = threading.Condition()
+    self._pending = deque()
+    self._jobs = OrderedDict() # job_id -> CompileJob, oldest first
+    self._running_per_lang = Counter()
+    self._shutdown = False
+    self._workers = [threading.Thread(target=self._worker, name=f"CompileWorker-{i}", daemon=True)
+                     for i in range(self.max_workers)]
+    for worker in self._workers:
+      worker.start()
+    logger.info(f"Compile job queue started with {self.max_workers} workers (limits: {self.language_limits}).")
+
+  def submit(self, lang, code_content, emcc_lang=None):
+    """Queues a compile-and-run job and returns its job id immediately."""
+    job = CompileJob(lang, code_content, emcc_lang, self.compiler_runner.max_output_chars)
+    with self._cond:
+      if self._shutdown:
+        raise RuntimeError("Compile job queue is shut down.")
+      self._jobs[job.job_id] = job
+      self._pending.append(job)
+      self._cond.notify()
+    logger.info(f"Compile job {job.job_id} queued for {lang}.")
+    return job.job_id
+
+  def status(self, job_id):
+    with self._cond:
+      job = self._jobs.get(job_id)
+      return job.to_dict() if job else None
+
+  def result(self, job_id):
+    """Returns the job's compile_and_run_code result, or None while it has not finished."""
+    with self._cond:
+      job = self._jobs.get(job_id)
+      return job.result if job else None
+
+  def read_output(self, job_id, cursor=0, timeout=None):
+    """Returns output chunks produced since 'cursor' (see OutputStream.read), or None for unknown jobs."""
+    with self._cond:
+      job = self._jobs.get(job_id)
+    return job.output.read(cursor, timeout) if job else None
+
+  def cancel(self, job_id):
+    """
+    Cancels a job. Queued jobs are dropped; running jobs have their compiler or
+    program killed. Returns False if the job is unknown or already finished.
+    """
+    with self._cond:
+      job = self._jobs.get(job_id)
+      if not job or job.status in ('done', 'cancelled'):
+        return False
+      if job.status == 'queued':
+        self._pending.remove(job)
+        self._finish(job, 'cancelled', {"status": "cancelled", "output": "Cancelled before it started."})
+      else:
+        job.cancel_event.set() # The worker records the result
+    logger.info(f"Compile job {job_id} cancelled.")
+    return True
+
+  def shutdown(self):
+    """Stops the workers after their current jobs; queued jobs are cancelled."""
+    with self._cond:
+      self._shutdown = True
+      while self._pending:
+        self._finish(self._pending.popleft(), 'cancelled', {"status": "cancelled", "output": "Job queue shut down."})
+      for job in self._jobs.values():
+        job.cancel_event.set()
+      self._cond.notify_all()
+
+  def _next_runnable_job(self):
+    for job in self._pending:
+      limit = self.language_limits.get(job.lang)
+      if limit is None or self._running_per_lang[job.lang] < limit:
+        self._pending.remove(job)
+        return job
+    return None
+
+  def _finish(self, job, status, result):
+    # Called with self._cond held
+    job.status = status
+    job.result = result
+    job.finished_at = datetime.now().isoformat()
+    job.output.close()
+    finished = [j for j in self._jobs.values() if j.status in ('done', 'cancelled')]
+    for old_job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+      del self._jobs[old_job.job_id]
+
+  def _worker(self):
+    while True:
+      with self._cond:
+        job = self._next_runnable_job()
+        while job is None and not self._shutdown:
+          self._cond.wait()
+          job = self._next_runnable_job()
+        if job is None:
+          return
+        job.status = 'running'
+        job.started_at = datetime.now().isoformat()
+        self._running_per_lang[job.lang] += 1
+
+      try:
+        result = self.compiler_runner.compile_and_run_code(job.lang, job.code_content, job.emcc_lang,
+                                                           cancel_event=job.cancel_event, output_stream=job.output)
+      except Exception as e:
+        logger.error(f"Compile job {job.job_id} failed: {e}", exc_info=True)
+        result = {"status": "error", "output": f"An unexpected error occurred: {str(e)}"}
+
+      with self._cond:
+        self._running_per_lang[job.lang] -= 1
+        self._finish(job, 'cancelled' if result.get('status') == 'cancelled' else 'done', result)
+        self._cond.notify_all() # A language slot freed up
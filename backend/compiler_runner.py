@@ -5,12 +5,91 @@ import sys
 import platform
 import logging
 import tempfile
-import json # Import json for structured output
+import threading
+import time
+import signal
+import hashlib
+from collections import OrderedDict
+from backend.compile_cache import CompileCache
+from backend.toolchain_registry import ToolchainRegistry
+from backend.project_builder import ProjectBuilder
+from backend.webgl_hex_compiler_concept import build_webgl_data
+from backend.output_stream import OutputStream, pump_pipe, DEFAULT_MAX_CHARS
+
+try:
+  import resource # POSIX only
+except ImportError:
+  resource = None
 
 logger = logging.getLogger('Compiler_Runner')
 
+# Limits for running user code: compiled executables and script languages.
+# memory_mb caps the address space (RLIMIT_AS); Linux does not enforce RLIMIT_RSS.
+# max_processes is added to the processes the user already runs, since Linux
+# counts RLIMIT_NPROC per user; it does not apply when the backend runs as root.
+DEFAULT_RUN_LIMITS = {
+  'wall_seconds': 10,
+  'cpu_seconds': 10,
+  'memory_mb': 512,
+  'file_size_mb': 64,
+  'max_processes': 64,
+}
+# Runtimes that reserve huge virtual address ranges cannot run under an RLIMIT_AS cap.
+# 'go run' and 'dotnet run' also build before running, so they get more time.
+LANGUAGE_RUN_LIMITS = {
+  'go': {'wall_seconds': 60, 'cpu_seconds': 60, 'memory_mb': None},
+  'csharp': {'wall_seconds': 60, 'cpu_seconds': 60, 'memory_mb': None},
+  'haskell': {'memory_mb': None},
+}
+DEFAULT_COMPILE_TIMEOUT = 120 # seconds; compilers run without rlimits
+
+# A failed allocation under RLIMIT_AS is not a signal: the program sees NULL/ENOMEM
+# and reports it (or crashes) itself, so it is recognised by these messages.
+OUT_OF_MEMORY_MARKERS = ('MemoryError', 'bad_alloc', 'Cannot allocate memory', 'out of memory',
+                         'memory allocation of', 'Out of memory', 'heap exhausted')
+
+# Sets the limits and then execs the program, so they apply from its first instruction
+RLIMIT_SHIM = os.path.join(os.path.dirname(__file__), 'rlimit_exec.py')
+
+def _limited_command(cmd, limits, status_fd):
+  """Wraps cmd in the rlimit exec shim; see rlimit_exec.py for the argument layout."""
+  megabyte = 1024 * 1024
+  return [sys.executable, '-I', '-S', RLIMIT_SHIM, str(status_fd),
+          str(int(limits['cpu_seconds'] + 0.999) if limits.get('cpu_seconds') else 0),
+          str(limits['memory_mb'] * megabyte if limits.get('memory_mb') else 0),
+          str(limits['file_size_mb'] * megabyte if limits.get('file_size_mb') else 0),
+          str(limits.get('max_processes') or 0), '--'] + list(cmd)
+
+def _read_status(fd):
+  """Reads the shim's status pipe to EOF; empty means the exec succeeded."""
+  chunks = []
+  while True:
+    chunk = os.read(fd, 4096)
+    if not chunk:
+      return b''.join(chunks).decode('utf-8', 'replace')
+    chunks.append(chunk)
+
+def _peak_rss_kb(pid):
+  """VmHWM of a running process from /proc, or None where that is not available."""
+  try:
+    with open(f'/proc/{pid}/status', 'rb') as f:
+      for line in f:
+        if line.startswith(b'VmHWM:'):
+          return int(line.split()[1])
+  except (OSError, ValueError):
+    pass
+  return None
+
+class CompileCancelled(Exception):
+  """Raised inside a compile/run when its cancel_event is set."""
+
 class CompilerRunner:
-  def __init__(self):
+  def __init__(self, compile_cache: CompileCache = None, max_output_chars=DEFAULT_MAX_CHARS,
+               run_limits=None, compile_timeout=DEFAULT_COMPILE_TIMEOUT, toolchains: ToolchainRegistry = None):
+    """
+    :param run_limits: Optional {lang: {limit: value}} overrides of DEFAULT_RUN_LIMITS /
+                       LANGUAGE_RUN_LIMITS; a value of None disables that limit.
+    """
     self.compilers = {
       'c': {'cmd': 'gcc', 'flags': ['-o', 'output.exe'], 'ext': '.c', 'run_cmd': './output.exe'},
       'cpp': {'cmd': 'g++', 'flags': ['-o', 'output.exe'], 'ext': '.cpp', 'run_cmd': './output.exe'},
@@ -22,132 +101,371 @@ class CompilerRunner:
       'fortran': {'cmd': 'gfortran', 'flags': ['-o', 'output.exe'], 'ext': '.f90', 'run_cmd': './output.exe'},
       'lua': {'cmd': 'lua', 'flags': [], 'ext': '.lua', 'is_script': True},
       'emcc': {'cmd': 'emcc', 'flags': ['-o', 'output.html'], 'ext_map': {'c':'.c', 'cpp':'.cpp'}, 'is_emcc': True},
-      # Special entry for hex_to_webgl, it points to our conceptual script
-      'hex_to_webgl': {'cmd': sys.executable, 'script': os.path.join(os.path.dirname(__file__), 'webgl_hex_compiler_concept.py'), 'is_custom_script': True}
+      # hex_to_webgl runs in-process through 'handler'; 'cmd' is the interpreter it runs on
+      'hex_to_webgl': {'cmd': sys.executable, 'handler': build_webgl_data}
     }
-    self._check_compiler_paths()
-
-  def _check_compiler_paths(self):
-    """Checks if required compilers are in PATH and logs their status."""
-    logger.info("Checking external compiler availability...")
-    for lang, info in self.compilers.items():
-      if 'cmd' in info and not info.get('is_script') and not info.get('is_emcc') and not info.get('is_custom_script'):
-        try:
-          subprocess.run([info['cmd'], '--version'], capture_output=True, check=True, text=True, timeout=5)
-          logger.info(f"Compiler '{info['cmd']}' for {lang.upper()} found.")
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-          logger.warning(f"Compiler '{info['cmd']}' for {lang.upper()} not found or not callable. "
-                         f"Please ensure it's installed and in your system's PATH to use this feature.")
-      elif info.get('is_emcc'):
-        try:
-          subprocess.run([info['cmd'], '--version'], capture_output=True, check=True, text=True, timeout=5)
-          logger.info(f"Compiler '{info['cmd']}' (Emscripten) found.")
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-          logger.warning(f"Emscripten compiler '{info['cmd']}' not found. Emcc compilation will be conceptual.")
-
-
-  def compile_and_run_code(self, lang, code_content, emcc_lang=None):
+    self._handler_results = OrderedDict() # (lang, sha256 of input) -> parsed handler output, LRU order
+    self._handler_results_lock = threading.Lock()
+    self.max_handler_results = 256
+    self.compile_cache = compile_cache if compile_cache is not None else CompileCache()
+    self.max_output_chars = max_output_chars # Cap on output kept per compiler/program run
+    self.run_limits = run_limits or {}
+    self.compile_timeout = compile_timeout
+    # Toolchains are probed in the background; a compile that needs one first waits for its probe only
+    self.toolchains = toolchains if toolchains is not None else ToolchainRegistry(self.compilers)
+    self.toolchains.probe_in_background()
+    self.project_builder = ProjectBuilder(self)
+
+  def list_toolchains(self, refresh=False):
+    """Returns [{lang, cmd, path, version, available, cached}] for every supported language."""
+    return self.toolchains.list_toolchains(refresh)
+
+  def get_run_limits(self, lang):
+    """Returns the effective limits for running user code of the given language."""
+    limits = dict(DEFAULT_RUN_LIMITS)
+    limits.update(LANGUAGE_RUN_LIMITS.get(lang, {}))
+    limits.update(self.run_limits.get(lang, {}))
+    return limits
+
+  def compile_and_run_code(self, lang, code_content, emcc_lang=None, cancel_event=None, output_stream=None):
+    """
+    Compiles (if needed) and runs a single source file.
+    :param cancel_event: Optional threading.Event; setting it kills the running
+                         compiler or program and returns status 'cancelled'.
+    :param output_stream: Optional OutputStream that receives compiler and program
+                          output live, as it is produced. The caller closes it.
+    Runs of user code are bounded by get_run_limits(lang); their results carry
+    'usage' (elapsed_seconds, cpu_seconds, peak_rss_kb) and, when a limit
+    was hit, 'limit_exceeded'. 'timings' gives the seconds spent per phase
+    (setup, write, compile, exec, teardown).
+    """
     logger.info(f"Attempting to compile and run {lang.upper()} code.")
     compiler_info = self.compilers.get(lang)
 
     if not compiler_info:
       return {"status": "error", "output": f"Unsupported language: {lang}"}
+    if compiler_info.get('handler'):
+      return self._run_handler(lang, compiler_info['handler'], code_content)
 
-    # Create a temporary directory for compilation/execution
+    # Create a temporary directory for compilation/execution; phase timings are reported with the result
+    timings = {}
+    phase_started = time.perf_counter()
     with tempfile.TemporaryDirectory() as tmpdir:
-      try:
-        if compiler_info.get('is_custom_script'):
-          # Special handling for custom Python scripts like hex_to_webgl
-          command = [compiler_info['cmd'], compiler_info['script'], code_content]
-          logger.info(f"Executing custom script: {' '.join(command)}")
-          # For hex_to_webgl, we expect JSON output from the script
-          result = subprocess.run(command, capture_output=True, text=True, check=False, cwd=os.getcwd())
-
-          if result.returncode != 0:
-            logger.error(f"Custom script failed: {result.stderr}")
-            return {"status": "error", "output": f"Script Error:\n{result.stdout}\n{result.stderr}"}
-          else:
-            try:
-              # Attempt to parse the output as JSON
-              json_output = json.loads(result.stdout.strip())
-              logger.info(f"Custom script returned JSON: {json_output}")
-              return {"status": "success", "output": json_output}
-            except json.JSONDecodeError:
-              logger.error(f"Custom script output is not valid JSON: {result.stdout}")
-              return {"status": "error", "output": f"Script output is not valid JSON:\n{result.stdout}\n{result.stderr}"}
-
-        # Determine file extension
-        ext = compiler_info.get('ext')
-        if lang == 'emcc':
-          if emcc_lang not in compiler_info['ext_map']:
-            return {"status": "error", "output": f"EMCC: Unsupported source language '{emcc_lang}' for Emscripten."}
-          ext = compiler_info['ext_map'][emcc_lang]
-
-        source_file_name = f"temp_source{ext}"
-        source_file_path = os.path.join(tmpdir, source_file_name)
-
-        # Write code content to a temporary file
-        with open(source_file_path, 'w', encoding='utf-8') as f:
-          f.write(code_content)
-        logger.info(f"Source code written to temporary file: {source_file_path}")
-
-        compile_cmd = [compiler_info['cmd']]
-        if not compiler_info.get('is_script') and lang != 'emcc': # Add source file and output flags for compiled langs
-          compile_cmd.append(source_file_path)
-          compile_cmd.extend(compiler_info['flags'])
-          compile_cmd.append(os.path.join(tmpdir, compiler_info['flags'][1])) # output.exe or similar
-        elif lang == 'emcc':
-          # Emscripten specific flags for C/C++ to WASM/JS
-          compile_cmd.append(source_file_path)
-          # For a truly conceptual output, just return a message.
-          # If you want real output from emcc, add:
-          # compile_cmd.extend(['-s', 'WASM=1', '-o', os.path.join(tmpdir, 'output.js')]) # Emscripten often outputs .js
-          # For this conceptual implementation, we just simulate success.
-          logger.warning("EMCC compilation is conceptual; actual WASM/JS output is not consumed here.")
-          # Return a simulated success for EMCC
-          return {"status": "success", "output": f"Conceptual EMCC compilation of '{source_file_name}' to WebAssembly/JS (output.html) simulated successfully. Actual compilation requires Emscripten SDK."}
-        elif compiler_info.get('is_script'): # For interpreted languages like Go, Lua, C# dotnet run
-          compile_cmd.extend(compiler_info['flags'])
-          compile_cmd.append(source_file_path)
-
-        # Execute the compilation command
-        logger.info(f"Compilation command: {' '.join(compile_cmd)} (cwd: {tmpdir})")
-        # Use check=False to capture stderr even if command fails
-        compile_result = subprocess.run(compile_cmd, capture_output=True, text=True, cwd=tmpdir, check=False)
+      timings['setup'] = time.perf_counter() - phase_started
+      result = self._compile_and_run_in(lang, compiler_info, code_content, emcc_lang, tmpdir, cancel_event, output_stream, timings)
+      phase_started = time.perf_counter()
+    timings['teardown'] = time.perf_counter() - phase_started
+    result['timings'] = {phase: round(seconds, 6) for phase, seconds in timings.items()}
+    return result
+
+  def _compile_and_run_in(self, lang, compiler_info, code_content, emcc_lang, tmpdir, cancel_event, output_stream, timings):
+    """Body of compile_and_run_code; records the seconds spent per phase in 'timings'."""
+    try:
+      # Determine file extension
+      ext = compiler_info.get('ext')
+      if lang == 'emcc':
+        if emcc_lang not in compiler_info['ext_map']:
+          return {"status": "error", "output": f"EMCC: Unsupported source language '{emcc_lang}' for Emscripten."}
+        ext = compiler_info['ext_map'][emcc_lang]
+
+      source_file_name = f"temp_source{ext}"
+      source_file_path = os.path.join(tmpdir, source_file_name)
+
+      # Compiled languages: reuse a cached executable when nothing that affects the build has changed
+      cache_key = None
+      if not compiler_info.get('is_script') and lang != 'emcc':
+        cache_key = self.compile_cache.make_key(lang, self.toolchains.version(lang), compiler_info['flags'], code_content)
+        cached = self.compile_cache.lookup(cache_key, self._executable_name(compiler_info), dest_dir=tmpdir)
+        if cached:
+          logger.info(f"Compile cache hit for {lang} ({cache_key[:12]}); skipping compilation.")
+          phase_started = time.perf_counter()
+          result = self._run_executable(lang, cached['artifact'], tmpdir, cached['compile_stdout'], cached['compile_stderr'],
+                                        cache_hit=True, cancel_event=cancel_event, output_stream=output_stream)
+          timings['exec'] = time.perf_counter() - phase_started
+          return result
+
+      # Write code content to a temporary file
+      phase_started = time.perf_counter()
+      with open(source_file_path, 'w', encoding='utf-8') as f:
+        f.write(code_content)
+      timings['write'] = time.perf_counter() - phase_started
+      logger.info(f"Source code written to temporary file: {source_file_path}")
+
+      compile_cmd = [compiler_info['cmd']]
+      if not compiler_info.get('is_script') and lang != 'emcc': # Add source file and output flags for compiled langs
+        compile_cmd.append(source_file_path)
+        compile_cmd.extend(compiler_info['flags']) # Output name is relative to cwd (tmpdir)
+      elif lang == 'emcc':
+        # Emscripten specific flags for C/C++ to WASM/JS
+        compile_cmd.append(source_file_path)
+        # For a truly conceptual output, just return a message.
+        # If you want real output from emcc, add:
+        # compile_cmd.extend(['-s', 'WASM=1', '-o', os.path.join(tmpdir, 'output.js')]) # Emscripten often outputs .js
+        # For this conceptual implementation, we just simulate success.
+        logger.warning("EMCC compilation is conceptual; actual WASM/JS output is not consumed here.")
+        # Return a simulated success for EMCC
+        return {"status": "success", "output": f"Conceptual EMCC compilation of '{source_file_name}' to WebAssembly/JS (output.html) simulated successfully. Actual compilation requires Emscripten SDK."}
+      elif compiler_info.get('is_script'): # For interpreted languages like Go, Lua, C# dotnet run
+        compile_cmd.extend(compiler_info['flags'])
+        compile_cmd.append(source_file_path)
+
+      # Execute the compilation command
+      logger.info(f"Compilation command: {' '.join(compile_cmd)} (cwd: {tmpdir})")
+      phase_started = time.perf_counter()
+      if compiler_info.get('is_script'):
+        # Script languages run user code in this step, so it gets the run limits
+        limits = self.get_run_limits(lang)
+        compile_result = self._run_process(compile_cmd, tmpdir, cancel_event, output_stream,
+                                           timeout=limits['wall_seconds'], limits=limits)
+      else:
+        compile_result = self._run_process(compile_cmd, tmpdir, cancel_event, output_stream, timeout=self.compile_timeout)
+      # Script languages build and run in this one step, so it counts as 'exec'
+      timings['exec' if compiler_info.get('is_script') else 'compile'] = time.perf_counter() - phase_started
 
+      if compiler_info.get('is_script'):
+        # For script languages, the 'compile_result' already contains the run output
+        if compile_result.limit_exceeded:
+          logger.error(f"Script run for {lang} stopped: {self._limit_message(compile_result)}")
+          return {"status": "error", "output": f"Execution Error: {self._limit_message(compile_result)}\n"
+                                               f"{compile_result.stdout}\n{compile_result.stderr}",
+                  "usage": compile_result.usage, "limit_exceeded": compile_result.limit_exceeded}
         if compile_result.returncode != 0:
           logger.error(f"Compilation failed for {lang}: {compile_result.stderr}")
-          return {"status": "error", "output": f"Compilation Error:\n{compile_result.stdout}\n{compile_result.stderr}"}
-
-        if compiler_info.get('is_script'):
-          # For script languages, the 'compile_result' already contains the run output
-          logger.info(f"Script run output for {lang}: {compile_result.stdout}")
-          return {"status": "success", "output": compile_result.stdout}
-        else:
-          # If compiled, now run the executable
-          run_cmd = compiler_info['run_cmd'].split()
-          run_executable_path = os.path.join(tmpdir, os.path.basename(run_cmd[0]))
-
-          # Special handling for Windows executables (add .exe if missing)
-          if platform.system() == "Windows" and not run_executable_path.lower().endswith(".exe"):
-            run_executable_path += ".exe"
-
-          run_cmd[0] = run_executable_path # Ensure path to executable is correct
-
-          logger.info(f"Execution command: {' '.join(run_cmd)} (cwd: {tmpdir})")
-          run_result = subprocess.run(run_cmd, capture_output=True, text=True, cwd=tmpdir, check=False)
-
-          output = compile_result.stdout + "\n" + compile_result.stderr + "\n" + run_result.stdout + "\n" + run_result.stderr
-          if run_result.returncode != 0:
-            logger.error(f"Execution failed for {lang}: {run_result.stderr}")
-            return {"status": "error", "output": f"Execution Error:\n{output}"}
-          else:
-            logger.info(f"Execution successful for {lang}: {run_result.stdout}")
-            return {"status": "success", "output": output}
-
-      except FileNotFoundError as fnfe:
-        logger.error(f"Compiler command '{compiler_info['cmd']}' not found for {lang.upper()}. Please install it and ensure it's in your system's PATH. Error: {fnfe}")
-        return {"status": "error", "output": f"Compiler '{compiler_info['cmd']}' not found. Please install the {lang.upper()} compiler."}
-      except Exception as e:
-        logger.error(f"An unexpected error occurred during {lang} compilation/execution: {e}", exc_info=True)
-        return {"status": "error", "output": f"An unexpected error occurred: {str(e)}"}
+          return {"status": "error", "output": f"Compilation Error:\n{compile_result.stdout}\n{compile_result.stderr}",
+                  "usage": compile_result.usage}
+        logger.info(f"Script run output for {lang}: {compile_result.stdout}")
+        return {"status": "success", "output": compile_result.stdout, "usage": compile_result.usage}
+
+      if compile_result.limit_exceeded:
+        logger.error(f"Compilation stopped for {lang}: {self._limit_message(compile_result)}")
+        return {"status": "error", "output": f"Compilation Error: {self._limit_message(compile_result)}\n{compile_result.stderr}"}
+      if compile_result.returncode != 0:
+        logger.error(f"Compilation failed for {lang}: {compile_result.stderr}")
+        return {"status": "error", "output": f"Compilation Error:\n{compile_result.stdout}\n{compile_result.stderr}"}
+
+      # If compiled, cache the executable and run it
+      executable_path = os.path.join(tmpdir, self._executable_name(compiler_info))
+      self.compile_cache.store(cache_key, executable_path, compile_result.stdout, compile_result.stderr)
+      phase_started = time.perf_counter()
+      result = self._run_executable(lang, executable_path, tmpdir, compile_result.stdout, compile_result.stderr,
+                                    cache_hit=False, cancel_event=cancel_event, output_stream=output_stream)
+      timings['exec'] = time.perf_counter() - phase_started
+      return result
+
+    except CompileCancelled:
+      logger.info(f"{lang.upper()} compile/run cancelled.")
+      return {"status": "cancelled", "output": "Cancelled."}
+    except FileNotFoundError as fnfe:
+      logger.error(f"Compiler command '{compiler_info['cmd']}' not found for {lang.upper()}. Please install it and ensure it's in your system's PATH. Error: {fnfe}")
+      return {"status": "error", "output": f"Compiler '{compiler_info['cmd']}' not found. Please install the {lang.upper()} compiler."}
+    except Exception as e:
+      logger.error(f"An unexpected error occurred during {lang} compilation/execution: {e}", exc_info=True)
+      return {"status": "error", "output": f"An unexpected error occurred: {str(e)}"}
+
+  def compile_and_run_project(self, lang, files, cflags=None, ldflags=None, run=True, cancel_event=None, output_stream=None):
+    """
+    Incrementally builds a multi-file C/C++ project and runs it (see ProjectBuilder).
+    :param files: {path relative to the project root: content}.
+    Results also carry 'units': {total, compiled, cached}.
+    """
+    logger.info(f"Attempting to build and run {lang.upper()} project ({len(files)} files).")
+    try:
+      return self.project_builder.build_and_run(lang, files, cflags, ldflags, run, cancel_event, output_stream)
+    except CompileCancelled:
+      logger.info(f"{lang.upper()} project build cancelled.")
+      return {"status": "cancelled", "output": "Cancelled."}
+    except FileNotFoundError as fnfe:
+      logger.error(f"Compiler for {lang.upper()} project not found: {fnfe}")
+      return {"status": "error", "output": f"Compiler '{self.compilers[lang]['cmd']}' not found. Please install the {lang.upper()} compiler."}
+    except Exception as e:
+      logger.error(f"An unexpected error occurred during {lang} project build: {e}", exc_info=True)
+      return {"status": "error", "output": f"An unexpected error occurred: {str(e)}"}
+
+  def _run_handler(self, lang, handler, code_content):
+    """
+    Runs an in-process custom script handler, memoized by a hash of its input.
+    Cached outputs are shared between callers and must be treated as read-only.
+    """
+    key = (lang, hashlib.sha256(code_content.encode('utf-8')).digest())
+    with self._handler_results_lock:
+      output = self._handler_results.get(key)
+      if output is not None:
+        self._handler_results.move_to_end(key)
+        return {"status": "success", "output": output, "cache_hit": True}
+    try:
+      output = handler(code_content) # Returns the parsed output dictionary
+    except Exception as e:
+      logger.error(f"Custom script handler for {lang} failed: {e}", exc_info=True)
+      return {"status": "error", "output": f"Script Error:\n{str(e)}"}
+    with self._handler_results_lock:
+      self._handler_results[key] = output
+      while len(self._handler_results) > self.max_handler_results:
+        self._handler_results.popitem(last=False)
+    return {"status": "success", "output": output, "cache_hit": False}
+
+  def _executable_name(self, compiler_info):
+    executable_name = os.path.basename(compiler_info['run_cmd'].split()[0])
+    # Special handling for Windows executables (add .exe if missing)
+    if platform.system() == "Windows" and not executable_name.lower().endswith(".exe"):
+      executable_name += ".exe"
+    return executable_name
+
+  def _run_process(self, cmd, cwd, cancel_event=None, output_stream=None, timeout=None, limits=None):
+    """
+    Runs a command to completion and captures its output, like subprocess.run.
+    stdout/stderr are read incrementally into a buffer capped at max_output_chars
+    (and forwarded to output_stream, if given), so a chatty program cannot grow
+    backend memory without limit. With a cancel_event, the child is killed as
+    soon as the event is set.
+
+    On POSIX the command gets its own process group, so timeouts and cancels
+    also kill anything it forked, and 'limits' (see DEFAULT_RUN_LIMITS) are
+    applied as rlimits by starting it through the rlimit_exec.py shim.
+    The returned CompletedProcess additionally carries 'usage' and
+    'limit_exceeded' (None, 'wall_time', 'cpu_time', 'file_size' or 'memory').
+    usage['peak_rss_kb'] is the highest VmHWM sampled from /proc while the
+    program ran, so it is None for a program that exits before the first
+    sample and on systems without /proc.
+    A memory overrun is only reported when the program failed with a
+    recognisable out-of-memory message; one that handles a failed allocation
+    quietly, or crashes on it, is reported as an ordinary failure.
+    """
+    capture = OutputStream(max_chars=self.max_output_chars)
+    sinks = [capture] if output_stream is None else [capture, output_stream]
+    popen_cmd, popen_kwargs, status_fd = cmd, {}, None
+    if os.name == 'posix':
+      popen_kwargs['start_new_session'] = True
+      if limits and resource:
+        status_fd, status_write_fd = os.pipe()
+        popen_cmd = _limited_command(cmd, limits, status_write_fd)
+        popen_kwargs['pass_fds'] = (status_write_fd,)
+    started = time.monotonic()
+    try:
+      process = subprocess.Popen(popen_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, **popen_kwargs)
+    except BaseException:
+      if status_fd is not None:
+        os.close(status_fd)
+      raise
+    finally:
+      if status_fd is not None:
+        os.close(status_write_fd)
+    if status_fd is not None:
+      try:
+        status = _read_status(status_fd)
+      finally:
+        os.close(status_fd)
+      if status:
+        # The shim could not exec cmd: raise what Popen would have raised without it
+        process.wait()
+        process.stdout.close()
+        process.stderr.close()
+        errno_text, _, message = status.partition(':')
+        if errno_text.isdigit() and int(errno_text):
+          raise OSError(int(errno_text), message, cmd[0])
+        raise RuntimeError(f"Could not apply resource limits: {message}")
+    pumps = [threading.Thread(target=pump_pipe, args=(process.stdout, 'stdout', sinks), daemon=True),
+             threading.Thread(target=pump_pipe, args=(process.stderr, 'stderr', sinks), daemon=True)]
+    for pump in pumps:
+      pump.start()
+
+    timed_out = False
+    rusage = None
+    peak_rss_kb = None
+    poll_delay = 0.001
+    while True:
+      if os.name == 'posix':
+        # wait4 reaps the child and reports its (and its reaped children's) resource usage
+        pid, wait_status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+          process.returncode = os.waitstatus_to_exitcode(wait_status)
+          break
+        # ru_maxrss would include the backend's own RSS, which the child inherits at fork
+        sample = _peak_rss_kb(process.pid)
+        if sample is not None:
+          peak_rss_kb = max(peak_rss_kb or 0, sample)
+      elif process.poll() is not None:
+        break
+      if cancel_event is not None and cancel_event.is_set():
+        self._kill_process_group(process)
+        process.wait()
+        for pump in pumps:
+          pump.join(timeout=1)
+        raise CompileCancelled()
+      if not timed_out and timeout and time.monotonic() - started > timeout:
+        timed_out = True
+        self._kill_process_group(process) # Keep looping to reap it
+      time.sleep(poll_delay)
+      poll_delay = min(poll_delay * 2, 0.05)
+    elapsed = time.monotonic() - started
+
+    self._kill_process_group(process) # Stragglers it left behind would keep the pipes open
+    for pump in pumps:
+      pump.join(timeout=5)
+
+    result = subprocess.CompletedProcess(cmd, process.returncode, capture.text('stdout'), capture.text('stderr'))
+    result.usage = {"elapsed_seconds": round(elapsed, 3), "cpu_seconds": None, "peak_rss_kb": peak_rss_kb}
+    if rusage is not None:
+      result.usage["cpu_seconds"] = round(rusage.ru_utime + rusage.ru_stime, 3)
+    result.limit_exceeded = None
+    if timed_out:
+      result.limit_exceeded = 'wall_time'
+    elif os.name == 'posix' and limits:
+      if process.returncode == -signal.SIGXCPU or (process.returncode == -signal.SIGKILL and limits.get('cpu_seconds')
+                                                   and (result.usage["cpu_seconds"] or 0) >= limits['cpu_seconds']):
+        result.limit_exceeded = 'cpu_time'
+      elif process.returncode == -signal.SIGXFSZ:
+        result.limit_exceeded = 'file_size'
+      elif process.returncode != 0 and self._ran_out_of_memory(result, limits):
+        result.limit_exceeded = 'memory'
+    result.timeout = timeout
+    result.limits = limits or {}
+    return result
+
+  def _kill_process_group(self, process):
+    try:
+      if os.name == 'posix':
+        os.killpg(process.pid, signal.SIGKILL)
+      elif process.returncode is None:
+        process.kill()
+    except (ProcessLookupError, PermissionError):
+      pass # Already gone
+
+  def _ran_out_of_memory(self, result, limits):
+    """
+    Best-effort check whether a failed run hit its RLIMIT_AS cap. peak_rss_kb
+    is no help here: the cap is on reserved address space, so the failing
+    allocation never becomes resident.
+    """
+    if not limits.get('memory_mb') or not resource:
+      return False
+    return any(marker in result.stderr for marker in OUT_OF_MEMORY_MARKERS)
+
+  def _limit_message(self, result):
+    if result.limit_exceeded == 'wall_time':
+      return f"time limit exceeded ({result.timeout}s wall clock)."
+    if result.limit_exceeded == 'cpu_time':
+      return f"CPU time limit exceeded ({result.limits.get('cpu_seconds')}s)."
+    if result.limit_exceeded == 'file_size':
+      return f"file size limit exceeded ({result.limits.get('file_size_mb')} MB)."
+    if result.limit_exceeded == 'memory':
+      return f"memory limit exceeded ({result.limits.get('memory_mb')} MB)."
+    return "resource limit exceeded."
+
+  def _run_executable(self, lang, executable_path, cwd, compile_stdout, compile_stderr, cache_hit,
+                      cancel_event=None, output_stream=None):
+    run_cmd = [executable_path]
+    limits = self.get_run_limits(lang)
+    logger.info(f"Execution command: {' '.join(run_cmd)} (cwd: {cwd}, limits: {limits})")
+    run_result = self._run_process(run_cmd, cwd, cancel_event, output_stream, timeout=limits['wall_seconds'], limits=limits)
+
+    output = compile_stdout + "\n" + compile_stderr + "\n" + run_result.stdout + "\n" + run_result.stderr
+    if run_result.limit_exceeded:
+      logger.error(f"Execution of {lang} program stopped: {self._limit_message(run_result)}")
+      return {"status": "error", "output": f"Execution Error: {self._limit_message(run_result)}\n{output}",
+              "cache_hit": cache_hit, "usage": run_result.usage, "limit_exceeded": run_result.limit_exceeded}
+    if run_result.returncode != 0:
+      logger.error(f"Execution failed for {lang}: {run_result.stderr}")
+      return {"status": "error", "output": f"Execution Error:\n{output}", "cache_hit": cache_hit, "usage": run_result.usage}
+    else:
+      logger.info(f"Execution successful for {lang}: {run_result.stdout} ({run_result.usage})")
+      return {"status": "success", "output": output, "cache_hit": cache_hit, "usage": run_result.usage}
@@ -2,16 +2,52 @@
 import sqlite3
 import os
 import json
+import hashlib
 import logging
+import queue
+import threading
+from contextlib import contextmanager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('DB_Manager')
 
+class _BufferedBlob:
+  """Stand-in for sqlite3.Blob's sequential write() where Connection.blobopen is missing (Python < 3.11)."""
+  def __init__(self):
+    self._chunks = []
+
+  def write(self, data):
+    self._chunks.append(bytes(data))
+
+  def getvalue(self):
+    return b''.join(self._chunks)
+
 class DBManager:
-  def __init__(self, db_path="obpi_data.db"):
+  """
+  SQLite access shared by every backend service.
+
+  pywebview calls js_api methods from worker threads, so the database runs in
+  WAL mode with one serialized writer connection plus a small pool of reader
+  connections. Plain SELECTs go to a reader and can run while a bulk write is
+  in progress; everything else, and every statement inside transaction(), goes
+  through the writer under a lock.
+  """
+  SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+  def __init__(self, db_path="obpi_data.db", synchronous="NORMAL", busy_timeout_ms=5000, max_readers=4):
     self.db_path = db_path
+    self.synchronous = synchronous.upper()
+    if self.synchronous not in self.SYNCHRONOUS_LEVELS:
+      raise ValueError(f"Invalid synchronous level '{synchronous}', expected one of {self.SYNCHRONOUS_LEVELS}")
+    self.busy_timeout_ms = busy_timeout_ms
+    self.max_readers = max_readers
     self._ensure_db_path_exists()
-    self.conn = None
+    self.conn = None # Writer connection
+    self._write_lock = threading.RLock()
+    self._local = threading.local() # Per-thread transaction depth
+    self._readers_lock = threading.Lock()
+    self._idle_readers = queue.LifoQueue()
+    self._all_readers = []
     self.connect()
     self.initialize_db()
 
@@ -20,56 +56,218 @@ class DBManager:
     if db_dir and not os.path.exists(db_dir):
       os.makedirs(db_dir)
 
+  def _open_connection(self):
+    # check_same_thread=False: connections are handed between threads, but the
+    # write lock and the reader pool ensure only one thread uses each at a time.
+    conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row # Allows accessing columns by name
+    conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+    return conn
+
   def connect(self):
     try:
-      self.conn = sqlite3.connect(self.db_path)
-      self.conn.row_factory = sqlite3.Row # Allows accessing columns by name
-      logger.info(f"Connected to database: {self.db_path}")
+      self.conn = self._open_connection()
+      journal_mode = self.conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+      logger.info(f"Connected to database: {self.db_path} (journal_mode={journal_mode}, synchronous={self.synchronous})")
     except sqlite3.Error as e:
       logger.error(f"Database connection error: {e}")
       self.conn = None # Ensure conn is None if connection fails
 
   def close(self):
-    if self.conn:
-      self.conn.close()
-      logger.info("Database connection closed.")
-      self.conn = None
+    with self._readers_lock:
+      for reader in self._all_readers:
+        reader.close()
+      self._all_readers = []
+      self._idle_readers = queue.LifoQueue()
+    with self._write_lock:
+      if self.conn:
+        self.conn.close()
+        logger.info("Database connection closed.")
+        self.conn = None
 
-  def execute_query(self, query, params=(), fetch_one=False, fetch_all=False):
-    if not self.conn:
-      logger.error("Database not connected. Cannot execute query.")
-      return None if fetch_one else []
+  @contextmanager
+  def _reader(self):
+    """Borrows a reader connection, opening one if the pool is not full yet."""
+    try:
+      reader = self._idle_readers.get_nowait()
+    except queue.Empty:
+      reader = None
+      with self._readers_lock:
+        if len(self._all_readers) < self.max_readers:
+          reader = self._open_connection()
+          self._all_readers.append(reader)
+      if reader is None:
+        reader = self._idle_readers.get()
+    try:
+      yield reader
+    finally:
+      self._idle_readers.put(reader)
 
+  @staticmethod
+  def _is_read_query(query):
+    keyword = query.lstrip().split(None, 1)[0].upper() if query.strip() else ''
+    return keyword in ('SELECT', 'EXPLAIN')
+
+  def _run_query(self, conn, query, params, fetch_one, fetch_all, commit):
+    cursor = conn.cursor()
     try:
-      cursor = self.conn.cursor()
       cursor.execute(query, params)
-      self.conn.commit()
+      if commit:
+        conn.commit()
       if fetch_one:
         return cursor.fetchone()
       elif fetch_all:
         return cursor.fetchall()
       return cursor.rowcount # For INSERT/UPDATE/DELETE
+    finally:
+      cursor.close() # Release the statement so readers do not pin an old WAL snapshot
+
+  def execute_query(self, query, params=(), fetch_one=False, fetch_all=False):
+    if not self.conn:
+      logger.error("Database not connected. Cannot execute query.")
+      return None if fetch_one else []
+
+    try:
+      if self._is_read_query(query) and not self.in_transaction:
+        with self._reader() as reader:
+          return self._run_query(reader, query, params, fetch_one, fetch_all, commit=False)
+      with self._write_lock:
+        return self._run_query(self.conn, query, params, fetch_one, fetch_all, commit=not self.in_transaction)
     except sqlite3.Error as e:
       logger.error(f"Database query error: {e} - Query: {query} - Params: {params}")
+      if self.in_transaction:
+        raise # Let transaction() roll back the whole batch
       return None if fetch_one else []
 
+  def read_blob(self, table, column, rowid, offset=0, length=-1):
+    """
+    Reads part of a BLOB with incremental blob I/O (Connection.blobopen), so only
+    the requested bytes are copied into memory, not the whole value. Before
+    Python 3.11 there is no blobopen and substr() selects the range instead.
+    :param length: Number of bytes to read; -1 reads to the end of the blob.
+    Raises sqlite3.Error if the row no longer exists.
+    """
+    with self._reader() as reader:
+      if not hasattr(reader, 'blobopen'):
+        if length < 0:
+          row = reader.execute(f"SELECT substr({column}, ?) FROM {table} WHERE rowid = ?", (offset + 1, rowid)).fetchone()
+        else:
+          row = reader.execute(f"SELECT substr({column}, ?, ?) FROM {table} WHERE rowid = ?",
+                               (offset + 1, length, rowid)).fetchone()
+        if row is None:
+          raise sqlite3.OperationalError(f"no such rowid: {rowid}")
+        return bytes(row[0] or b'')
+      with reader.blobopen(table, column, rowid, readonly=True) as blob:
+        blob.seek(offset)
+        return blob.read(length)
+
+  @contextmanager
+  def open_blob(self, table, column, rowid):
+    """
+    Opens a BLOB for incremental writes on the writer connection. Use it inside
+    transaction(); the blob's size is fixed, so allocate it with zeroblob(n) first.
+    Before Python 3.11 writes are buffered and stored in one UPDATE on exit.
+    """
+    with self._write_lock:
+      if not hasattr(self.conn, 'blobopen'):
+        blob = _BufferedBlob()
+        yield blob
+        self.conn.execute(f"UPDATE {table} SET {column} = ? WHERE rowid = ?", (blob.getvalue(), rowid))
+        return
+      with self.conn.blobopen(table, column, rowid) as blob:
+        yield blob
+
+  def execute_many(self, query, seq_of_params):
+    """Runs one statement for every parameter tuple and returns the total row count."""
+    if not self.conn:
+      logger.error("Database not connected. Cannot execute query.")
+      return 0
+
+    with self._write_lock:
+      try:
+        cursor = self.conn.cursor()
+        cursor.executemany(query, seq_of_params)
+        if not self.in_transaction:
+          self.conn.commit()
+        return cursor.rowcount
+      except sqlite3.Error as e:
+        logger.error(f"Database executemany error: {e} - Query: {query}")
+        if self.in_transaction:
+          raise
+        self.conn.rollback()
+        return 0
+
+  @property
+  def _transaction_depth(self):
+    return getattr(self._local, 'transaction_depth', 0)
+
+  @_transaction_depth.setter
+  def _transaction_depth(self, depth):
+    self._local.transaction_depth = depth
+
+  @property
+  def in_transaction(self):
+    """True when the calling thread is inside transaction()."""
+    return self._transaction_depth > 0
+
+  @contextmanager
+  def transaction(self):
+    """
+    Groups every statement issued inside the block into a single commit.
+    Any exception rolls the whole batch back and is re-raised. Nested blocks
+    join the outermost transaction. The writer is held for the whole block,
+    so other threads' writes wait while reads carry on from the reader pool.
+    """
+    if not self.conn:
+      raise sqlite3.Error("Database not connected. Cannot start transaction.")
+
+    with self._write_lock:
+      self._transaction_depth += 1
+      try:
+        yield self
+      except BaseException:
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+          self.conn.rollback()
+          logger.warning("Transaction rolled back.")
+        raise
+      else:
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+          self.conn.commit()
+
   def initialize_db(self):
     if not self.conn:
       logger.error("Database not connected. Cannot initialize tables.")
       return
 
+    # VFS file bodies, content-addressed by SHA-256 and shared between nodes
+    self.execute_query("""
+                       CREATE TABLE IF NOT EXISTS vfs_blobs (
+                                                              hash TEXT PRIMARY KEY,
+                                                              size INTEGER NOT NULL,
+                                                              ref_count INTEGER NOT NULL DEFAULT 0,
+                                                              data BLOB NOT NULL
+                       )
+                       """)
+    logger.info("Table 'vfs_blobs' ensured.")
+
     # VFS metadata table
     self.execute_query("""
                        CREATE TABLE IF NOT EXISTS vfs_nodes (
                                                               path TEXT PRIMARY KEY,
+                                                              parent_path TEXT,   -- NULL only for the root '/'
                                                               name TEXT NOT NULL,
                                                               type TEXT NOT NULL, -- 'file' or 'dir'
                                                               size INTEGER DEFAULT 0,
-                                                              content BLOB,       -- Only for files, stored directly in DB for simplicity
+                                                              content_hash TEXT,  -- Only for files, points at vfs_blobs.hash
                                                               created_at TEXT NOT NULL,
                                                               modified_at TEXT NOT NULL
                        )
                        """)
+    self._migrate_vfs_parent_path()
+    self.execute_query("CREATE INDEX IF NOT EXISTS idx_vfs_parent_path ON vfs_nodes (parent_path)")
+    self._migrate_vfs_content_to_blobs()
     logger.info("Table 'vfs_nodes' ensured.")
 
     # Browser History table
@@ -110,6 +308,104 @@ class DBManager:
                        """)
     logger.info("Table 'pepx_metadata' ensured.")
 
+    # PEPx chunked upload sessions; chunks are kept until the upload is committed
+    self.execute_query("""
+                       CREATE TABLE IF NOT EXISTS pepx_uploads (
+                                                                 upload_id TEXT PRIMARY KEY,
+                                                                 file_id TEXT NOT NULL,
+                                                                 total_size INTEGER, -- Optional, checked on commit
+                                                                 created TEXT NOT NULL
+                       )
+                       """)
+    self.execute_query("""
+                       CREATE TABLE IF NOT EXISTS pepx_upload_chunks (
+                                                                       upload_id TEXT NOT NULL,
+                                                                       byte_offset INTEGER NOT NULL,
+                                                                       size INTEGER NOT NULL,
+                                                                       checksum TEXT NOT NULL, -- SHA-256 hex of the chunk bytes
+                                                                       data BLOB NOT NULL,
+                                                                       PRIMARY KEY (upload_id, byte_offset)
+                       )
+                       """)
+    logger.info("Tables 'pepx_uploads' and 'pepx_upload_chunks' ensured.")
+
+  def _migrate_vfs_parent_path(self):
+    """Adds and backfills the 'parent_path' column on databases created before it existed."""
+    columns = self.execute_query("PRAGMA table_info(vfs_nodes)", fetch_all=True)
+    if any(col['name'] == 'parent_path' for col in columns):
+      return
+
+    logger.info("Migrating 'vfs_nodes': adding 'parent_path' column.")
+    self.execute_query("ALTER TABLE vfs_nodes ADD COLUMN parent_path TEXT")
+    # rtrim(path, <path without slashes>) strips the last path segment and keeps
+    # the trailing '/', e.g. '/home/guest' -> '/home/' and '/home' -> '/'.
+    self.execute_query("""
+                       UPDATE vfs_nodes SET parent_path = CASE
+                         WHEN path = '/' THEN NULL
+                         WHEN rtrim(path, replace(path, '/', '')) = '/' THEN '/'
+                         ELSE substr(rtrim(path, replace(path, '/', '')), 1,
+                                     length(rtrim(path, replace(path, '/', ''))) - 1)
+                       END
+                       """)
+    logger.info("Migration of 'vfs_nodes.parent_path' complete.")
+
+  def _ensure_vfs_blob_triggers(self):
+    """
+    Keeps vfs_blobs.ref_count in step with the vfs_nodes rows that point at each
+    blob, so set-based copies and deletes share and release blobs without any
+    per-row Python. Blobs whose count drops to zero are removed.
+    """
+    self.execute_query("""
+                       CREATE TRIGGER IF NOT EXISTS trg_vfs_blob_ref_insert AFTER INSERT ON vfs_nodes
+                       WHEN NEW.content_hash IS NOT NULL
+                       BEGIN
+                         UPDATE vfs_blobs SET ref_count = ref_count + 1 WHERE hash = NEW.content_hash;
+                       END
+                       """)
+    self.execute_query("""
+                       CREATE TRIGGER IF NOT EXISTS trg_vfs_blob_ref_delete AFTER DELETE ON vfs_nodes
+                       WHEN OLD.content_hash IS NOT NULL
+                       BEGIN
+                         UPDATE vfs_blobs SET ref_count = ref_count - 1 WHERE hash = OLD.content_hash;
+                         DELETE FROM vfs_blobs WHERE hash = OLD.content_hash AND ref_count <= 0;
+                       END
+                       """)
+    self.execute_query("""
+                       CREATE TRIGGER IF NOT EXISTS trg_vfs_blob_ref_update AFTER UPDATE OF content_hash ON vfs_nodes
+                       WHEN OLD.content_hash IS NOT NEW.content_hash
+                       BEGIN
+                         UPDATE vfs_blobs SET ref_count = ref_count + 1 WHERE hash = NEW.content_hash;
+                         UPDATE vfs_blobs SET ref_count = ref_count - 1 WHERE hash = OLD.content_hash;
+                         DELETE FROM vfs_blobs WHERE hash = OLD.content_hash AND ref_count <= 0;
+                       END
+                       """)
+
+  def _migrate_vfs_content_to_blobs(self):
+    """Moves inline vfs_nodes.content into vfs_blobs on databases created before the blob store."""
+    columns = [col['name'] for col in self.execute_query("PRAGMA table_info(vfs_nodes)", fetch_all=True)]
+    if 'content_hash' not in columns:
+      self.execute_query("ALTER TABLE vfs_nodes ADD COLUMN content_hash TEXT")
+    self._ensure_vfs_blob_triggers()
+    if 'content_hash' in columns or 'content' not in columns:
+      return
+
+    logger.info("Migrating 'vfs_nodes': moving inline file content into 'vfs_blobs'.")
+    try:
+      with self.transaction():
+        rows = self.execute_query("SELECT path, content FROM vfs_nodes WHERE content IS NOT NULL", fetch_all=True)
+        for row in rows:
+          data = row['content']
+          if isinstance(data, str):
+            data = data.encode('utf-8')
+          digest = hashlib.sha256(data).hexdigest()
+          self.execute_query("INSERT OR IGNORE INTO vfs_blobs (hash, size, ref_count, data) VALUES (?, ?, 0, ?)",
+                             (digest, len(data), sqlite3.Binary(data)))
+          # The update trigger takes the reference
+          self.execute_query("UPDATE vfs_nodes SET content_hash = ?, content = NULL WHERE path = ?", (digest, row['path']))
+      logger.info(f"Migration of 'vfs_nodes.content' complete ({len(rows)} files moved).")
+    except sqlite3.Error as e:
+      logger.error(f"Migration of 'vfs_nodes.content' failed: {e}")
+
   def reset_db(self):
     """Resets the entire database by dropping all tables."""
     if not self.conn:
@@ -118,13 +414,17 @@ class DBManager:
 
     logger.warning("Resetting all database tables!")
     try:
-      cursor = self.conn.cursor()
-      cursor.execute("DROP TABLE IF EXISTS vfs_nodes")
-      cursor.execute("DROP TABLE IF EXISTS browser_history")
-      cursor.execute("DROP TABLE IF EXISTS browser_bookmarks")
-      cursor.execute("DROP TABLE IF EXISTS pepx_metadata")
-      self.conn.commit()
-      self.initialize_db() # Re-initialize empty tables
+      with self._write_lock:
+        cursor = self.conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS vfs_nodes")
+        cursor.execute("DROP TABLE IF EXISTS vfs_blobs")
+        cursor.execute("DROP TABLE IF EXISTS browser_history")
+        cursor.execute("DROP TABLE IF EXISTS browser_bookmarks")
+        cursor.execute("DROP TABLE IF EXISTS pepx_metadata")
+        cursor.execute("DROP TABLE IF EXISTS pepx_uploads")
+        cursor.execute("DROP TABLE IF EXISTS pepx_upload_chunks")
+        self.conn.commit()
+        self.initialize_db() # Re-initialize empty tables
       logger.info("All tables dropped and re-initialized.")
       return {"status": "success", "message": "Database reset successfully."}
     except sqlite3.Error as e:
@@ -4,11 +4,11 @@ import os
 import sys
 import logging
 import platform
-import psutil # For system resource monitoring
 
 from backend.backend_api import BackendAPI
 from backend.db_manager import DBManager
 from backend.vfs_manager import VFSManager
+from backend.resource_sampler import ResourceSampler # For system resource monitoring
 
 # --- Logging Configuration ---
 log_dir = "logs"
@@ -52,10 +52,19 @@ logger.info(f"Database Path: {DB_PATH}")
 logger.info(f"Frontend HTML Path: {HTML_PATH}")
 
 # --- System Load Check on Launch ---
-def perform_system_check():
-  cpu_percent = psutil.cpu_percent(interval=1) # Measure CPU usage over 1 second
-  ram_info = psutil.virtual_memory()
-  ram_percent = ram_info.percent
+def perform_system_check(resource_sampler: ResourceSampler):
+  """
+  Logs CPU/RAM load from the background sampler without blocking startup.
+  The check runs as soon as the sampler has its first sample.
+  """
+  if not resource_sampler.available:
+    logger.warning("System Check skipped: psutil is not installed.")
+    return
+  resource_sampler.when_ready(_log_system_load)
+
+def _log_system_load(sample):
+  cpu_percent = sample['cpu_percent']
+  ram_percent = sample['ram_percent']
 
   logger.info(f"System Check: CPU Usage: {cpu_percent}% | RAM Usage: {ram_percent}%")
 
@@ -77,81 +86,81 @@ def create_initial_vfs_structure(vfs_manager: VFSManager):
 
   if readme_content.get('error') or not readme_content.get('content'):
     logger.info("VFS appears empty or default files are missing. Initializing default structure...")
-    try:
-      # Create core directories
-      vfs_manager.create_directory('/home')
-      vfs_manager.create_directory('/home/guest')
-      vfs_manager.create_directory('/home/guest/Desktop')
-      vfs_manager.create_directory('/home/guest/documents')
-      vfs_manager.create_directory('/home/guest/downloads')
-      vfs_manager.create_directory('/home/guest/python_scripts')
-      vfs_manager.create_directory('/bin')
-      vfs_manager.create_directory('/etc')
-      vfs_manager.create_directory('/tmp')
-      vfs_manager.create_directory('/pepx_raw_data') # Dedicated folder for PEPx raw data
-
-      # Populate with initial files
-      vfs_manager.write_file(readme_path,
-                             f"Welcome to OBPI (Operational in Browser Persisted Instance) v1.0!\n"
-                             f"This is a fully integrated virtual machine environment.\n"
-                             f"All changes to the file system are persisted on your host machine at '{DB_PATH}'.\n\n"
-                             f"Explore the Python IDE, embedded browser, and peripheral manager.\n"
-                             f"Right-click desktop for options. Click 'OBPI' button for Start Menu.\n"
-                             f"Type 'help' in the terminal for a list of commands.")
-      vfs_manager.write_file('/home/guest/documents/project_plan_v1.0.txt',
-                             f"Project Plan for OBPI v1.0 (Full Features)\n\n"
-                             f"- Full Pywebview Integration\n"
-                             f"- Persistent File System (SQLite backend)\n"
-                             f"- Embedded Browser with History/Bookmarks\n"
-                             f"- Complete Python IDE\n"
-                             f"- PEPx Raw Data Storage (in VFS)\n"
-                             f"- Real USB Peripheral Detection\n"
-                             f"- Conceptual Compiler Framework\n"
-                             f"- Enhanced AI Assistant")
-      vfs_manager.write_file('/home/guest/python_scripts/hello.py',
-                             'print("Hello from Python in OBPI!")\nprint("This script is managed by the backend VFS.")\n')
-      vfs_manager.write_file('/home/guest/python_scripts/example.obsh',
-                             'echo "Running OBPI Shell Script"\ndate\nls /home/guest/python_scripts\n')
-      vfs_manager.write_file('/etc/obpi.config',
-                             f"version=1.0\nprompt=guest@OBPI:~# \ntheme=dark\n")
-      vfs_manager.write_file('/etc/hosts.sim',
-                             '127.0.0.1 localhost.obpi\n10.0.0.1 virtual.server.obpi\n')
-
-      # Populate /bin with dummy executables for CLI commands
-      # These are just placeholders to make 'exec' and tab-completion work conceptually.
-      # The actual logic is in AppManager.cliCommands in index.html.
-      vfs_manager.write_file('/bin/curl', '#!/bin/simulated_executable\n# Handles web requests.')
-      vfs_manager.write_file('/bin/wget', '#!/bin/simulated_executable\n# Downloads files from web.')
-      vfs_manager.write_file('/bin/exec', '#!/bin/simulated_executable\n# Executes files.')
-      vfs_manager.write_file('/bin/mv', '#!/bin/simulated_executable\n# Moves files.')
-      vfs_manager.write_file('/bin/cp', '#!/bin/simulated_executable\n# Copies files.')
-      vfs_manager.write_file('/bin/pkg_build', '#!/bin/obsh\n# Conceptual package builder.')
-      vfs_manager.write_file('/bin/process_list', '#!/bin/obsh\n# Lists processes.')
-      vfs_manager.write_file('/bin/resource_monitor', '#!/bin/obsh\n# Monitors system resources.')
-      vfs_manager.write_file('/bin/usb_scan', '#!/bin/obsh\n# Scans USB devices.')
-      vfs_manager.write_file('/bin/c_compile', '#!/bin/obsh\n# C compiler wrapper.')
-      vfs_manager.write_file('/bin/cpp_compile', '#!/bin/obsh\n# C++ compiler wrapper.')
-      vfs_manager.write_file('/bin/csharp_compile', '#!/bin/obsh\n# C# compiler wrapper.')
-      vfs_manager.write_file('/bin/go_compile', '#!/bin/obsh\n# Go compiler wrapper.')
-      vfs_manager.write_file('/bin/rust_compile', '#!/bin/obsh\n# Rust compiler wrapper.')
-      vfs_manager.write_file('/bin/haskell_compile', '#!/bin/obsh\n# Haskell compiler wrapper.')
-      vfs_manager.write_file('/bin/cobol_compile', '#!/bin/obsh\n# Cobol compiler wrapper.')
-      vfs_manager.write_file('/bin/fortran_compile', '#!/bin/obsh\n# Fortran compiler wrapper.')
-      vfs_manager.write_file('/bin/lua_run', '#!/bin/obsh\n# Lua interpreter wrapper.')
-      vfs_manager.write_file('/bin/emcc_compile', '#!/bin/obsh\n# Emscripten conceptual compiler.')
-      vfs_manager.write_file('/bin/hex_to_webgl', '#!/bin/obsh\n# Hex to WebGL conceptual compiler.')
-
-
-      logger.info("Default VFS structure initialized successfully.")
-    except Exception as e:
-      logger.error(f"Error initializing default VFS structure: {e}")
+    seed_manifest = {
+      "directories": [
+        '/home',
+        '/home/guest',
+        '/home/guest/Desktop',
+        '/home/guest/documents',
+        '/home/guest/downloads',
+        '/home/guest/python_scripts',
+        '/bin',
+        '/etc',
+        '/tmp',
+        '/pepx_raw_data', # Dedicated folder for PEPx raw data
+      ],
+      "files": {
+        readme_path: f"Welcome to OBPI (Operational in Browser Persisted Instance) v1.0!\n"
+                     f"This is a fully integrated virtual machine environment.\n"
+                     f"All changes to the file system are persisted on your host machine at '{DB_PATH}'.\n\n"
+                     f"Explore the Python IDE, embedded browser, and peripheral manager.\n"
+                     f"Right-click desktop for options. Click 'OBPI' button for Start Menu.\n"
+                     f"Type 'help' in the terminal for a list of commands.",
+        '/home/guest/documents/project_plan_v1.0.txt': f"Project Plan for OBPI v1.0 (Full Features)\n\n"
+                                                       f"- Full Pywebview Integration\n"
+                                                       f"- Persistent File System (SQLite backend)\n"
+                                                       f"- Embedded Browser with History/Bookmarks\n"
+                                                       f"- Complete Python IDE\n"
+                                                       f"- PEPx Raw Data Storage (in VFS)\n"
+                                                       f"- Real USB Peripheral Detection\n"
+                                                       f"- Conceptual Compiler Framework\n"
+                                                       f"- Enhanced AI Assistant",
+        '/home/guest/python_scripts/hello.py': 'print("Hello from Python in OBPI!")\nprint("This script is managed by the backend VFS.")\n',
+        '/home/guest/python_scripts/example.obsh': 'echo "Running OBPI Shell Script"\ndate\nls /home/guest/python_scripts\n',
+        '/etc/obpi.config': f"version=1.0\nprompt=guest@OBPI:~# \ntheme=dark\n",
+        '/etc/hosts.sim': '127.0.0.1 localhost.obpi\n10.0.0.1 virtual.server.obpi\n',
+
+        # Populate /bin with dummy executables for CLI commands
+        # These are just placeholders to make 'exec' and tab-completion work conceptually.
+        # The actual logic is in AppManager.cliCommands in index.html.
+        '/bin/curl': '#!/bin/simulated_executable\n# Handles web requests.',
+        '/bin/wget': '#!/bin/simulated_executable\n# Downloads files from web.',
+        '/bin/exec': '#!/bin/simulated_executable\n# Executes files.',
+        '/bin/mv': '#!/bin/simulated_executable\n# Moves files.',
+        '/bin/cp': '#!/bin/simulated_executable\n# Copies files.',
+        '/bin/pkg_build': '#!/bin/obsh\n# Conceptual package builder.',
+        '/bin/process_list': '#!/bin/obsh\n# Lists processes.',
+        '/bin/resource_monitor': '#!/bin/obsh\n# Monitors system resources.',
+        '/bin/usb_scan': '#!/bin/obsh\n# Scans USB devices.',
+        '/bin/c_compile': '#!/bin/obsh\n# C compiler wrapper.',
+        '/bin/cpp_compile': '#!/bin/obsh\n# C++ compiler wrapper.',
+        '/bin/csharp_compile': '#!/bin/obsh\n# C# compiler wrapper.',
+        '/bin/go_compile': '#!/bin/obsh\n# Go compiler wrapper.',
+        '/bin/rust_compile': '#!/bin/obsh\n# Rust compiler wrapper.',
+        '/bin/haskell_compile': '#!/bin/obsh\n# Haskell compiler wrapper.',
+        '/bin/cobol_compile': '#!/bin/obsh\n# Cobol compiler wrapper.',
+        '/bin/fortran_compile': '#!/bin/obsh\n# Fortran compiler wrapper.',
+        '/bin/lua_run': '#!/bin/obsh\n# Lua interpreter wrapper.',
+        '/bin/emcc_compile': '#!/bin/obsh\n# Emscripten conceptual compiler.',
+        '/bin/hex_to_webgl': '#!/bin/obsh\n# Hex to WebGL conceptual compiler.',
+      },
+    }
+
+    # Everything is validated up front and inserted in one transaction
+    result = vfs_manager.import_tree(seed_manifest)
+    if result.get('error'):
+      logger.error(f"Error initializing default VFS structure: {result['error']}")
+    else:
+      logger.info(f"Default VFS structure initialized successfully. {result['message']}")
 
 # --- Main Application Launch Function ---
 def main():
   logger.info("Starting OBPI application...")
 
-  # 1. Perform System Check
-  perform_system_check()
+  # 1. Start resource sampling; the system check reports once the first sample arrives
+  resource_sampler = ResourceSampler()
+  resource_sampler.start()
+  perform_system_check(resource_sampler)
 
   # 2. Initialize DB Manager and VFS Manager
   db_manager = DBManager(db_path=DB_PATH)
@@ -161,9 +170,11 @@ def main():
   create_initial_vfs_structure(vfs_manager)
 
   # 4. Create the pywebview window and expose the BackendAPI
-  # Pass the DB_PATH to BackendAPI so it can manage its own DBManager instance
+  # The BackendAPI shares the DB and VFS managers created above, so the database
+  # is opened and its schema/root checks run only once per process.
   # The 'js_api' will be an instance of BackendAPI
-  api = BackendAPI(None, db_file_path=DB_PATH) # Initialize with None for window, will set later
+  api = BackendAPI(None, db_manager=db_manager, vfs_manager=vfs_manager,
+                   resource_sampler=resource_sampler) # Initialize with None for window, will set later
 
   window = webview.create_window(
     'OBPI - Operational in Browser Persisted Instance v1.0',
@@ -184,8 +195,10 @@ def main():
   webview.start(debug=True)
   logger.info("OBPI application closed.")
 
-  # 6. Ensure database connection is closed on exit
+  # 6. Ensure the sampler and Python workers are stopped and the database connection is closed on exit
+  resource_sampler.stop()
+  api.python_sandbox.shutdown()
   db_manager.close()
 
 if __name__ == '__main__':
-  main()WS
+  main()
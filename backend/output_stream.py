@@ -0,0 +1,94 @@
+# backend/output_stream.py
+import codecs
+import threading
+from collections import deque
+
+DEFAULT_MAX_CHARS = 1_000_000
+
+class OutputStream:
+  """
+  Bounded, append-only transcript of a process's stdout/stderr.
+
+  Chunks are numbered as they arrive, so a reader can poll with the cursor
+  returned by its previous read() and get only new output. Once more than
+  max_chars are retained the oldest chunks are dropped, which caps memory
+  however chatty the program is; readers that fall behind are told so.
+  """
+  def __init__(self, max_chars=DEFAULT_MAX_CHARS):
+    self.max_chars = max_chars
+    self._chunks = deque() # (seq, stream, text)
+    self._next_seq = 0
+    self._retained_chars = 0
+    self._dropped_chars = 0
+    self._closed = False
+    self._cond = threading.Condition()
+
+  def write(self, stream, text):
+    if not text:
+      return
+    with self._cond:
+      if len(text) > self.max_chars:
+        self._dropped_chars += len(text) - self.max_chars
+        text = text[-self.max_chars:]
+      chunk = (self._next_seq, stream, text)
+      self._next_seq += 1
+      self._chunks.append(chunk)
+      self._retained_chars += len(text)
+      while self._retained_chars > self.max_chars:
+        _, _, dropped = self._chunks.popleft()
+        self._retained_chars -= len(dropped)
+        self._dropped_chars += len(dropped)
+      self._cond.notify_all()
+
+  def close(self):
+    with self._cond:
+      self._closed = True
+      self._cond.notify_all()
+
+  @property
+  def closed(self):
+    return self._closed
+
+  def read(self, cursor=0, timeout=None):
+    """
+    Returns the chunks with seq >= cursor and the cursor for the next call.
+    With a timeout, waits up to that many seconds for new output first.
+    'missed' is True when some requested chunks were already dropped.
+    """
+    with self._cond:
+      if timeout and cursor >= self._next_seq and not self._closed:
+        self._cond.wait(timeout)
+      first_seq = self._chunks[0][0] if self._chunks else self._next_seq
+      chunks = [{"seq": seq, "stream": stream, "text": text}
+                for seq, stream, text in self._chunks if seq >= cursor]
+      return {
+        "chunks": chunks,
+        "cursor": self._next_seq,
+        "missed": cursor < first_seq,
+        "finished": self._closed,
+        "droppedChars": self._dropped_chars,
+      }
+
+  def text(self, stream=None):
+    """Joins the retained output (optionally of one stream), marking any dropped prefix."""
+    with self._cond:
+      text = "".join(chunk_text for _, chunk_stream, chunk_text in self._chunks
+                     if stream is None or chunk_stream == stream)
+      dropped_chars = self._dropped_chars
+    if dropped_chars:
+      return f"[... {dropped_chars} characters of earlier output dropped ...]\n{text}"
+    return text
+
+def pump_pipe(pipe, stream, sinks, read_size=8192):
+  """Reads a binary pipe until EOF and writes decoded text to every sink as it arrives."""
+  decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+  try:
+    for data in iter(lambda: pipe.read1(read_size), b''):
+      text = decoder.decode(data)
+      for sink in sinks:
+        sink.write(stream, text)
+    tail = decoder.decode(b'', final=True)
+    for sink in sinks:
+      sink.write(stream, tail)
+  finally:
+    pipe.close()
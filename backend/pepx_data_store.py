@@ -1,6 +1,10 @@
 # backend/pepx_data_store.py
 import base64
+import hashlib
 import logging
+import sqlite3
+import uuid
+from datetime import datetime
 from backend.vfs_manager import VFSManager
 
 logger = logging.getLogger('PEPx_Data_Store')
@@ -11,6 +15,7 @@ PEPX_RAW_DATA_VFS_PATH = "/pepx_raw_data"
 class PEPxDataStore:
   def __init__(self, vfs_manager: VFSManager):
     self.vfs = vfs_manager
+    self.db = vfs_manager.db # Upload sessions live next to the VFS tables
     # Ensure the base directory for PEPx raw data exists in VFS
     self._ensure_pepx_vfs_path()
     logger.info(f"PEPx Data Store initialized. Raw data stored in VFS path: {PEPX_RAW_DATA_VFS_PATH}")
@@ -24,12 +29,35 @@ class PEPxDataStore:
       logger.info(f"PEPx raw data VFS path '{PEPX_RAW_DATA_VFS_PATH}' ensured.")
 
   def _get_pepx_file_path(self, file_id):
-    """Generates the VFS path for a PEPx raw data file."""
+    """Generates the VFS path for a PEPx raw data file (raw bytes)."""
+    return f"{PEPX_RAW_DATA_VFS_PATH}/{file_id}.raw"
+
+  def _get_legacy_pepx_file_path(self, file_id):
+    """VFS path used before raw bytes were stored directly (base64 text)."""
     return f"{PEPX_RAW_DATA_VFS_PATH}/{file_id}.bin"
 
+  def _migrate_legacy_raw_data(self, file_id):
+    """
+    Converts a legacy base64 '.bin' file to a raw '.raw' file on first access.
+    :return: True if a legacy file was found and converted.
+    """
+    legacy_path = self._get_legacy_pepx_file_path(file_id)
+    if not self.vfs.get_node_info(legacy_path):
+      return False
+    logger.info(f"PEPx Data Store: Converting legacy base64 data for ID '{file_id}' to raw bytes.")
+    legacy_response = self.vfs.get_file_content(legacy_path)
+    if legacy_response.get("error"):
+      raise Exception(legacy_response["error"])
+    write_response = self.vfs.write_file_bytes(self._get_pepx_file_path(file_id), base64.b64decode(legacy_response["content"]))
+    if write_response.get("error"):
+      raise Exception(write_response["error"])
+    self.vfs.delete_path(legacy_path, recursive=False)
+    return True
+
   def store_raw_data(self, file_id, base64_data):
     """
-    Stores base64 encoded raw data into a VFS file.
+    Stores raw data into a VFS file. The payload is decoded once on ingest and
+    kept as raw bytes.
     :param file_id: Unique ID for the PEPx file.
     :param base64_data: The raw data, base64 encoded.
     :return: Success/error dictionary.
@@ -37,37 +65,40 @@ class PEPxDataStore:
     file_path = self._get_pepx_file_path(file_id)
     logger.info(f"PEPx Data Store: Storing raw data for ID '{file_id}' to VFS path '{file_path}'")
     try:
-      # Decode base64 to bytes before storing, or store as base64 string directly
-      # Storing as base64 string for simplicity as VFS stores text content.
-      # If large binary data needs to be efficient, VFSManager.write_file might need
-      # to handle bytes directly or use a different storage backend (e.g., host filesystem).
-      # For now, base64 is fine for text content in VFS.
-      write_response = self.vfs.write_file(file_path, base64_data)
+      raw_bytes = base64.b64decode(base64_data, validate=True)
+      write_response = self.vfs.write_file_bytes(file_path, raw_bytes)
       if write_response.get("error"):
         raise Exception(write_response["error"])
-      logger.info(f"PEPx Data Store: Raw data for ID '{file_id}' stored successfully.")
-      return {"status": "success"}
+      if self.vfs.get_node_info(self._get_legacy_pepx_file_path(file_id)):
+        self.vfs.delete_path(self._get_legacy_pepx_file_path(file_id), recursive=False)
+      logger.info(f"PEPx Data Store: Raw data for ID '{file_id}' stored successfully ({len(raw_bytes)} bytes).")
+      return {"status": "success", "size": len(raw_bytes)}
     except Exception as e:
       logger.error(f"PEPx Data Store: Failed to store raw data for ID '{file_id}': {e}")
       return {"error": str(e)}
 
-  def get_raw_data(self, file_id):
+  def get_raw_data(self, file_id, offset=0, length=None):
     """
-    Retrieves base64 encoded raw data from a VFS file.
+    Retrieves raw data from a VFS file. Only the requested byte range is read
+    and base64 encoded.
     :param file_id: Unique ID for the PEPx file.
-    :return: Dictionary with 'rawData' (base64 string) or 'error'.
+    :param offset: First byte to return.
+    :param length: Number of bytes to return; None returns everything from offset.
+    :return: Dictionary with 'rawData' (base64 string), 'offset', 'totalSize' or 'error'.
     """
     file_path = self._get_pepx_file_path(file_id)
     logger.info(f"PEPx Data Store: Retrieving raw data for ID '{file_id}' from VFS path '{file_path}'")
     try:
-      read_response = self.vfs.get_file_content(file_path)
+      if not self.vfs.get_node_info(file_path) and not self._migrate_legacy_raw_data(file_id):
+        raise Exception(f"No raw data found for ID: {file_id}")
+      read_response = self.vfs.read_file_range(file_path, offset, length)
       if read_response.get("error"):
         raise Exception(read_response["error"])
-      raw_data_base64 = read_response.get("content", "")
-      if not raw_data_base64:
-        raise Exception(f"No raw data found for ID: {file_id}")
+      raw_bytes = read_response["data"]
+      raw_data_base64 = base64.b64encode(raw_bytes).decode('ascii')
       logger.info(f"PEPx Data Store: Raw data for ID '{file_id}' retrieved successfully.")
-      return {"rawData": raw_data_base64, "error": None}
+      return {"rawData": raw_data_base64, "offset": offset, "totalSize": read_response["size"],
+              "checksum": hashlib.sha256(raw_bytes).hexdigest(), "error": None}
     except Exception as e:
       logger.error(f"PEPx Data Store: Failed to retrieve raw data for ID '{file_id}': {e}")
       return {"rawData": None, "error": str(e)}
@@ -81,15 +112,148 @@ class PEPxDataStore:
     file_path = self._get_pepx_file_path(file_id)
     logger.info(f"PEPx Data Store: Deleting raw data for ID '{file_id}' from VFS path '{file_path}'")
     try:
-      delete_response = self.vfs.delete_path(file_path, recursive=False)
-      if delete_response.get("error"):
-        raise Exception(delete_response["error"])
+      legacy_path = self._get_legacy_pepx_file_path(file_id)
+      had_legacy = self.vfs.get_node_info(legacy_path) is not None
+      if had_legacy:
+        self.vfs.delete_path(legacy_path, recursive=False)
+      if not had_legacy or self.vfs.get_node_info(file_path):
+        delete_response = self.vfs.delete_path(file_path, recursive=False)
+        if delete_response.get("error"):
+          raise Exception(delete_response["error"])
       logger.info(f"PEPx Data Store: Raw data for ID '{file_id}' deleted successfully.")
       return {"status": "success"}
     except Exception as e:
       logger.error(f"PEPx Data Store: Failed to delete raw data for ID '{file_id}': {e}")
       return {"error": str(e)}
 
+  # --- Chunked uploads ---
+  # The frontend streams a file as base64 chunks tagged with their byte offset and
+  # SHA-256 checksum. Chunks are persisted as they arrive, so an interrupted upload
+  # resumes from get_upload_status()['committedBytes'] instead of starting over.
+
+  def begin_upload(self, file_id, total_size=None):
+    """
+    Opens a chunked upload session for a PEPx file.
+    :param file_id: Unique ID for the PEPx file.
+    :param total_size: Expected size in bytes, verified on commit (optional).
+    :return: Dictionary with 'uploadId' or 'error'.
+    """
+    upload_id = uuid.uuid4().hex
+    logger.info(f"PEPx Data Store: Beginning upload '{upload_id}' for ID '{file_id}' (total_size={total_size})")
+    try:
+      with self.db.transaction():
+        self.db.execute_query(
+          "INSERT INTO pepx_uploads (upload_id, file_id, total_size, created) VALUES (?, ?, ?, ?)",
+          (upload_id, file_id, total_size, datetime.now().isoformat())
+        )
+      return {"uploadId": upload_id, "error": None}
+    except sqlite3.Error as e:
+      logger.error(f"PEPx Data Store: Failed to begin upload for ID '{file_id}': {e}")
+      return {"uploadId": None, "error": str(e)}
+
+  def append_chunk(self, upload_id, offset, base64_chunk, checksum):
+    """
+    Stores one chunk of an upload. Re-sending a chunk at the same offset replaces it.
+    :param upload_id: Session ID from begin_upload.
+    :param offset: Byte offset of the chunk within the file.
+    :param base64_chunk: The chunk bytes, base64 encoded.
+    :param checksum: SHA-256 hex digest of the decoded chunk bytes.
+    :return: Success/error dictionary.
+    """
+    try:
+      if not self._get_upload(upload_id):
+        raise Exception(f"No such upload: {upload_id}")
+      if offset < 0:
+        raise Exception(f"Invalid chunk offset: {offset}")
+      chunk = base64.b64decode(base64_chunk, validate=True)
+      actual_checksum = hashlib.sha256(chunk).hexdigest()
+      if actual_checksum != str(checksum).lower():
+        raise Exception(f"Checksum mismatch for chunk at offset {offset}")
+      with self.db.transaction():
+        self.db.execute_query(
+          "INSERT OR REPLACE INTO pepx_upload_chunks (upload_id, byte_offset, size, checksum, data) VALUES (?, ?, ?, ?, ?)",
+          (upload_id, offset, len(chunk), actual_checksum, sqlite3.Binary(chunk))
+        )
+      return {"status": "success", "offset": offset, "size": len(chunk)}
+    except Exception as e:
+      logger.error(f"PEPx Data Store: Failed to append chunk at offset {offset} to upload '{upload_id}': {e}")
+      return {"error": str(e)}
+
+  def get_upload_status(self, upload_id):
+    """
+    Reports how much of an upload has arrived.
+    :return: Dictionary with 'committedBytes' (length of the contiguous prefix
+             received so far, i.e. where to resume), 'chunks' and 'totalSize', or 'error'.
+    """
+    upload = self._get_upload(upload_id)
+    if not upload:
+      return {"error": f"No such upload: {upload_id}"}
+    chunks = self.db.execute_query(
+      "SELECT byte_offset, size, checksum FROM pepx_upload_chunks WHERE upload_id = ? ORDER BY byte_offset",
+      (upload_id,), fetch_all=True
+    )
+    committed_bytes = 0
+    for chunk in chunks:
+      if chunk['byte_offset'] != committed_bytes:
+        break
+      committed_bytes += chunk['size']
+    return {"fileId": upload['file_id'], "totalSize": upload['total_size'], "committedBytes": committed_bytes,
+            "chunks": [dict(chunk) for chunk in chunks], "error": None}
+
+  def commit_upload(self, upload_id):
+    """
+    Assembles the received chunks into the PEPx file and closes the session.
+    Fails if the chunks have gaps or overlaps, or do not add up to total_size.
+    """
+    logger.info(f"PEPx Data Store: Committing upload '{upload_id}'")
+    try:
+      upload = self._get_upload(upload_id)
+      if not upload:
+        raise Exception(f"No such upload: {upload_id}")
+      # Only chunk metadata is loaded here; the bytes are streamed into the file one chunk at a time
+      chunks = self.db.execute_query(
+        "SELECT rowid, byte_offset, size FROM pepx_upload_chunks WHERE upload_id = ? ORDER BY byte_offset",
+        (upload_id,), fetch_all=True
+      )
+      expected_offset = 0
+      for chunk in chunks:
+        if chunk['byte_offset'] != expected_offset:
+          raise Exception(f"Upload is missing data at offset {expected_offset}")
+        expected_offset += chunk['size']
+      if upload['total_size'] is not None and expected_offset != upload['total_size']:
+        raise Exception(f"Upload has {expected_offset} of {upload['total_size']} bytes")
+
+      file_path = self._get_pepx_file_path(upload['file_id'])
+      chunk_data = (self.db.read_blob('pepx_upload_chunks', 'data', chunk['rowid']) for chunk in chunks)
+      with self.db.transaction():
+        write_response = self.vfs.write_file_chunks(file_path, expected_offset, chunk_data)
+        if write_response.get("error"):
+          raise Exception(write_response["error"])
+        self._delete_upload(upload_id)
+      logger.info(f"PEPx Data Store: Upload '{upload_id}' committed to '{file_path}' ({expected_offset} bytes).")
+      return {"status": "success", "size": expected_offset}
+    except Exception as e:
+      logger.error(f"PEPx Data Store: Failed to commit upload '{upload_id}': {e}")
+      return {"error": str(e)}
+
+  def abort_upload(self, upload_id):
+    """Discards an upload session and any chunks received for it."""
+    logger.info(f"PEPx Data Store: Aborting upload '{upload_id}'")
+    try:
+      with self.db.transaction():
+        self._delete_upload(upload_id)
+      return {"status": "success"}
+    except sqlite3.Error as e:
+      logger.error(f"PEPx Data Store: Failed to abort upload '{upload_id}': {e}")
+      return {"error": str(e)}
+
+  def _get_upload(self, upload_id):
+    return self.db.execute_query("SELECT * FROM pepx_uploads WHERE upload_id = ?", (upload_id,), fetch_one=True)
+
+  def _delete_upload(self, upload_id):
+    self.db.execute_query("DELETE FROM pepx_upload_chunks WHERE upload_id = ?", (upload_id,))
+    self.db.execute_query("DELETE FROM pepx_uploads WHERE upload_id = ?", (upload_id,))
+
   def reset_pepx_raw_data(self):
     """Deletes the entire PEPx raw data VFS path."""
     logger.warning(f"PEPx Data Store: Resetting all raw data in '{PEPX_RAW_DATA_VFS_PATH}'!")
@@ -97,7 +261,9 @@ class PEPxDataStore:
     if delete_response.get("error"):
       logger.error(f"Failed to reset PEPx raw data: {delete_response['error']}")
       return {"status": "error", "message": f"Failed to reset PEPx raw data: {delete_response['error']}"}
-    # Re-create the base directory
+    # Drop pending upload sessions and re-create the base directory
+    self.db.execute_query("DELETE FROM pepx_upload_chunks")
+    self.db.execute_query("DELETE FROM pepx_uploads")
     self._ensure_pepx_vfs_path()
     logger.info("PEPx Data Store: All raw data deleted and base directory re-created.")
     return {"status": "success", "message": "PEPx raw data reset successfully."}
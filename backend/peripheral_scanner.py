@@ -32,7 +32,9 @@ except ImportError:
   logger.warning("pyaudio not found. Microphone device scanning will be disabled. Install with 'pip install PyAudio'.")
 
 class PeripheralScanner:
-  def __init__(self):
+  def __init__(self, resource_sampler=None):
+    # Optional ResourceSampler; supplies CPU usage without blocking on psutil
+    self.resource_sampler = resource_sampler
     logger.info("Peripheral Scanner initialized.")
     self.virtual_driver_status = {
       "status": "active",
@@ -62,7 +64,11 @@ class PeripheralScanner:
       import psutil
       info["total_memory_gb"] = round(psutil.virtual_memory().total / (1024**3), 2)
       info["available_memory_gb"] = round(psutil.virtual_memory().available / (1024**3), 2)
-      info["cpu_percent_usage"] = psutil.cpu_percent(interval=1) # Get real-time CPU usage
+      latest_sample = self.resource_sampler.latest() if self.resource_sampler else None
+      if latest_sample:
+        info["cpu_percent_usage"] = latest_sample["cpu_percent"] # Most recent background sample
+      else:
+        info["cpu_percent_usage"] = psutil.cpu_percent(interval=None) # Non-blocking; usage since the last call
       info["total_cpu_cores"] = psutil.cpu_count(logical=True)
       info["physical_cpu_cores"] = psutil.cpu_count(logical=False)
       logger.info("psutil imported and system info collected.")
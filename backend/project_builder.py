@@ -0,0 +1,194 @@
+# backend/project_builder.py
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from backend.compile_cache import CompileCache
+
+logger = logging.getLogger('Project_Builder')
+
+DEFAULT_OBJECT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.obpi_data', 'object_cache')
+
+# Languages with a separate compile (-c) and link step, and their translation unit extensions
+PROJECT_LANGUAGES = {
+  'c': ('.c',),
+  'cpp': ('.cpp', '.cc', '.cxx'),
+}
+INCLUDE_DIRS = ('', 'include') # Relative to the project root, searched for #include "..." and <...>
+INCLUDE_RE = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*([<"])([^>"\r\n]+)[>"]', re.MULTILINE)
+OBJECT_NAME = 'unit.o'
+
+class ProjectBuilder:
+  """
+  Incremental builds of multi-file C/C++ projects.
+
+  Each translation unit is compiled to an object file cached under a key that
+  covers its own content and the content of every header it includes, directly
+  or transitively, from the project or from an -I/-iquote directory in cflags. After an edit only the units that can see the
+  change are recompiled, in parallel. The link is cached by the set of object
+  keys, so a project where nothing changed is neither recompiled nor relinked.
+  """
+  def __init__(self, compiler_runner, object_cache: CompileCache = None, max_workers=None):
+    self.compiler_runner = compiler_runner
+    self.object_cache = object_cache if object_cache is not None else CompileCache(DEFAULT_OBJECT_CACHE_DIR, max_bytes=512 * 1024 * 1024)
+    self.max_workers = max_workers or os.cpu_count() or 2
+
+  @staticmethod
+  def _flag_include_dirs(cflags):
+    """Returns (quote_dirs, include_dirs) from the -iquote and -I options in cflags, in command-line order."""
+    quote_dirs, include_dirs = [], []
+    flags = iter(cflags)
+    for flag in flags:
+      for option, dirs in (('-iquote', quote_dirs), ('-I', include_dirs)):
+        if flag == option:
+          directory = next(flags, None)
+          if directory is not None:
+            dirs.append(directory)
+          break
+        if flag.startswith(option):
+          dirs.append(flag[len(option):])
+          break
+    return quote_dirs, include_dirs
+
+  def _resolve_include(self, including_path, delimiter, name, files, flag_dirs):
+    """
+    Finds an included file the way the compiler searches: the including file's
+    directory and -iquote directories for "...", then INCLUDE_DIRS and the -I
+    directories. Relative directories are inside the project (the compiler runs
+    in its root); a header found in an absolute directory is returned by its
+    absolute path.
+    """
+    quote_dirs, include_dirs = flag_dirs
+    search_dirs = [os.path.dirname(including_path)] + quote_dirs if delimiter == b'"' else []
+    search_dirs.extend(INCLUDE_DIRS)
+    search_dirs.extend(include_dirs)
+    for directory in search_dirs:
+      candidate = os.path.normpath(os.path.join(directory, name))
+      if os.path.isabs(candidate):
+        if os.path.isfile(candidate):
+          return candidate
+        continue
+      candidate = candidate.replace('\\', '/')
+      if candidate in files:
+        return candidate
+    return None # A system header; covered by the compiler version in the key
+
+  def _header_content(self, path, files):
+    if path in files:
+      return files[path]
+    try:
+      with open(path, 'rb') as f:
+        return f.read()
+    except OSError:
+      return b'' # Removed since it was resolved; the compile will report it
+
+  def _project_headers(self, unit_path, files, direct_includes, flag_dirs):
+    """Returns every header that unit_path includes, directly or transitively, apart from system headers."""
+    seen = set()
+    stack = [unit_path]
+    while stack:
+      path = stack.pop()
+      if path not in direct_includes:
+        direct_includes[path] = [resolved for resolved in
+                                 (self._resolve_include(path, delimiter, name.decode('utf-8', errors='replace'), files, flag_dirs)
+                                  for delimiter, name in INCLUDE_RE.findall(self._header_content(path, files)))
+                                 if resolved is not None]
+      for header in direct_includes[path]:
+        if header not in seen and header != unit_path:
+          seen.add(header)
+          stack.append(header)
+    return sorted(seen)
+
+  def build_and_run(self, lang, files, cflags=None, ldflags=None, run=True, cancel_event=None, output_stream=None):
+    """
+    Builds (and by default runs) a project.
+    :param files: {path relative to the project root: bytes or str}, e.g. from VFSManager.read_tree.
+    :param cflags: Extra compiler flags for every unit, e.g. ['-O2', '-DNDEBUG'].
+    :param ldflags: Extra linker flags, e.g. ['-lm'].
+    """
+    if lang not in PROJECT_LANGUAGES:
+      return {"status": "error", "output": f"Project builds are not supported for {lang}; use one of: {', '.join(PROJECT_LANGUAGES)}."}
+    runner = self.compiler_runner
+    compiler_info = runner.compilers[lang]
+    cflags = list(cflags or [])
+    ldflags = list(ldflags or [])
+    files = {path: content.encode('utf-8') if isinstance(content, str) else content for path, content in files.items()}
+    units = sorted(path for path in files if path.endswith(PROJECT_LANGUAGES[lang]))
+    if not units:
+      return {"status": "error", "output": f"No {lang.upper()} source files found in project."}
+
+    compiler_version = runner.toolchains.version(lang)
+    file_hashes = {path: hashlib.sha256(content).hexdigest() for path, content in files.items()}
+    flag_dirs = self._flag_include_dirs(cflags)
+    direct_includes = {}
+    unit_keys = {}
+    for unit in units:
+      headers = self._project_headers(unit, files, direct_includes, flag_dirs)
+      for header in headers:
+        if header not in file_hashes: # Outside the project, from an absolute -I directory
+          file_hashes[header] = hashlib.sha256(self._header_content(header, files)).hexdigest()
+      manifest = "\n".join(f"{path}\0{file_hashes[path]}" for path in [unit] + headers)
+      unit_keys[unit] = CompileCache.make_key(lang, compiler_version, ['-c'] + cflags, manifest)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+      # Cached objects and executables are linked into tmpdir, so a concurrent eviction cannot remove them mid-build
+      cached_objects = {unit: self.object_cache.lookup(unit_keys[unit], OBJECT_NAME, dest_dir=os.path.join(tmpdir, '.cached', str(index)))
+                        for index, unit in enumerate(units)}
+      stale_units = [unit for unit in units if cached_objects[unit] is None]
+      logger.info(f"Project build ({lang}): {len(units)} units, {len(stale_units)} to compile.")
+
+      for path, content in files.items():
+        file_path = os.path.join(tmpdir, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+          f.write(content)
+      include_flags = []
+      for include_dir in INCLUDE_DIRS:
+        include_flags.extend(['-I', os.path.join(tmpdir, include_dir)])
+
+      def compile_unit(index, unit):
+        object_path = os.path.join(tmpdir, '.obj', str(index), OBJECT_NAME)
+        os.makedirs(os.path.dirname(object_path))
+        compile_cmd = [compiler_info['cmd'], '-c', os.path.join(tmpdir, unit), '-o', object_path] + include_flags + cflags
+        return runner._run_process(compile_cmd, tmpdir, cancel_event, output_stream, timeout=runner.compile_timeout), object_path
+
+      if stale_units:
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(stale_units))) as executor:
+          compiled = list(executor.map(compile_unit, range(len(stale_units)), stale_units))
+        failures = []
+        for unit, (result, object_path) in zip(stale_units, compiled):
+          if result.returncode != 0 or result.limit_exceeded:
+            failures.append(f"{unit}:\n{result.stdout}{result.stderr}")
+            continue
+          self.object_cache.store(unit_keys[unit], object_path, result.stdout, result.stderr)
+          cached_objects[unit] = {"artifact": object_path, "compile_stdout": result.stdout, "compile_stderr": result.stderr}
+        if failures:
+          logger.error(f"Project build ({lang}): {len(failures)} of {len(stale_units)} units failed to compile.")
+          return {"status": "error", "output": "Compilation Error:\n" + "\n".join(failures)}
+
+      compile_stdout = "".join(cached_objects[unit]['compile_stdout'] for unit in units)
+      compile_stderr = "".join(cached_objects[unit]['compile_stderr'] for unit in units)
+      unit_stats = {"total": len(units), "compiled": len(stale_units), "cached": len(units) - len(stale_units)}
+
+      executable_name = runner._executable_name(compiler_info)
+      link_key = CompileCache.make_key(lang, compiler_version, ['link'] + ldflags, "\n".join(unit_keys[unit] for unit in units))
+      linked = runner.compile_cache.lookup(link_key, executable_name, dest_dir=tmpdir)
+      link_cache_hit = linked is not None
+      if not link_cache_hit:
+        executable_path = os.path.join(tmpdir, executable_name)
+        link_cmd = [compiler_info['cmd']] + [cached_objects[unit]['artifact'] for unit in units] + ['-o', executable_path] + ldflags
+        link_result = runner._run_process(link_cmd, tmpdir, cancel_event, output_stream, timeout=runner.compile_timeout)
+        if link_result.returncode != 0 or link_result.limit_exceeded:
+          logger.error(f"Project link failed ({lang}): {link_result.stderr}")
+          return {"status": "error", "output": f"Link Error:\n{link_result.stdout}\n{link_result.stderr}", "units": unit_stats}
+        runner.compile_cache.store(link_key, executable_path)
+        linked = {"artifact": executable_path}
+
+      if not run:
+        return {"status": "success", "output": compile_stdout + compile_stderr, "cache_hit": link_cache_hit, "units": unit_stats}
+      result = runner._run_executable(lang, linked['artifact'], tmpdir, compile_stdout, compile_stderr,
+                                      cache_hit=link_cache_hit, cancel_event=cancel_event, output_stream=output_stream)
+      result["units"] = unit_stats
+      return result
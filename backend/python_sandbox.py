@@ -0,0 +1,217 @@
+# backend/python_sandbox.py
+import os
+import sys
+import json
+import queue
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from backend.output_stream import DEFAULT_MAX_CHARS
+
+logger = logging.getLogger('Python_Sandbox')
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), 'python_worker.py')
+# Imported by every worker before it is handed out, so cells that use them start instantly
+DEFAULT_PRELOAD_MODULES = ('math', 'json', 're', 'random', 'datetime', 'collections', 'itertools',
+                           'functools', 'statistics', 'decimal', 'fractions', 'string', 'textwrap')
+DEFAULT_MEMORY_MB = 512 # Address-space cap (RLIMIT_AS) of each worker; None disables it
+
+class PythonWorker:
+  """One warm interpreter process running python_worker.py."""
+  def __init__(self, preload_modules, memory_mb=None, startup_timeout=30):
+    self.process = subprocess.Popen([sys.executable, '-u', WORKER_SCRIPT, str(memory_mb or 0)] + list(preload_modules),
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    text=True, encoding='utf-8')
+    self.lock = threading.Lock() # Held while a cell runs
+    self._responses = queue.Queue()
+    threading.Thread(target=self._read_responses, name=f"PythonWorker-{self.process.pid}", daemon=True).start()
+    try:
+      ready = self._responses.get(timeout=startup_timeout)
+    except queue.Empty:
+      self.kill() # Its stdout closes, which ends the reader thread
+      raise RuntimeError(f"Python worker did not start within {startup_timeout}s.")
+    if not ready or ready.get('status') != 'ready':
+      self.kill()
+      raise RuntimeError("Python worker failed to start.")
+
+  def _read_responses(self):
+    for line in self.process.stdout:
+      self._responses.put(json.loads(line))
+    self._responses.put(None) # EOF: the worker exited
+
+  @property
+  def alive(self):
+    return self.process.poll() is None
+
+  def run(self, code, reset, timeout, max_output_chars):
+    """Runs a cell and returns the worker's response; raises TimeoutError or RuntimeError if the worker is lost."""
+    try:
+      self.process.stdin.write(json.dumps({"code": code, "reset": reset, "max_output_chars": max_output_chars}) + "\n")
+      self.process.stdin.flush()
+      response = self._responses.get(timeout=timeout)
+    except queue.Empty:
+      self.kill()
+      raise TimeoutError()
+    except OSError:
+      response = None
+    if response is None:
+      self.kill()
+      raise RuntimeError("Python worker exited unexpectedly.")
+    return response
+
+  def kill(self):
+    if self.alive:
+      self.process.kill()
+      self.process.wait()
+
+class PythonSandbox:
+  """
+  Runs Python code in a pool of warm worker processes instead of exec() on the backend thread.
+
+  Each session owns a worker, so its namespace persists from cell to cell and a
+  slow cell only blocks that session. Calls without a session take an idle
+  worker and kill it afterwards, so nothing they changed in the interpreter
+  (module attributes, sys.path, ...) leaks into a later call. A cell that
+  exceeds its timeout, or a session that is killed, takes only its own worker
+  down; idle workers are spawned in the background so the next call finds one
+  already warm. Workers run under an address-space cap of memory_mb, and keep
+  only the newest max_output_chars of a cell's output while it runs.
+  """
+  def __init__(self, pool_size=2, max_sessions=8, default_timeout=30, max_output_chars=DEFAULT_MAX_CHARS,
+               preload_modules=DEFAULT_PRELOAD_MODULES, memory_mb=DEFAULT_MEMORY_MB):
+    self.pool_size = pool_size
+    self.max_sessions = max_sessions
+    self.default_timeout = default_timeout
+    self.max_output_chars = max_output_chars
+    self.preload_modules = preload_modules
+    self.memory_mb = memory_mb
+    self._lock = threading.Lock()
+    self._idle = [] # Warm workers not bound to a session
+    self._sessions = OrderedDict() # session_id -> PythonWorker, least recently used first
+    self._spawning = 0
+    self._shutdown = False
+    logger.info(f"Python Sandbox initialized (pool_size={pool_size}, max_sessions={max_sessions}).")
+
+  def start(self):
+    """Warms up the idle pool in the background."""
+    self._refill()
+
+  def _refill(self):
+    with self._lock:
+      missing = self.pool_size - len(self._idle) - self._spawning
+      if self._shutdown or missing <= 0:
+        return
+      self._spawning += missing
+    for _ in range(missing):
+      threading.Thread(target=self._spawn_idle, name="PythonWorkerSpawn", daemon=True).start()
+
+  def _spawn_idle(self):
+    try:
+      worker = PythonWorker(self.preload_modules, self.memory_mb)
+    except Exception as e:
+      logger.error(f"Could not start Python worker: {e}")
+      worker = None
+    with self._lock:
+      self._spawning -= 1
+      if worker and not self._shutdown:
+        self._idle.append(worker)
+        return
+    if worker:
+      worker.kill()
+
+  def _take_idle_worker(self):
+    with self._lock:
+      while self._idle:
+        worker = self._idle.pop()
+        if worker.alive:
+          break
+      else:
+        worker = None
+    self._refill()
+    return worker or PythonWorker(self.preload_modules, self.memory_mb) # Pool empty: start one now
+
+  def _session_worker(self, session_id):
+    with self._lock:
+      worker = self._sessions.get(session_id)
+      if worker is not None and worker.alive:
+        self._sessions.move_to_end(session_id)
+        return worker, False
+    worker = self._take_idle_worker()
+    evicted = []
+    with self._lock:
+      existing = self._sessions.get(session_id)
+      if existing is not None and existing.alive:
+        # Another call started this session first; use its worker and keep ours warm
+        self._idle.append(worker)
+        return existing, False
+      self._sessions[session_id] = worker
+      # Evict the least recently used idle sessions beyond the limit
+      for old_id, old_worker in list(self._sessions.items()):
+        if len(self._sessions) <= self.max_sessions:
+          break
+        if old_id != session_id and not old_worker.lock.locked():
+          del self._sessions[old_id]
+          evicted.append((old_id, old_worker))
+    for old_id, old_worker in evicted:
+      logger.info(f"Python session '{old_id}' evicted (max_sessions={self.max_sessions}).")
+      old_worker.kill()
+    return worker, True
+
+  def execute(self, code, session_id=None, timeout=None):
+    """
+    Runs a cell of Python code.
+    :param session_id: Cells with the same session id share a namespace; None runs in a fresh one.
+    :param timeout: Seconds before the cell is killed (its session state is lost).
+    :return: Dictionary with status ('success' or 'error'), output (captured stdout/stderr)
+             and result (repr of a trailing expression, if any).
+    """
+    timeout = timeout or self.default_timeout
+    if session_id is None:
+      worker, reset = self._take_idle_worker(), True
+    else:
+      worker, reset = self._session_worker(session_id)
+
+    try:
+      with worker.lock:
+        response = worker.run(code, reset, timeout, self.max_output_chars)
+    except TimeoutError:
+      logger.warning(f"Python cell timed out after {timeout}s (session: {session_id}).")
+      self._forget(session_id, worker)
+      return {"status": "error", "output": f"Execution timed out after {timeout}s; the session state was reset.", "result": None}
+    except RuntimeError as e:
+      self._forget(session_id, worker)
+      return {"status": "error", "output": f"{e} The session state was reset.", "result": None}
+
+    if session_id is None:
+      worker.kill() # _take_idle_worker already started its replacement
+    return response
+
+  def _forget(self, session_id, worker):
+    with self._lock:
+      if session_id is not None and self._sessions.get(session_id) is worker:
+        del self._sessions[session_id]
+
+  def kill_session(self, session_id):
+    """Kills a session's worker, interrupting any running cell. Returns False for unknown sessions."""
+    with self._lock:
+      worker = self._sessions.pop(session_id, None)
+    if worker is None:
+      return False
+    worker.kill()
+    logger.info(f"Python session '{session_id}' killed.")
+    return True
+
+  def list_sessions(self):
+    with self._lock:
+      return [{"sessionId": session_id, "busy": worker.lock.locked(), "alive": worker.alive}
+              for session_id, worker in self._sessions.items()]
+
+  def shutdown(self):
+    with self._lock:
+      self._shutdown = True
+      workers = self._idle + list(self._sessions.values())
+      self._idle, self._sessions = [], OrderedDict()
+    for worker in workers:
+      worker.kill()
+    logger.info("Python Sandbox shut down.")
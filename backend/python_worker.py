@@ -0,0 +1,109 @@
+# backend/python_worker.py
+# Worker process for PythonSandbox. It reads one JSON request per line on the original stdin
+# and writes one JSON response per line to the original stdout:
+#   request:  {"code": str, "reset": bool, "max_output_chars": int}
+#   response: {"status": "success" | "error", "output": str, "result": str | None}
+# The namespace persists between requests until one asks for a reset, so a
+# session runs its cells like a notebook kernel.
+# Arguments: MEMORY_MB (address-space cap, 0 for none) followed by modules to preload.
+
+import io
+import os
+import sys
+import ast
+import json
+import importlib
+import traceback
+import contextlib
+from output_stream import OutputStream, DEFAULT_MAX_CHARS # This script's directory is on sys.path
+
+try:
+  import resource # POSIX only
+except ImportError:
+  resource = None
+
+def _new_namespace():
+  return {'__name__': '__main__', '__builtins__': __builtins__}
+
+def _run_cell(code, namespace):
+  """Executes a cell; like a notebook, a trailing expression's repr is the result."""
+  tree = ast.parse(code, '<cell>', 'exec')
+  last_expr = None
+  if tree.body and isinstance(tree.body[-1], ast.Expr):
+    last_expr = ast.Expression(tree.body.pop().value)
+  exec(compile(tree, '<cell>', 'exec'), namespace)
+  if last_expr is not None:
+    value = eval(compile(last_expr, '<cell>', 'eval'), namespace)
+    if value is not None:
+      namespace['_'] = value
+      return repr(value)
+  return None
+
+class _CaptureWriter(io.TextIOBase):
+  """stdout/stderr replacement that keeps only the newest output, so a chatty cell cannot grow the worker."""
+  def __init__(self, output):
+    self.output = output
+
+  def writable(self):
+    return True
+
+  def write(self, text):
+    self.output.write('output', text)
+    return len(text)
+
+def _cap(text, max_chars):
+  if max_chars and len(text) > max_chars:
+    return f"[... {len(text) - max_chars} characters of earlier output dropped ...]\n{text[-max_chars:]}"
+  return text
+
+def main():
+  # Keep the protocol on a private copy of stdout; fd 1 now points at stderr,
+  # so stray os.write(1, ...) calls from user code cannot corrupt responses.
+  protocol_out = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+  os.dup2(2, 1)
+  # Likewise for requests: fd 0 (and so sys.stdin) reads /dev/null, so input()
+  # in user code raises EOFError instead of consuming the next request.
+  protocol_in = os.fdopen(os.dup(0), 'r', encoding='utf-8')
+  devnull = os.open(os.devnull, os.O_RDONLY)
+  os.dup2(devnull, 0)
+  os.close(devnull)
+
+  memory_mb = int(sys.argv[1])
+  if memory_mb and resource:
+    resource.setrlimit(resource.RLIMIT_AS, (memory_mb * 1024 * 1024,) * 2)
+
+  for module_name in sys.argv[2:]:
+    try:
+      importlib.import_module(module_name)
+    except ImportError:
+      pass
+
+  namespace = _new_namespace()
+  protocol_out.write(json.dumps({"status": "ready"}) + "\n")
+  protocol_out.flush()
+
+  for line in protocol_in:
+    request = json.loads(line)
+    if request.get('reset'):
+      namespace = _new_namespace()
+    max_chars = request.get('max_output_chars') or DEFAULT_MAX_CHARS
+    output = OutputStream(max_chars=max_chars)
+    captured = _CaptureWriter(output)
+    status, result = 'success', None
+    with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+      try:
+        result = _run_cell(request['code'], namespace)
+      except BaseException:
+        status = 'error'
+        exc_type, exc_value, exc_tb = sys.exc_info()
+        # Drop this module's frames so the traceback starts at the user's code
+        while exc_tb is not None and exc_tb.tb_frame.f_code.co_filename == __file__:
+          exc_tb = exc_tb.tb_next
+        traceback.print_exception(exc_type, exc_value, exc_tb, file=captured)
+    response = {"status": status, "output": output.text(),
+                "result": _cap(result, max_chars) if result is not None else None}
+    protocol_out.write(json.dumps(response) + "\n")
+    protocol_out.flush()
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,100 @@
+# backend/resource_sampler.py
+import threading
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger('Resource_Sampler')
+
+try:
+  import psutil
+  PSUTIL_ENABLED = True
+except ImportError:
+  PSUTIL_ENABLED = False
+  logger.warning("psutil not found. Resource sampling will be disabled. Install with 'pip install psutil'.")
+
+class ResourceSampler:
+  """
+  Samples CPU and RAM usage on a background thread and keeps a rolling history.
+
+  psutil.cpu_percent(interval=1) blocks its caller for a full second; here the
+  sampler thread does the waiting and callers read the latest sample instantly.
+  """
+  def __init__(self, interval=1.0, history_size=300):
+    self.interval = interval
+    self._samples = deque(maxlen=history_size)
+    self._lock = threading.Lock()
+    self._stop_event = threading.Event()
+    self._thread = None
+    self._ready_callbacks = []
+    logger.info(f"Resource Sampler initialized (interval={interval}s, history_size={history_size}).")
+
+  @property
+  def available(self):
+    return PSUTIL_ENABLED
+
+  def start(self):
+    """Starts the sampler thread. Safe to call more than once."""
+    if not PSUTIL_ENABLED or (self._thread and self._thread.is_alive()):
+      return
+    self._stop_event.clear()
+    # The first cpu_percent(interval=None) call only sets the baseline
+    psutil.cpu_percent(interval=None)
+    self._thread = threading.Thread(target=self._run, name="ResourceSampler", daemon=True)
+    self._thread.start()
+    logger.info("Resource Sampler started.")
+
+  def stop(self):
+    self._stop_event.set()
+    if self._thread:
+      self._thread.join(timeout=self.interval * 2)
+      self._thread = None
+    logger.info("Resource Sampler stopped.")
+
+  def _run(self):
+    while not self._stop_event.wait(self.interval):
+      try:
+        sample = self._take_sample()
+      except Exception as e:
+        logger.error(f"Resource sampling failed: {e}")
+        continue
+      with self._lock:
+        self._samples.append(sample)
+        callbacks, self._ready_callbacks = self._ready_callbacks, []
+      for callback in callbacks:
+        try:
+          callback(sample)
+        except Exception as e:
+          logger.error(f"Resource sampler callback failed: {e}", exc_info=True)
+
+  def _take_sample(self):
+    memory = psutil.virtual_memory()
+    return {
+      "timestamp": datetime.now().isoformat(),
+      "cpu_percent": psutil.cpu_percent(interval=None), # Usage since the previous sample
+      "ram_percent": memory.percent,
+      "available_memory_gb": round(memory.available / (1024**3), 2),
+    }
+
+  def latest(self):
+    """Returns the most recent sample, or None if no sample has been taken yet."""
+    with self._lock:
+      return self._samples[-1] if self._samples else None
+
+  def history(self, limit=None):
+    """Returns up to 'limit' most recent samples, oldest first."""
+    with self._lock:
+      samples = list(self._samples)
+    return samples[-limit:] if limit else samples
+
+  def when_ready(self, callback):
+    """
+    Calls callback(sample) with the latest sample, right away if one exists or
+    from the sampler thread once the first sample is taken.
+    """
+    with self._lock:
+      sample = self._samples[-1] if self._samples else None
+      if sample is None:
+        self._ready_callbacks.append(callback)
+    if sample is not None:
+      callback(sample)
@@ -0,0 +1,61 @@
+# backend/rlimit_exec.py
+# Exec shim for CompilerRunner: sets rlimits on itself, then execs the user program,
+# so the limits are in place before any user code runs:
+#   python -I -S rlimit_exec.py STATUS_FD CPU_SECONDS AS_BYTES FSIZE_BYTES MAX_PROCESSES -- cmd [args...]
+# A limit of 0 is left alone. STATUS_FD is close-on-exec, so the parent sees EOF
+# once the exec has succeeded; if it fails, "errno:message" is written to it first.
+
+import os
+import sys
+import signal
+import resource
+
+def _set_rlimit(kind, soft, hard=None):
+  hard = soft if hard is None else hard
+  _, current_hard = resource.getrlimit(kind)
+  if current_hard != resource.RLIM_INFINITY:
+    # An unprivileged process may only lower its hard limit
+    soft, hard = min(soft, current_hard), min(hard, current_hard)
+  resource.setrlimit(kind, (soft, hard))
+
+def _user_task_count(uid):
+  """Processes and threads the user already runs; Linux counts RLIMIT_NPROC per user, not per program."""
+  count = 0
+  for entry in os.listdir('/proc'):
+    if not entry.isdigit():
+      continue
+    try:
+      if os.stat(f'/proc/{entry}').st_uid == uid:
+        count += len(os.listdir(f'/proc/{entry}/task'))
+    except OSError:
+      pass # Exited while we looked
+  return count
+
+def main():
+  status_fd, cpu_seconds, as_bytes, fsize_bytes, max_processes = (int(arg) for arg in sys.argv[1:6])
+  cmd = sys.argv[7:] # argv[6] is '--'
+  os.set_inheritable(status_fd, False)
+  # Python ignores these at startup and an ignored signal stays ignored across exec
+  for name in ('SIGPIPE', 'SIGXFZ', 'SIGXFSZ'):
+    if hasattr(signal, name):
+      signal.signal(getattr(signal, name), signal.SIG_DFL)
+  try:
+    if cpu_seconds:
+      _set_rlimit(resource.RLIMIT_CPU, cpu_seconds, cpu_seconds + 1) # SIGXCPU first, SIGKILL a second later
+    if as_bytes:
+      _set_rlimit(resource.RLIMIT_AS, as_bytes)
+    if fsize_bytes:
+      _set_rlimit(resource.RLIMIT_FSIZE, fsize_bytes)
+    # The kernel does not apply RLIMIT_NPROC to root, and other systems have no /proc to count from
+    uid = os.getuid()
+    if max_processes and uid != 0 and os.path.isdir('/proc'):
+      _set_rlimit(resource.RLIMIT_NPROC, _user_task_count(uid) + max_processes)
+    os.execvp(cmd[0], cmd)
+  except OSError as e:
+    os.write(status_fd, f"{e.errno}:{e.strerror}".encode('utf-8'))
+  except ValueError as e:
+    os.write(status_fd, f"0:{e}".encode('utf-8'))
+  os._exit(127)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,126 @@
+# backend/toolchain_registry.py
+import os
+import json
+import shutil
+import logging
+import platform
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('Toolchain_Registry')
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.obpi_data', 'toolchains.json')
+
+# Toolchains that do not understand '--version'
+VERSION_ARGS = {'go': ['version'], 'lua': ['-v']}
+
+class ToolchainRegistry:
+  """
+  Lazily discovers which compilers and interpreters are installed and their versions.
+
+  A toolchain is probed ('<cmd> --version') the first time it is needed, or by
+  probe_in_background(), which probes all of them in parallel off the caller's
+  thread. Results are persisted per command, keyed by the binary the current
+  PATH resolves to and its mtime, so a restart re-runs a probe only when PATH
+  now points at a different binary or that binary was reinstalled.
+  """
+  def __init__(self, compilers, cache_file=DEFAULT_CACHE_FILE, probe_timeout=5, max_workers=8):
+    self.compilers = compilers # CompilerRunner.compilers
+    self.cache_file = cache_file
+    self.probe_timeout = probe_timeout
+    self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ToolchainProbe")
+    self._lock = threading.Lock()
+    self._futures = {} # lang -> Future resolving to the toolchain's info dict
+    self._persisted = self._load_cache()
+
+  def _load_cache(self):
+    try:
+      with open(self.cache_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      return {}
+
+  def _save_cache(self):
+    # Called with self._lock held
+    tmp_path = f"{self.cache_file}.tmp"
+    try:
+      os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+      with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(self._persisted, f, indent=2)
+      os.replace(tmp_path, self.cache_file)
+    except OSError as e:
+      logger.warning(f"Could not save toolchain cache '{self.cache_file}': {e}")
+
+  def _future(self, lang, refresh=False):
+    with self._lock:
+      future = self._futures.get(lang)
+      if future is None or (refresh and future.done()):
+        future = self._executor.submit(self._probe, lang, refresh)
+        self._futures[lang] = future
+      return future
+
+  def probe_in_background(self):
+    """Starts probing every toolchain in parallel and returns immediately."""
+    for lang in self.compilers:
+      self._future(lang)
+
+  def get(self, lang):
+    """Returns the info dict for a language's toolchain, probing it now if needed."""
+    if lang not in self.compilers:
+      return None
+    return self._future(lang).result()
+
+  def version(self, lang):
+    info = self.get(lang)
+    return info['version'] if info else None
+
+  def list_toolchains(self, refresh=False):
+    """Returns info for every toolchain; probes run in parallel. refresh ignores cached results."""
+    futures = [self._future(lang, refresh) for lang in self.compilers]
+    return [future.result() for future in futures]
+
+  def _probe(self, lang, refresh=False):
+    info = self.compilers[lang]
+    cmd = info['cmd']
+    toolchain = {"lang": lang, "cmd": cmd, "path": None, "version": None, "available": False, "cached": False}
+
+    if info.get('handler'):
+      # Runs in-process on the backend's own interpreter, which is always there
+      toolchain.update(path=cmd, version=f"Python {platform.python_version()}", available=True)
+      return toolchain
+
+    path = shutil.which(cmd)
+    if path is None:
+      logger.warning(f"Compiler '{cmd}' for {lang.upper()} not found. "
+                     f"Please ensure it's installed and in your system's PATH to use this feature.")
+      return toolchain
+    try:
+      mtime = os.stat(path).st_mtime
+    except OSError:
+      mtime = None
+    toolchain["path"] = path
+
+    with self._lock:
+      persisted = self._persisted.get(cmd)
+    if not refresh and persisted and persisted.get('path') == path and persisted.get('mtime') == mtime:
+      toolchain.update(version=persisted.get('version'), available=True, cached=True)
+      return toolchain
+
+    version_args = VERSION_ARGS.get(lang, ['--version'])
+    try:
+      result = subprocess.run([path] + version_args, capture_output=True, check=True, text=True, timeout=self.probe_timeout)
+    except (subprocess.CalledProcessError, OSError, subprocess.TimeoutExpired) as e:
+      logger.warning(f"Compiler '{cmd}' for {lang.upper()} found at '{path}' but not callable: {e}")
+      return toolchain
+    version_lines = (result.stdout or result.stderr).strip().splitlines()
+    toolchain.update(version=version_lines[0] if version_lines else '', available=True)
+    logger.info(f"Compiler '{cmd}' for {lang.upper()} found: {toolchain['version']}")
+
+    with self._lock:
+      self._persisted[cmd] = {"path": path, "mtime": mtime, "version": toolchain['version']}
+      self._save_cache()
+    return toolchain
+
+  def shutdown(self):
+    self._executor.shutdown(wait=False, cancel_futures=True)
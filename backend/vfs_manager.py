@@ -1,7 +1,10 @@
 # backend/vfs_manager.py
 import os
 import datetime
+import hashlib
+import json
 import logging
+import sqlite3
 from backend.db_manager import DBManager
 
 logger = logging.getLogger('VFS_Manager')
@@ -39,6 +42,30 @@ class VFSManager:
         normalized_parts.append(part)
     return '/' + '/'.join(normalized_parts) if normalized_parts else '/'
 
+  def _get_parent_path(self, normalized_path):
+    # Parent of a normalized path; the root '/' has no parent
+    if normalized_path == '/':
+      return None
+    parent_path = os.path.dirname(normalized_path)
+    return parent_path if parent_path else '/'
+
+  def _subtree_range(self, normalized_path):
+    # Half-open [lower, upper) range that matches every descendant of a directory
+    # on the path primary key index. '0' is the character right after '/', so
+    # '/home/' <= path < '/home0' covers '/home/...' and nothing else.
+    lower = normalized_path if normalized_path == '/' else normalized_path + '/'
+    return lower, lower[:-1] + '0'
+
+  def _store_blob(self, data):
+    # Stores file bytes once per distinct content and returns their hash. The new
+    # blob starts unreferenced; the vfs_nodes triggers maintain ref_count.
+    content_hash = hashlib.sha256(data).hexdigest()
+    self.db.execute_query(
+      "INSERT OR IGNORE INTO vfs_blobs (hash, size, ref_count, data) VALUES (?, ?, 0, ?)",
+      (content_hash, len(data), sqlite3.Binary(data))
+    )
+    return content_hash
+
   def _path_exists(self, path):
     return self.db.execute_query("SELECT 1 FROM vfs_nodes WHERE path = ?", (path,), fetch_one=True) is not None
 
@@ -57,36 +84,14 @@ class VFSManager:
       # If root doesn't have an explicit entry, still allow listing children
       pass # Continue to list children
 
-    # List direct children
-    prefix = normalized_path if normalized_path == '/' else normalized_path + '/'
-    query = f"SELECT path, name, type, size, created_at, modified_at FROM vfs_nodes WHERE path LIKE ? ESCAPE '!'"
-    # Use LIKE with ESCAPE for paths that might contain '%' or '_'
-    # Also need to ensure we only get direct children, not deeper descendants
-    # For direct children, the path must start with 'prefix' and contain no further '/'
-    # after 'prefix'.
-    like_pattern = prefix.replace('%', '!%').replace('_', '!_') + '%'
-    rows = self.db.execute_query(query, (like_pattern,), fetch_all=True)
-
-    contents = []
-    for row in rows:
-      child_path_suffix = row['path'][len(prefix):]
-      if normalized_path == '/':
-        # For root, children are like '/dir' or '/file.txt', no further '/'
-        if '/' not in child_path_suffix and child_path_suffix:
-          contents.append(dict(row))
-      else:
-        # For subdirectories, children are like 'dir/child' or 'file.txt'
-        if '/' not in child_path_suffix:
-          contents.append(dict(row))
-
-    # Special handling for root to explicitly include itself if listing its properties
-    if normalized_path == '/' and not contents:
-      # If no children and root itself wasn't found as a file, treat it as empty dir
-      pass # No need to add it, empty list is fine for ls output
-
-    # Deduplicate and sort, ensure dirs are listed first
-    unique_contents = {item['path']: item for item in contents}
-    sorted_contents = sorted(unique_contents.values(), key=lambda x: (0 if x['type'] == 'dir' else 1, x['name'].lower()))
+    # List direct children through the parent_path index, so the cost depends
+    # on the number of children rather than on the size of the whole subtree.
+    rows = self.db.execute_query(
+      "SELECT path, name, type, size, created_at, modified_at FROM vfs_nodes WHERE parent_path = ?",
+      (normalized_path,), fetch_all=True
+    )
+    # Sort, ensure dirs are listed first
+    sorted_contents = sorted((dict(row) for row in rows), key=lambda x: (0 if x['type'] == 'dir' else 1, x['name'].lower()))
 
     logger.info(f"VFS: Listed {len(sorted_contents)} items in {normalized_path}")
     return {"contents": sorted_contents}
@@ -99,9 +104,9 @@ class VFSManager:
     if self._path_exists(normalized_path):
       return {"error": f"Directory already exists: {normalized_path}"}
 
-    parent_path = os.path.dirname(normalized_path)
-    if parent_path == '': # means it's a root level item like /dir, parent is /
-      parent_path = '/'
+    parent_path = self._get_parent_path(normalized_path)
+    if parent_path is None:
+      return {"error": f"Directory already exists: {normalized_path}"}
     if parent_path != '/' and not self._path_exists(parent_path):
       return {"error": f"Parent directory does not exist: {parent_path}"}
     if parent_path != '/' and self.db.execute_query("SELECT type FROM vfs_nodes WHERE path = ?", (parent_path,), fetch_one=True)['type'] != 'dir':
@@ -110,8 +115,8 @@ class VFSManager:
 
     now = datetime.datetime.now().isoformat()
     self.db.execute_query(
-      "INSERT INTO vfs_nodes (path, name, type, created_at, modified_at) VALUES (?, ?, ?, ?, ?)",
-      (normalized_path, os.path.basename(normalized_path) or '/', 'dir', now, now)
+      "INSERT INTO vfs_nodes (path, parent_path, name, type, created_at, modified_at) VALUES (?, ?, ?, ?, ?, ?)",
+      (normalized_path, parent_path, os.path.basename(normalized_path) or '/', 'dir', now, now)
     )
     logger.info(f"VFS: Directory created: {normalized_path}")
     return {"status": "success", "message": f"Directory '{normalized_path}' created."}
@@ -120,41 +125,174 @@ class VFSManager:
     normalized_path = self._normalize_path(path)
     logger.info(f"VFS: Getting file content: {normalized_path}")
 
-    node = self.db.execute_query("SELECT type, content FROM vfs_nodes WHERE path = ?", (normalized_path,), fetch_one=True)
+    node = self.db.execute_query(
+      "SELECT n.type, b.data FROM vfs_nodes n LEFT JOIN vfs_blobs b ON b.hash = n.content_hash WHERE n.path = ?",
+      (normalized_path,), fetch_one=True
+    )
     if not node:
       return {"error": f"No such file or directory: {normalized_path}"}
     if node['type'] == 'dir':
       return {"error": f"Path is a directory: {normalized_path}"}
 
-    return {"content": node['content'] if node['content'] is not None else ""}
+    return {"content": bytes(node['data']).decode('utf-8', errors='replace') if node['data'] is not None else ""}
 
-  def write_file(self, path, content):
+  def read_file_range(self, path, offset=0, length=None):
+    """
+    Reads raw bytes from a file without loading the rest of its content.
+    :param offset: First byte to read.
+    :param length: Number of bytes to read; None reads to the end of the file.
+    :return: Dictionary with 'data' (bytes) and 'size' (total file size) or 'error'.
+    """
     normalized_path = self._normalize_path(path)
-    logger.info(f"VFS: Writing file: {normalized_path}")
+    logger.info(f"VFS: Reading file range: {normalized_path} (offset={offset}, length={length})")
 
-    now = datetime.datetime.now().isoformat()
-    file_size = len(content.encode('utf-8')) # Approximate size in bytes
+    if offset < 0 or (length is not None and length < 0):
+      return {"error": f"Invalid byte range: offset={offset}, length={length}"}
 
-    # Check if parent directory exists and is a directory
-    parent_path = os.path.dirname(normalized_path)
-    if parent_path == '':
-      parent_path = '/' # Root directory is conceptual parent for top-level files
+    node = self.db.execute_query(
+      """
+      SELECT n.type, n.size, b.rowid AS blob_rowid
+      FROM vfs_nodes n LEFT JOIN vfs_blobs b ON b.hash = n.content_hash
+      WHERE n.path = ?
+      """,
+      (normalized_path,), fetch_one=True
+    )
+    if not node:
+      return {"error": f"No such file or directory: {normalized_path}"}
+    if node['type'] == 'dir':
+      return {"error": f"Path is a directory: {normalized_path}"}
+    if node['blob_rowid'] is None or offset >= node['size']:
+      return {"data": b"", "size": node['size']}
+
+    # Incremental blob I/O copies only the requested range into memory; SQLite still
+    # follows the blob's overflow-page chain up to the offset, but does not load the rest.
+    try:
+      data = self.db.read_blob('vfs_blobs', 'data', node['blob_rowid'], offset, -1 if length is None else length)
+    except sqlite3.Error as e:
+      # The file was replaced or deleted between the lookup and the read
+      return {"error": f"Failed to read '{normalized_path}': {e}"}
+    return {"data": data, "size": node['size']}
+
+  def read_tree(self, path):
+    """
+    Reads every file under a directory in one query.
+    :return: Dictionary with 'files' ({path relative to the directory: bytes}) or 'error'.
+    """
+    normalized_path = self._normalize_path(path)
+    logger.info(f"VFS: Reading tree: {normalized_path}")
+
+    node = self.db.execute_query("SELECT type FROM vfs_nodes WHERE path = ?", (normalized_path,), fetch_one=True)
+    if not node:
+      return {"error": f"No such file or directory: {normalized_path}"}
+    if node['type'] != 'dir':
+      return {"error": f"Not a directory: {normalized_path}"}
+
+    lower, upper = self._subtree_range(normalized_path)
+    rows = self.db.execute_query(
+      """
+      SELECT n.path, b.data FROM vfs_nodes n LEFT JOIN vfs_blobs b ON b.hash = n.content_hash
+      WHERE n.path >= ? AND n.path < ? AND n.type = 'file'
+      """,
+      (lower, upper), fetch_all=True
+    )
+    return {"files": {row['path'][len(lower):]: bytes(row['data']) if row['data'] is not None else b"" for row in rows}}
 
+  def write_file(self, path, content):
+    return self.write_file_bytes(path, content.encode('utf-8'))
+
+  def _check_file_target(self, normalized_path):
+    """Returns (parent_path, None) if a file can be written at normalized_path, else (None, error dict)."""
+    parent_path = self._get_parent_path(normalized_path)
+    if parent_path is None:
+      return None, {"error": f"Path is a directory: {normalized_path}"}
+
+    # Check if parent directory exists and is a directory
     if parent_path != '/' and not self._path_exists(parent_path):
-      return {"error": f"Parent directory does not exist: {parent_path}"}
+      return None, {"error": f"Parent directory does not exist: {parent_path}"}
     elif parent_path != '/':
       parent_node = self.db.execute_query("SELECT type FROM vfs_nodes WHERE path = ?", (parent_path,), fetch_one=True)
       if parent_node and parent_node['type'] != 'dir':
-        return {"error": f"Parent path is not a directory: {parent_path}"}
+        return None, {"error": f"Parent path is not a directory: {parent_path}"}
 
+    existing_node = self.db.execute_query("SELECT type FROM vfs_nodes WHERE path = ?", (normalized_path,), fetch_one=True)
+    if existing_node and existing_node['type'] == 'dir':
+      return None, {"error": f"Path is a directory: {normalized_path}"}
+    return parent_path, None
 
+  def _upsert_file_node(self, normalized_path, parent_path, size, content_hash):
+    now = datetime.datetime.now().isoformat()
+    # Upsert keeps created_at and lets the blob triggers move the reference
     self.db.execute_query(
       """
-      INSERT OR REPLACE INTO vfs_nodes (path, name, type, size, content, created_at, modified_at)
-      VALUES (?, ?, ?, ?, ?, COALESCE((SELECT created_at FROM vfs_nodes WHERE path = ?), ?), ?)
+      INSERT INTO vfs_nodes (path, parent_path, name, type, size, content_hash, created_at, modified_at)
+      VALUES (?, ?, ?, 'file', ?, ?, ?, ?)
+      ON CONFLICT(path) DO UPDATE SET size = excluded.size, content_hash = excluded.content_hash,
+                                      modified_at = excluded.modified_at
       """,
-      (normalized_path, os.path.basename(normalized_path), 'file', file_size, content, normalized_path, now, now)
+      (normalized_path, parent_path, os.path.basename(normalized_path), size, content_hash, now, now)
     )
+
+  def write_file_bytes(self, path, data):
+    """Writes raw bytes to a file, creating or replacing it."""
+    normalized_path = self._normalize_path(path)
+    logger.info(f"VFS: Writing file: {normalized_path}")
+
+    parent_path, error = self._check_file_target(normalized_path)
+    if error:
+      return error
+
+    try:
+      with self.db.transaction():
+        content_hash = self._store_blob(data)
+        self._upsert_file_node(normalized_path, parent_path, len(data), content_hash)
+    except sqlite3.Error as e:
+      return {"error": f"Failed to write '{normalized_path}': {e}"}
+    logger.info(f"VFS: File written: {normalized_path}")
+    return {"status": "success", "message": f"File '{normalized_path}' written."}
+
+  def write_file_chunks(self, path, size, chunks):
+    """
+    Writes a file from an iterable of byte strings that add up to exactly `size`
+    bytes, without joining them in memory. The blob is allocated with zeroblob()
+    under a placeholder key and filled through incremental blob I/O while its
+    SHA-256 is computed; it then takes its real key, or is dropped if identical
+    content is already stored. Call inside db.transaction() to combine it with
+    other statements.
+    """
+    normalized_path = self._normalize_path(path)
+    logger.info(f"VFS: Writing file from chunks: {normalized_path} ({size} bytes)")
+
+    parent_path, error = self._check_file_target(normalized_path)
+    if error:
+      return error
+
+    placeholder = f"pending:{normalized_path}"
+    try:
+      with self.db.transaction():
+        self.db.execute_query("DELETE FROM vfs_blobs WHERE hash = ?", (placeholder,))
+        self.db.execute_query("INSERT INTO vfs_blobs (hash, size, ref_count, data) VALUES (?, ?, 0, zeroblob(?))",
+                              (placeholder, size, size))
+        rowid = self.db.execute_query("SELECT rowid FROM vfs_blobs WHERE hash = ?", (placeholder,), fetch_one=True)['rowid']
+        hasher = hashlib.sha256()
+        written = 0
+        with self.db.open_blob('vfs_blobs', 'data', rowid) as blob:
+          for chunk in chunks:
+            if written + len(chunk) > size:
+              raise ValueError(f"Chunks exceed the declared size of {size} bytes")
+            blob.write(chunk)
+            hasher.update(chunk)
+            written += len(chunk)
+        if written != size:
+          raise ValueError(f"Chunks add up to {written} of {size} bytes")
+
+        content_hash = hasher.hexdigest()
+        if self.db.execute_query("SELECT 1 FROM vfs_blobs WHERE hash = ?", (content_hash,), fetch_one=True):
+          self.db.execute_query("DELETE FROM vfs_blobs WHERE rowid = ?", (rowid,))
+        else:
+          self.db.execute_query("UPDATE vfs_blobs SET hash = ? WHERE rowid = ?", (content_hash, rowid))
+        self._upsert_file_node(normalized_path, parent_path, size, content_hash)
+    except (sqlite3.Error, ValueError) as e:
+      return {"error": f"Failed to write '{normalized_path}': {e}"}
     logger.info(f"VFS: File written: {normalized_path}")
     return {"status": "success", "message": f"File '{normalized_path}' written."}
 
@@ -168,35 +306,38 @@ class VFSManager:
 
     if node['type'] == 'dir':
       # Check for children
-      prefix = normalized_path if normalized_path == '/' else normalized_path + '/'
-      children = self.db.execute_query(f"SELECT path FROM vfs_nodes WHERE path LIKE ? ESCAPE '!' AND path != ?",
-                                       (prefix.replace('%', '!%').replace('_', '!_') + '%', normalized_path), fetch_all=True)
-      if children and not recursive:
+      has_children = self.db.execute_query("SELECT 1 FROM vfs_nodes WHERE parent_path = ? LIMIT 1", (normalized_path,), fetch_one=True)
+      if has_children and not recursive:
         return {"error": f"Directory not empty: {normalized_path}. Use -r to remove recursively."}
 
-      # Delete all children first (if recursive)
-      for child_row in children:
-        self.db.execute_query("DELETE FROM vfs_nodes WHERE path = ?", (child_row['path'],))
-        logger.info(f"VFS: Deleted child: {child_row['path']}")
-
-      # Then delete the directory itself
-      self.db.execute_query("DELETE FROM vfs_nodes WHERE path = ?", (normalized_path,))
-      logger.info(f"VFS: Directory deleted: {normalized_path}")
+      # Delete the directory and its whole subtree in a single statement
+      lower, upper = self._subtree_range(normalized_path)
+      try:
+        with self.db.transaction():
+          deleted_count = self.db.execute_query(
+            "DELETE FROM vfs_nodes WHERE path = ? OR (path >= ? AND path < ?)",
+            (normalized_path, lower, upper)
+          )
+      except sqlite3.Error as e:
+        return {"error": f"Failed to delete '{normalized_path}': {e}"}
+      logger.info(f"VFS: Directory deleted: {normalized_path} ({deleted_count} nodes)")
     else:
       # It's a file, just delete it
-      self.db.execute_query("DELETE FROM vfs_nodes WHERE path = ?", (normalized_path,))
+      deleted_count = self.db.execute_query("DELETE FROM vfs_nodes WHERE path = ?", (normalized_path,))
       logger.info(f"VFS: File deleted: {normalized_path}")
 
-    return {"status": "success", "message": f"Path '{normalized_path}' deleted."}
+    return {"status": "success", "message": f"Path '{normalized_path}' deleted.", "node_count": deleted_count}
 
   def move_path(self, source_path, dest_path):
     normalized_source = self._normalize_path(source_path)
     normalized_dest = self._normalize_path(dest_path)
     logger.info(f"VFS: Moving '{normalized_source}' to '{normalized_dest}'")
 
-    source_node = self.db.execute_query("SELECT * FROM vfs_nodes WHERE path = ?", (normalized_source,), fetch_one=True)
+    source_node = self.db.execute_query("SELECT type FROM vfs_nodes WHERE path = ?", (normalized_source,), fetch_one=True)
     if not source_node:
       return {"error": f"Source path does not exist: {normalized_source}"}
+    if normalized_source == '/':
+      return {"error": "Cannot move the root directory."}
 
     if self._path_exists(normalized_dest):
       # If destination exists and is a directory, move source into it
@@ -210,43 +351,47 @@ class VFSManager:
         # If destination exists and is a file, cannot move/rename to it (overwrite protection)
         return {"error": f"Destination already exists and is a file: {normalized_dest}"}
 
-    now = datetime.datetime.now().isoformat()
-    # Update the source node
-    self.db.execute_query(
-      "UPDATE vfs_nodes SET path = ?, name = ?, modified_at = ? WHERE path = ?",
-      (normalized_dest, os.path.basename(normalized_dest), now, normalized_source)
-    )
+    if normalized_dest.startswith(normalized_source + '/'):
+      return {"error": f"Cannot move '{normalized_source}' into itself."}
 
-    # If it was a directory, update all its children's paths
-    if source_node['type'] == 'dir':
-      old_prefix = normalized_source if normalized_source == '/' else normalized_source + '/'
-      new_prefix = normalized_dest if normalized_dest == '/' else normalized_dest + '/'
-
-      # Get all children that start with the old_prefix (excluding the source itself)
-      children = self.db.execute_query(f"SELECT path FROM vfs_nodes WHERE path LIKE ? ESCAPE '!' AND path != ?",
-                                       (old_prefix.replace('%', '!%').replace('_', '!_') + '%', normalized_source), fetch_all=True)
-
-      for child_row in children:
-        original_child_path = child_row['path']
-        relative_path = original_child_path[len(old_prefix):]
-        new_child_path = new_prefix + relative_path
-        self.db.execute_query(
-          "UPDATE vfs_nodes SET path = ?, modified_at = ? WHERE path = ?",
-          (new_child_path, now, original_child_path)
+    now = datetime.datetime.now().isoformat()
+    # Rewrite the node and every descendant in one statement: each path keeps its
+    # suffix after the source prefix, and the node itself also gets a new parent and name.
+    lower, upper = self._subtree_range(normalized_source)
+    suffix_start = len(normalized_source) + 1
+    try:
+      with self.db.transaction():
+        moved_count = self.db.execute_query(
+          """
+          UPDATE vfs_nodes SET
+            path = ? || substr(path, ?),
+            parent_path = CASE WHEN path = ? THEN ? ELSE ? || substr(parent_path, ?) END,
+            name = CASE WHEN path = ? THEN ? ELSE name END,
+            modified_at = ?
+          WHERE path = ? OR (path >= ? AND path < ?)
+          """,
+          (normalized_dest, suffix_start,
+           normalized_source, self._get_parent_path(normalized_dest), normalized_dest, suffix_start,
+           normalized_source, os.path.basename(normalized_dest),
+           now,
+           normalized_source, lower, upper)
         )
-        logger.info(f"VFS: Updated child path: {original_child_path} -> {new_child_path}")
+    except sqlite3.Error as e:
+      return {"error": f"Failed to move '{normalized_source}': {e}"}
 
-    logger.info(f"VFS: Moved '{normalized_source}' to '{normalized_dest}' successfully.")
-    return {"status": "success", "message": f"Moved '{source_path}' to '{dest_path}'."}
+    logger.info(f"VFS: Moved '{normalized_source}' to '{normalized_dest}' successfully ({moved_count} nodes).")
+    return {"status": "success", "message": f"Moved '{source_path}' to '{dest_path}'.", "node_count": moved_count}
 
   def copy_path(self, source_path, dest_path):
     normalized_source = self._normalize_path(source_path)
     normalized_dest = self._normalize_path(dest_path)
     logger.info(f"VFS: Copying '{normalized_source}' to '{normalized_dest}'")
 
-    source_node = self.db.execute_query("SELECT * FROM vfs_nodes WHERE path = ?", (normalized_source,), fetch_one=True)
+    source_node = self.db.execute_query("SELECT name, type FROM vfs_nodes WHERE path = ?", (normalized_source,), fetch_one=True)
     if not source_node:
       return {"error": f"Source path does not exist: {normalized_source}"}
+    if normalized_source == '/':
+      return {"error": "Cannot copy the root directory."}
 
     # Determine final destination path (if dest is a directory, copy into it)
     final_dest_path = normalized_dest
@@ -259,36 +404,138 @@ class VFSManager:
 
     if self._path_exists(final_dest_path):
       return {"error": f"Cannot copy: destination '{final_dest_path}' already exists."}
+    if final_dest_path.startswith(normalized_source + '/'):
+      return {"error": f"Cannot copy '{normalized_source}' into itself."}
 
     now = datetime.datetime.now().isoformat()
-    # Copy the source node itself
-    new_name = os.path.basename(final_dest_path)
-    self.db.execute_query(
-      "INSERT INTO vfs_nodes (path, name, type, size, content, created_at, modified_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-      (final_dest_path, new_name, source_node['type'], source_node['size'], source_node['content'], now, now)
-    )
-
-    # If it's a directory, recursively copy its children
-    if source_node['type'] == 'dir':
-      old_prefix = normalized_source if normalized_source == '/' else normalized_source + '/'
-      new_prefix = final_dest_path if final_dest_path == '/' else final_dest_path + '/'
-
-      children = self.db.execute_query(f"SELECT * FROM vfs_nodes WHERE path LIKE ? ESCAPE '!' AND path != ?",
-                                       (old_prefix.replace('%', '!%').replace('_', '!_') + '%', normalized_source), fetch_all=True)
-
-      for child_row in children:
-        original_child_path = child_row['path']
-        relative_path = original_child_path[len(old_prefix):]
-        new_child_path = new_prefix + relative_path
+    # Copy the node and its whole subtree with a single INSERT ... SELECT. Only
+    # metadata rows are duplicated; copies share the original content blobs.
+    lower, upper = self._subtree_range(normalized_source)
+    suffix_start = len(normalized_source) + 1
+    try:
+      with self.db.transaction():
+        copied_count = self.db.execute_query(
+          """
+          INSERT INTO vfs_nodes (path, parent_path, name, type, size, content_hash, created_at, modified_at)
+          SELECT ? || substr(path, ?),
+                 CASE WHEN path = ? THEN ? ELSE ? || substr(parent_path, ?) END,
+                 CASE WHEN path = ? THEN ? ELSE name END,
+                 type, size, content_hash, ?, ?
+          FROM vfs_nodes
+          WHERE path = ? OR (path >= ? AND path < ?)
+          """,
+          (final_dest_path, suffix_start,
+           normalized_source, self._get_parent_path(final_dest_path), final_dest_path, suffix_start,
+           normalized_source, os.path.basename(final_dest_path),
+           now, now,
+           normalized_source, lower, upper)
+        )
+    except sqlite3.Error as e:
+      return {"error": f"Failed to copy '{normalized_source}': {e}"}
+
+    logger.info(f"VFS: Copied '{normalized_source}' to '{final_dest_path}' successfully ({copied_count} nodes).")
+    return {"status": "success", "message": f"Copied '{source_path}' to '{dest_path}'.", "node_count": copied_count}
+
+  def import_tree(self, manifest, overwrite=True):
+    """
+    Creates many directories and files in a single transaction.
+    :param manifest: Dict (or JSON string) of the form
+                     {"directories": ["/a", "/a/b"], "files": {"/a/b/c.txt": "content"}}.
+                     File contents may be str (stored as UTF-8) or bytes.
+    :param overwrite: Replace files that already exist; otherwise they are left untouched.
+    :return: Success dictionary with counts, or 'error' if the manifest is malformed or any entry
+             is invalid (nothing is written).
+    """
+    if isinstance(manifest, str):
+      try:
+        manifest = json.loads(manifest)
+      except json.JSONDecodeError as e:
+        return {"error": f"Invalid import manifest: {e}"}
+    if not isinstance(manifest, dict):
+      return {"error": "Invalid import manifest: expected an object with 'directories' and 'files'"}
+    manifest_dirs, manifest_files = manifest.get("directories", []), manifest.get("files", {})
+    if not isinstance(manifest_dirs, list) or not all(isinstance(d, str) for d in manifest_dirs):
+      return {"error": "Invalid import manifest: 'directories' must be a list of paths"}
+    if not isinstance(manifest_files, dict) or not all(
+        isinstance(file_path, str) and isinstance(content, (str, bytes)) for file_path, content in manifest_files.items()):
+      return {"error": "Invalid import manifest: 'files' must map paths to str or bytes content"}
+
+    directories = sorted({self._normalize_path(d) for d in manifest_dirs} - {'/'}, key=lambda d: d.count('/'))
+    files = {}
+    for file_path, content in manifest_files.items():
+      files[self._normalize_path(file_path)] = content.encode('utf-8') if isinstance(content, str) else content
+    logger.info(f"VFS: Importing {len(directories)} directories and {len(files)} files")
+
+    # Look up every path the manifest touches, and every parent it relies on, in one pass
+    parents = {self._get_parent_path(p) for p in list(directories) + list(files)}
+    existing_types = self._get_node_types(set(directories) | set(files) | parents)
+    known_dirs = {'/'} | {p for p, node_type in existing_types.items() if node_type == 'dir'}
+
+    # Validate everything in memory before writing anything
+    for dir_path in directories:
+      if existing_types.get(dir_path) == 'file' or dir_path in files:
+        return {"error": f"Cannot create directory, a file exists at: {dir_path}"}
+      if self._get_parent_path(dir_path) not in known_dirs:
+        return self._missing_parent_error(self._get_parent_path(dir_path), existing_types, files)
+      known_dirs.add(dir_path)
+    for file_path in files:
+      if file_path in known_dirs:
+        return {"error": f"Path is a directory: {file_path}"}
+      if self._get_parent_path(file_path) not in known_dirs:
+        return self._missing_parent_error(self._get_parent_path(file_path), existing_types, files)
 
-        self.db.execute_query(
-          "INSERT INTO vfs_nodes (path, name, type, size, content, created_at, modified_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-          (new_child_path, child_row['name'], child_row['type'], child_row['size'], child_row['content'], now, now)
+    now = datetime.datetime.now().isoformat()
+    new_directories = [d for d in directories if d not in existing_types]
+    file_rows = []
+    blob_rows = {}
+    for file_path, data in files.items():
+      if not overwrite and file_path in existing_types:
+        continue
+      content_hash = hashlib.sha256(data).hexdigest()
+      blob_rows[content_hash] = (content_hash, len(data), sqlite3.Binary(data))
+      file_rows.append((file_path, self._get_parent_path(file_path), os.path.basename(file_path), len(data), content_hash, now, now))
+
+    try:
+      with self.db.transaction():
+        self.db.execute_many(
+          "INSERT INTO vfs_nodes (path, parent_path, name, type, created_at, modified_at) VALUES (?, ?, ?, 'dir', ?, ?)",
+          [(d, self._get_parent_path(d), os.path.basename(d), now, now) for d in new_directories]
         )
-        logger.info(f"VFS: Copied child path: {original_child_path} -> {new_child_path}")
+        self.db.execute_many("INSERT OR IGNORE INTO vfs_blobs (hash, size, ref_count, data) VALUES (?, ?, 0, ?)",
+                             list(blob_rows.values()))
+        self.db.execute_many(
+          """
+          INSERT INTO vfs_nodes (path, parent_path, name, type, size, content_hash, created_at, modified_at)
+          VALUES (?, ?, ?, 'file', ?, ?, ?, ?)
+          ON CONFLICT(path) DO UPDATE SET size = excluded.size, content_hash = excluded.content_hash,
+                                          modified_at = excluded.modified_at
+          """,
+          file_rows
+        )
+    except sqlite3.Error as e:
+      return {"error": f"Import failed: {e}"}
+
+    logger.info(f"VFS: Imported {len(new_directories)} directories and {len(file_rows)} files")
+    return {"status": "success", "message": f"Imported {len(new_directories)} directories and {len(file_rows)} files.",
+            "directories_created": len(new_directories), "files_written": len(file_rows)}
 
-    logger.info(f"VFS: Copied '{normalized_source}' to '{final_dest_path}' successfully.")
-    return {"status": "success", "message": f"Copied '{source_path}' to '{dest_path}'."}
+  def _missing_parent_error(self, parent_path, existing_types, files):
+    if existing_types.get(parent_path) == 'file' or parent_path in files:
+      return {"error": f"Parent path is not a directory: {parent_path}"}
+    return {"error": f"Parent directory does not exist: {parent_path}"}
+
+  def _get_node_types(self, paths):
+    # Maps each existing path to its node type, batching the IN (...) lookups
+    paths = [p for p in paths if p is not None]
+    node_types = {}
+    for start in range(0, len(paths), 500):
+      batch = paths[start:start + 500]
+      rows = self.db.execute_query(
+        f"SELECT path, type FROM vfs_nodes WHERE path IN ({', '.join('?' * len(batch))})",
+        tuple(batch), fetch_all=True
+      )
+      node_types.update({row['path']: row['type'] for row in rows})
+    return node_types
 
   def reset_vfs(self):
     """Removes all VFS nodes from the database except the conceptual root."""
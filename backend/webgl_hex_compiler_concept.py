@@ -5,19 +5,128 @@
 # This JSON is then parsed by the JavaScript frontend to update the WebGL canvas.
 
 import sys
+import math
+import array
+import base64
+import struct
 import binascii
 import json
 import logging
 
+try:
+  import numpy as np
+  NUMPY_ENABLED = True
+except ImportError:
+  NUMPY_ENABLED = False
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('WebGL_Hex_Compiler')
 
+# Hex input that decodes to a vertex buffer starts with this header (little-endian):
+# magic 'OBVB', version (1), format (0 = float32, 1 = int16), components per vertex (2-4),
+# primitive (index into VERTEX_PRIMITIVES), vertex count (uint32). Packed vertices follow.
+VERTEX_BUFFER_MAGIC = b'OBVB'
+VERTEX_BUFFER_HEADER = struct.Struct('<4sBBBBI')
+VERTEX_FORMATS = {0: ('float32', 'f', 4), 1: ('int16', 'h', 2)} # code -> (name, array typecode, bytes per element)
+VERTEX_PRIMITIVES = ['point', 'line', 'line_strip', 'triangle', 'triangle_strip', 'triangle_fan']
+
+FRAGMENT_SHADER = """
+precision mediump float;
+uniform vec4 u_color;
+
+void main() {
+    gl_FragColor = u_color;
+}
+"""
+
+def _vertex_shader(components):
+  position = "a_position" if components == 4 else f"vec4(a_position{', 0.0' * (3 - components)}, 1.0)"
+  return f"""
+precision mediump float;
+attribute vec{components} a_position;
+
+void main() {{
+    gl_Position = {position};
+}}
+"""
+
+def _parse_vertex_buffer(decoded_bytes):
+  """
+  Validates a packed vertex stream and returns it as a base64 typed-array payload
+  that the frontend can decode straight into a Float32Array/Int16Array for
+  gl.bufferData, plus per-component bounds. The vertex bytes are passed through
+  as-is (they are already little-endian), so no per-vertex Python objects are built.
+  """
+  if len(decoded_bytes) < VERTEX_BUFFER_HEADER.size:
+    raise ValueError("Vertex buffer header is truncated.")
+  _, version, format_code, components, primitive, vertex_count = VERTEX_BUFFER_HEADER.unpack_from(decoded_bytes)
+  if version != 1:
+    raise ValueError(f"Unsupported vertex buffer version: {version}")
+  if format_code not in VERTEX_FORMATS:
+    raise ValueError(f"Unsupported vertex format code: {format_code}")
+  if not 2 <= components <= 4:
+    raise ValueError(f"Vertices must have 2-4 components, got {components}")
+  if primitive >= len(VERTEX_PRIMITIVES):
+    raise ValueError(f"Unsupported primitive code: {primitive}")
+  format_name, typecode, element_size = VERTEX_FORMATS[format_code]
+  payload_size = vertex_count * components * element_size
+  payload = memoryview(decoded_bytes)[VERTEX_BUFFER_HEADER.size:VERTEX_BUFFER_HEADER.size + payload_size]
+  if len(payload) != payload_size:
+    raise ValueError(f"Vertex buffer holds {len(payload)} bytes; {vertex_count} vertices need {payload_size}.")
+
+  bounds = None
+  if vertex_count:
+    if NUMPY_ENABLED:
+      values = np.frombuffer(payload, dtype='<f4' if format_name == 'float32' else '<i2').reshape(vertex_count, components)
+      if format_name == 'float32' and not np.isfinite(values).all():
+        raise ValueError("Vertex buffer contains NaN or infinite coordinates.")
+      bounds = {"min": values.min(axis=0).tolist(), "max": values.max(axis=0).tolist()}
+    else:
+      values = array.array(typecode)
+      values.frombytes(payload)
+      if sys.byteorder == 'big':
+        values.byteswap()
+      # float32 sums cannot overflow a double, so a non-finite sum means a non-finite value
+      if format_name == 'float32' and not math.isfinite(math.fsum(values)):
+        raise ValueError("Vertex buffer contains NaN or infinite coordinates.")
+      columns = [values[c::components] for c in range(components)]
+      bounds = {"min": [min(column) for column in columns], "max": [max(column) for column in columns]}
+
+  return {
+    "format": format_name,
+    "components": components,
+    "normalized": format_name == 'int16', # int16 coordinates map to [-1, 1]
+    "vertexCount": vertex_count,
+    "primitive": VERTEX_PRIMITIVES[primitive],
+    "bounds": bounds,
+    "data": base64.b64encode(payload).decode('ascii'),
+  }
+
+def encode_vertex_buffer(vertices, components=2, format_name='float32', primitive='triangle'):
+  """Packs a flat list of coordinates into the hex vertex-buffer input format (the inverse of parsing)."""
+  format_code = next(code for code, (name, _, _) in VERTEX_FORMATS.items() if name == format_name)
+  values = array.array(VERTEX_FORMATS[format_code][1], vertices)
+  if sys.byteorder == 'big':
+    values.byteswap()
+  header = VERTEX_BUFFER_HEADER.pack(VERTEX_BUFFER_MAGIC, 1, format_code, components,
+                                     VERTEX_PRIMITIVES.index(primitive), len(values) // components)
+  return (header + values.tobytes()).hex()
+
 def compile_hex_to_webgl(hex_input):
   """
   Conceptually "compiles" a hexadecimal string into WebGL data.
   This function will generate simulated GLSL shaders and vertex data
   based on the input hex, returning it as a JSON string.
   """
+  return json.dumps(build_webgl_data(hex_input))
+
+def build_webgl_data(hex_input):
+  """
+  Same as compile_hex_to_webgl, but returns the dictionary instead of JSON.
+  Input that decodes to a vertex buffer (see VERTEX_BUFFER_HEADER) yields its
+  real geometry as 'vertexBuffer'; any other input yields a fixed shape in
+  'vertexData'.
+  """
   logger.info(f"Conceptual WebGL compilation started for hex: {hex_input[:50]}...")
 
   output_data = {
@@ -37,9 +146,22 @@ def compile_hex_to_webgl(hex_input):
       hex_input = '0' + hex_input # Pad with leading zero
 
     decoded_bytes = binascii.unhexlify(hex_input)
-    decoded_ascii = decoded_bytes.decode('utf-8', errors='ignore')
 
-    logger.info(f"Decoded bytes length: {len(decoded_bytes)}. ASCII: '{decoded_ascii}'")
+    if decoded_bytes.startswith(VERTEX_BUFFER_MAGIC):
+      vertex_buffer = _parse_vertex_buffer(decoded_bytes)
+      output_data.update(
+        vertexBuffer=vertex_buffer,
+        shapeType=vertex_buffer["primitive"],
+        vertexShaderCode=_vertex_shader(vertex_buffer["components"]),
+        fragmentShaderCode=FRAGMENT_SHADER,
+        message=(f"Compiled a {vertex_buffer['vertexCount']}-vertex {vertex_buffer['format']} "
+                 f"{vertex_buffer['primitive']} mesh for the WebGL canvas."),
+      )
+      logger.info(output_data["message"])
+      return output_data
+
+    decoded_ascii = decoded_bytes.decode('utf-8', errors='ignore')
+    logger.info(f"Decoded bytes length: {len(decoded_bytes)}. ASCII: '{decoded_ascii[:50]}'")
 
     # 2. Derive conceptual parameters from hex input
     # Use first few bytes to influence color, shape, etc.
@@ -82,22 +204,8 @@ def compile_hex_to_webgl(hex_input):
 
     # 3. Generate simulated GLSL shaders
     # These are basic, functional shaders that the frontend can use.
-    output_data["vertexShaderCode"] = """
-precision mediump float;
-attribute vec2 a_position;
-
-void main() {
-    gl_Position = vec4(a_position, 0.0, 1.0);
-}
-"""
-    output_data["fragmentShaderCode"] = f"""
-precision mediump float;
-uniform vec4 u_color;
-
-void main() {{
-    gl_FragColor = u_color;
-}}
-"""
+    output_data["vertexShaderCode"] = _vertex_shader(2)
+    output_data["fragmentShaderCode"] = FRAGMENT_SHADER
     output_data["message"] = (
       f"Conceptually compiled hex (first 50 chars: '{hex_input[:50]}...') "
       f"into a {output_data['shapeType']} with color {output_data['backgroundColor']} "
@@ -107,14 +215,17 @@ void main() {{
   except binascii.Error:
     output_data["status"] = "error"
     output_data["message"] = "Invalid hexadecimal string format. Please provide valid hex."
-    logger.error(f"Invalid hex input: {hex_input}")
+    logger.error(f"Invalid hex input: {hex_input[:50]}...")
+  except ValueError as e: # binascii.Error is a ValueError too, so this comes second
+    output_data["status"] = "error"
+    output_data["message"] = f"Invalid vertex buffer: {e}"
+    logger.error(f"Invalid vertex buffer: {e}")
   except Exception as e:
     output_data["status"] = "error"
     output_data["message"] = f"An unexpected error occurred: {str(e)}"
     logger.error(f"Error during hex_to_webgl conceptual compilation: {e}", exc_info=True)
 
-  # Return the structured data as a JSON string
-  return json.dumps(output_data)
+  return output_data
 
 if __name__ == '__main__':
   # This script is designed to be called by compiler_runner.py